@@ -7,13 +7,31 @@ including logging setup, file operations, user interaction, and error handling.
 Following the DRY principle to eliminate code duplication and ensure consistency.
 """
 
+import functools
 import logging
+import re
 import shutil
 import sys
 from collections.abc import Callable
 from datetime import datetime
 from pathlib import Path
 
+# Marker set on handlers installed by setup_logging so that re-configuration
+# only removes our own handlers and leaves those of other libraries intact.
+_HANDLER_OWNER = "ScriptUtils"
+
+
+@functools.lru_cache(maxsize=8)
+def _make_formatter(fmt: str) -> logging.Formatter:
+    """Return a shared formatter for the given format string."""
+    return logging.Formatter(fmt)
+
+
+@functools.lru_cache(maxsize=8)
+def _resolve_level(level: str) -> int:
+    """Translate a level name such as "info" into its numeric value."""
+    return getattr(logging, level.upper())
+
 
 class ScriptUtils:
     """Collection of utility functions for development scripts."""
@@ -44,20 +62,24 @@ class ScriptUtils:
         if format_string is None:
             format_string = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-        # Create formatter
-        formatter = logging.Formatter(format_string)
+        # Reuse a cached formatter for identical format strings
+        formatter = _make_formatter(format_string)
 
         # Get root logger
         logger = logging.getLogger()
-        logger.setLevel(getattr(logging, level.upper()))
+        logger.setLevel(_resolve_level(level))
 
-        # Clear existing handlers
-        logger.handlers.clear()
+        # Remove only handlers installed by a previous setup_logging call
+        for handler in logger.handlers[:]:
+            if getattr(handler, "_owned_by", None) == _HANDLER_OWNER:
+                logger.removeHandler(handler)
+                handler.close()
 
         # Console handler
         if console:
             console_handler = logging.StreamHandler(sys.stdout)
             console_handler.setFormatter(formatter)
+            console_handler._owned_by = _HANDLER_OWNER
             logger.addHandler(console_handler)
 
         # File handler
@@ -66,6 +88,7 @@ class ScriptUtils:
             file_path.parent.mkdir(parents=True, exist_ok=True)
             file_handler = logging.FileHandler(file_path, encoding="utf-8")
             file_handler.setFormatter(formatter)
+            file_handler._owned_by = _HANDLER_OWNER
             logger.addHandler(file_handler)
 
         return logger
@@ -117,20 +140,28 @@ class ScriptUtils:
         duration = end_time - start_time
         status = "SUCCESS" if success else "FAILED"
 
-        logger.info("=" * 50)
-        logger.info("EXECUTION SUMMARY")
-        logger.info("=" * 50)
-        logger.info(f"Status: {status}")
-        logger.info(f"Start Time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info(f"End Time: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info(f"Duration: {duration}")
-
-        if errors:
-            logger.error(f"Errors encountered: {len(errors)}")
-            for error in errors:
-                logger.error(f"  - {error}")
-
-        logger.info("=" * 50)
+        # One record per block: a single lock, format and handler dispatch
+        separator = "=" * 50
+        lines = [
+            separator,
+            "EXECUTION SUMMARY",
+            separator,
+            f"Status: {status}",
+            f"Start Time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"End Time: {end_time.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"Duration: {duration}",
+        ]
+        if not (errors and logger.isEnabledFor(logging.ERROR)):
+            lines.append(separator)
+            logger.info("\n".join(lines))
+            return
+
+        # Errors keep their own level but stay inside the block, before the footer
+        logger.info("\n".join(lines))
+        error_lines = [f"Errors encountered: {len(errors)}"]
+        error_lines.extend(f"  - {error}" for error in errors)
+        logger.error("\n".join(error_lines))
+        logger.info(separator)
 
     @staticmethod
     def safe_read_file(path: str | Path, encoding: str = "utf-8") -> str:
@@ -271,7 +302,7 @@ class ScriptUtils:
     @staticmethod
     def prompt_for_input(
         message: str,
-        validator: Callable[[str], bool] | None = None,
+        validator: str | re.Pattern | Callable[[str], bool] | None = None,
         default: str | None = None,
         allow_empty: bool = False,
     ) -> str:
@@ -280,7 +311,8 @@ class ScriptUtils:
 
         Args:
             message: Input prompt
-            validator: Optional validation function
+            validator: Optional validation function, or a regex (string or
+                compiled pattern) the whole input must match
             default: Default value if user enters nothing
             allow_empty: Whether to allow empty input
 
@@ -290,7 +322,14 @@ class ScriptUtils:
         Example:
             >>> name = prompt_for_input("Enter your name: ")
             >>> age = prompt_for_input("Enter your age: ", validator=str.isdigit)
+            >>> code = prompt_for_input("Enter code: ", validator=r"[A-Z]{3}")
         """
+        # Regex validators are compiled once and matched in C on every attempt
+        if isinstance(validator, str):
+            validator = re.compile(validator)
+        if isinstance(validator, re.Pattern):
+            validator = validator.fullmatch
+
         prompt_message = f"{message}"
         if default is not None:
             prompt_message += f" [{default}]"
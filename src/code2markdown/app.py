@@ -1,167 +1,121 @@
+import dataclasses
 import fnmatch  # Добавлен глобальный импорт fnmatch
+import functools
+import hashlib
 import html  # Добавьте этот импорт в начало файла
-import json
+import io
+import itertools
+import logging
 import math
+import operator
 import os
+import re
 import sqlite3
+import threading
 import xml.etree.ElementTree as ET
 import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from xml.dom import minidom
 
+import pandas as pd
 import pathspec
-import pyperclip
 import streamlit as st
 import tornado.iostream
 import tornado.websocket
 from pybars import Compiler
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import (
+    SCRIPT_RUN_CONTEXT_ATTR_NAME,
+)
 
 from code2markdown.application.services import (
     GenerationService,  # Добавлен импорт GenerationService
 )
-from code2markdown.domain.files import DirectoryNode, FileNode, ProjectTreeBuilder
+from code2markdown.domain.files import (
+    BINARY_EXTENSIONS,
+    BINARY_SNIFF_BYTES,
+    TEXT_EXTENSIONS,
+    ProjectTreeBuilder,
+    is_binary_content,
+)
 from code2markdown.domain.filters import FileSize, FilterSettings
-from code2markdown.infrastructure.database import SqliteHistoryRepository
+from code2markdown.infrastructure.database import (
+    SqliteHistoryRepository,
+    ensure_schema,
+    open_connection,
+)
+from code2markdown.infrastructure.tree_cache import DiskCache, directory_signature
+
+logger = logging.getLogger(__name__)
 
 # Настройка ширины экрана
 st.set_page_config(layout="wide")
 
 
 # Initialize database
-def init_db():
-    # Добавление таймаута для операций с базой данных
+def _migrate_db(database, timeout):
+    """Открывает базу данных и приводит схему к актуальной версии"""
+    conn = open_connection(database, timeout=timeout, isolation_level=None)
     try:
-        # Используем контекстный менеджер для автоматического закрытия соединения
-        with sqlite3.connect("code2markdown.db", timeout=10.0) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS requests (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    project_path TEXT NOT NULL,
-                    template_name TEXT NOT NULL,
-                    markdown_content TEXT NOT NULL,
-                    reference_url TEXT,
-                    processed_at DATETIME NOT NULL,
-                    file_count INTEGER DEFAULT 0,
-                    filter_settings TEXT,
-                    project_name TEXT
-                )
-            """)
-
-            # Add new columns if they don't exist (for backward compatibility)
-            try:
-                cursor.execute(
-                    "ALTER TABLE requests ADD COLUMN file_count INTEGER DEFAULT 0"
-                )
-            except sqlite3.OperationalError:
-                pass  # Column already exists
-
-            try:
-                cursor.execute("ALTER TABLE requests ADD COLUMN filter_settings TEXT")
-            except sqlite3.OperationalError:
-                pass  # Column already exists
+        ensure_schema(conn)
+    finally:
+        conn.close()
 
-            try:
-                cursor.execute("ALTER TABLE requests ADD COLUMN project_name TEXT")
-            except sqlite3.OperationalError:
-                pass  # Column already exists
 
-            conn.commit()
-            # Соединение автоматически закроется при выходе из блока with
+def init_db():
+    try:
+        _migrate_db("code2markdown.db", timeout=10.0)
     except sqlite3.OperationalError as e:
         st.error(f"Ошибка подключения к базой данных: {str(e)}")
         try:
             # Попробовать снова с уменьшенным таймаутом
-            with sqlite3.connect("code2markdown.db", timeout=5.0) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS requests (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        project_path TEXT NOT NULL,
-                        template_name TEXT NOT NULL,
-                        markdown_content TEXT NOT NULL,
-                        reference_url TEXT,
-                        processed_at DATETIME NOT NULL,
-                        file_count INTEGER DEFAULT 0,
-                        filter_settings TEXT,
-                        project_name TEXT
-                    )
-                """)
-
-                # Add new columns if they don't exist (for backward compatibility)
-                try:
-                    cursor.execute(
-                        "ALTER TABLE requests ADD COLUMN file_count INTEGER DEFAULT 0"
-                    )
-                except sqlite3.OperationalError:
-                    pass  # Column already exists
-
-                try:
-                    cursor.execute("ALTER TABLE requests ADD COLUMN filter_settings TEXT")
-                except sqlite3.OperationalError:
-                    pass  # Column already exists
-
-                try:
-                    cursor.execute("ALTER TABLE requests ADD COLUMN project_name TEXT")
-                except sqlite3.OperationalError:
-                    pass  # Column already exists
-
-                conn.commit()
-                # Соединение автоматически закроется при выходе из блока with
+            _migrate_db("code2markdown.db", timeout=5.0)
         except (sqlite3.Error, OSError):
             # Создать новое подключение в случае повторной ошибки
             st.error("Используется временная база данных в памяти")
-            with sqlite3.connect(":memory:") as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS requests (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        project_path TEXT NOT NULL,
-                        template_name TEXT NOT NULL,
-                        markdown_content TEXT NOT NULL,
-                        reference_url TEXT,
-                        processed_at DATETIME NOT NULL,
-                        file_count INTEGER DEFAULT 0,
-                        filter_settings TEXT,
-                        project_name TEXT
-                    )
-                """)
+            _migrate_db(":memory:", timeout=5.0)
 
-                # Add new columns if they don't exist (for backward compatibility)
-                try:
-                    cursor.execute(
-                        "ALTER TABLE requests ADD COLUMN file_count INTEGER DEFAULT 0"
-                    )
-                except sqlite3.OperationalError:
-                    pass  # Column already exists
 
-                try:
-                    cursor.execute("ALTER TABLE requests ADD COLUMN filter_settings TEXT")
-                except sqlite3.OperationalError:
-                    pass  # Column already exists
+init_db()
 
-                try:
-                    cursor.execute("ALTER TABLE requests ADD COLUMN project_name TEXT")
-                except sqlite3.OperationalError:
-                    pass  # Column already exists
 
-                conn.commit()
-                # Соединение автоматически закроется при выходе из блока with
+# Create history repository instance
+@st.cache_resource
+def get_history_repository():
+    """Возвращает общий репозиторий, чтобы соединения с БД переживали rerun"""
+    repository = SqliteHistoryRepository()
+    # Один раз на процесс: статистика планировщика и VACUUM не чаще раза в сутки
+    repository.run_maintenance()
+    return repository
 
 
-init_db()
+history_repository = get_history_repository()
+
+
+@st.cache_resource
+def get_tree_cache():
+    """Возвращает дисковый кэш деревьев проекта, общий для всех сессий"""
+    return DiskCache()
 
-# Create history repository instance
-history_repository = SqliteHistoryRepository()
 
 # Initialize generation service
 generation_service = GenerationService(history_repository)
 
 
 # Get history
-def get_history():
-    """Retrieve all generation requests from the repository."""
-    requests = history_repository.get_all()
+@st.cache_data(ttl=60, show_spinner=False)
+def get_history(page_number=1, page_size=10):
+    """Возвращает одну страницу истории и общее число записей.
+
+    Срез страницы и подсчет выполняет SQLite (LIMIT/OFFSET и COUNT(*) OVER()),
+    поэтому в Python попадают только строки текущей страницы. Поле
+    markdown_content в строках пустое - см. fetch_markdown_content.
+    Кэш сбрасывается при удалении записи и после новой генерации.
+    """
+    requests, total_records = history_repository.get_page(
+        page_size, (page_number - 1) * page_size
+    )
     # Convert to legacy format for backward compatibility with existing UI code
     rows = []
     for request in requests:
@@ -174,40 +128,138 @@ def get_history():
                 request.reference_url,
                 request.processed_at.isoformat(),
                 request.file_count,
-                json.dumps(
-                    {
-                        "include_patterns": request.filter_settings.include_patterns,
-                        "exclude_patterns": request.filter_settings.exclude_patterns,
-                        "max_file_size": request.filter_settings.max_file_size.kb,
-                        "selected_files_count": len(
-                            request.filter_settings.selected_files
-                        )
-                        if request.filter_settings.selected_files is not None
-                        else 0,
-                    }
-                )
-                if request.filter_settings
-                else None,
+                # Описание фильтров хранится готовой строкой с момента сохранения
+                request.filters_summary or request.filter_settings.summary(),
                 request.project_name,
             )
         )
-    return rows
+    return rows, total_records
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_markdown_content(record_id):
+    """Загружает markdown одной записи истории только по требованию."""
+    return history_repository.get_markdown_content(record_id) or ""
+
+
+@st.cache_resource
+def _prefetch_pool():
+    """Общий пул потоков для фонового прогрева кэшей истории"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-prefetch")
+
+
+def _prefetch(loader, *args):
+    """Вызывает кэшируемый loader(*args) в фоне, не задерживая текущий rerun.
+
+    Следующий rerun (переход на страницу, открытие записи) найдет результат
+    уже в кэше st.cache_data.
+    """
+    ctx = get_script_run_ctx()
+
+    def warm():
+        # Контекст сессии нужен st.cache_data в потоке пула
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, ctx)
+        try:
+            loader(*args)
+        except sqlite3.Error:
+            pass  # Прогрев необязателен: при ошибке данные загрузятся по запросу
+        except Exception:
+            # Future никто не читает, поэтому прочие ошибки только логируются
+            logger.exception("History prefetch failed")
+        finally:
+            # Поток пула общий: контекст сессии не должен пережить задачу.
+            # add_script_run_ctx(thread, None) взял бы текущий контекст потока,
+            # поэтому атрибут сбрасывается напрямую
+            setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+
+    _prefetch_pool().submit(warm)
+
+
+# Delete records from database
+def delete_records(record_ids):
+    """Удаляет записи истории одной транзакцией и сбрасывает зависящие кэши."""
+    history_repository.delete_many(list(record_ids))
+    get_history.clear()
+    get_unique_project_paths.clear()
+    fetch_markdown_content.clear()
+
+
+# Named groups of pathspec regexes; renamed to plain groups before joining,
+# so patterns sharing a group name can live in one alternation
+_NAMED_GROUP_RE = re.compile(r"\(\?P<\w+>")
+
+
+class _GitignoreMatcher:
+    """Single-pass matcher equivalent to GitIgnoreSpec.match_file.
+
+    Plain names ("build", "dist/") go into sets checked against the path
+    components; every other pattern is merged into one compiled regex.
+    Specs with negations ("!keep.log") depend on pattern order, so they
+    keep using the spec itself, as do specs whose regexes cannot be merged
+    (non-default flags, or a join that no longer compiles).
+    """
+
+    def __init__(self, spec):
+        self._spec = spec
+        self._names = set()
+        self._dir_names = set()
+        self._regex = None
+
+        patterns = [p for p in spec.patterns if p.include is not None]
+        self._use_spec = any(
+            not p.include or p.regex.flags & ~re.UNICODE for p in patterns
+        )
+        if self._use_spec:
+            return
+
+        regexes = []
+        for pattern in patterns:
+            text = getattr(pattern, "pattern", None) or ""
+            dir_only = text.endswith("/")
+            name = text[:-1] if dir_only else text
+            regex = _NAMED_GROUP_RE.sub("(?:", pattern.regex.pattern)
+            literal = f"^(?:.+/)?{re.escape(name)}" + (
+                "(?:/)" if dir_only else "(?:(?:/)|$)"
+            )
+            if name and "/" not in name and regex == literal:
+                (self._dir_names if dir_only else self._names).add(name)
+            else:
+                regexes.append(regex)
+        if regexes:
+            try:
+                self._regex = re.compile("|".join(f"(?:{r})" for r in regexes))
+            except re.error:
+                self._use_spec = True
 
+    def match_file(self, file_path):
+        if self._use_spec:
+            return self._spec.match_file(file_path)
 
-# Delete record from database
-def delete_record(record_id):
-    """Delete a generation request by ID."""
-    history_repository.delete(record_id)
+        norm_path = pathspec.util.normalize_file(file_path)
+        parts = norm_path.split("/")
+        if self._names and not self._names.isdisjoint(parts):
+            return True
+        if self._dir_names and not self._dir_names.isdisjoint(parts[:-1]):
+            return True
+        return self._regex is not None and self._regex.match(norm_path) is not None
 
 
 # Parse .gitignore file
+@st.cache_resource(max_entries=64, show_spinner=False)
+def _compile_gitignore(gitignore_path, mtime):
+    """Compile a .gitignore once per (path, mtime); reused across reruns."""
+    with open(gitignore_path, encoding="utf-8") as gitignore_file:
+        return _GitignoreMatcher(pathspec.GitIgnoreSpec.from_lines(gitignore_file))
+
+
 def parse_gitignore(gitignore_path):
     """Parse .gitignore file and return a PathSpec object."""
-    if os.path.exists(gitignore_path):
-        with open(gitignore_path, encoding="utf-8") as gitignore_file:
-            lines = gitignore_file.readlines()
-        return pathspec.PathSpec.from_lines("gitwildmatch", lines)
-    return pathspec.PathSpec([])
+    try:
+        mtime = os.path.getmtime(gitignore_path)
+    except OSError:
+        return pathspec.PathSpec([])
+    return _compile_gitignore(gitignore_path, mtime)
 
 
 # Check if a path should be excluded
@@ -219,216 +271,200 @@ def should_exclude(path, spec):
 # Check if file is binary
 def is_binary_file(file_path):
     """Check if a file is binary by examining its extension and content."""
-    # Известные бинарные расширения
-    binary_extensions = {
-        ".pyc",
-        ".pyo",
-        ".exe",
-        ".dll",
-        ".so",
-        ".dylib",
-        ".bin",
-        ".dat",
-        ".jpg",
-        ".jpeg",
-        ".png",
-        ".gif",
-        ".bmp",
-        ".tiff",
-        ".ico",
-        ".mp3",
-        ".mp4",
-        ".avi",
-        ".mkv",
-        ".mov",
-        ".wmv",
-        ".flv",
-        ".pdf",
-        ".doc",
-        ".docx",
-        ".xls",
-        ".xlsx",
-        ".ppt",
-        ".pptx",
-        ".zip",
-        ".rar",
-        ".7z",
-        ".tar",
-        ".gz",
-        ".bz2",
-        ".sqlite",
-        ".db",
-        ".dbf",
-    }
-
-    # Проверяем расширение
+    # Проверяем расширение: известные типы определяются без чтения файла
     _, ext = os.path.splitext(file_path.lower())
-    if ext in binary_extensions:
+    if ext in BINARY_EXTENSIONS:
         return True
+    if ext in TEXT_EXTENSIONS:
+        return False
 
-    # Дополнительная проверка: пытаемся прочитать первые несколько байт
+    # Дополнительная проверка: читаем первые байты без буферизованного файлового объекта
     try:
-        with open(file_path, "rb") as f:
-            chunk = f.read(1024)
-            # Если в первых 1024 байтах много нулевых байтов, это вероятно бинарный файл
-            if b"\x00" in chunk:
-                return True
-            # Проверяем на наличие непечатаемых символов
-            try:
-                chunk.decode("utf-8")
-                return False
-            except UnicodeDecodeError:
-                return True
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            chunk = os.read(fd, BINARY_SNIFF_BYTES)
+        finally:
+            os.close(fd)
     except OSError:
         return True
 
-    return False
+    return is_binary_content(chunk)
 
 
-# Get filtered files
+# Get project structure
 # app.py
 
+_DEFAULT_STRUCTURE_EXCLUDE_FOLDERS = frozenset(
+    {
+        "venv",
+        "env",
+        "json_data",
+        ".venv",
+        "__pycache__",
+        ".next",
+        "node_modules",
+        "cache",
+        "mlruns",
+        "backup",
+        "examples",
+        "reports",
+        "scripts",
+        "tests",
+        "model_cache",
+        "models",
+    }
+)
+_DEFAULT_STRUCTURE_EXCLUDE_FILES = frozenset({".gitignore", ".env"})
 
-def get_filtered_files(path, extensions=None, exclude_folders=None, exclude_files=None):
-    if extensions is None:
-        extensions = [
-            "css",
-            "tsx",
-            "ts",
-            "js",
-            "mjs",
-            "py",
-            "ipynb",
-            "html",
-            "toml",
-        ]
-    if exclude_folders is None:
-        exclude_folders = [
-            "venv",
-            "env",
-            "json_data",
-            ".venv",
-            ".venv312",
-            ".venv_312",
-            "__pycache__",
-            ".next",
-            "node_modules",
-            "temp",
-            "book",
-            "mybooks",
-            "cache",
-            "mlruns",
-            "data",
-            ".data",
-            "backup",
-            "examples",
-            "reports",
-            "scripts",
-            "tests",
-            "model_cache",
-            "models",
-        ]
-    if exclude_files is None:
-        exclude_files = [
-            "package-lock.json",
-            "package.json",
-            "manifest.json",
-            "App.test.js",
-            "reportWebVitals.js",
-            "setupTests.js",
-            ".gitignore",
-            ".env",
-        ]
-
-    exclude_folders.extend(
-        [
-            d
-            for d in os.listdir(path)
-            if os.path.isdir(os.path.join(path, d)) and d.startswith(".")
-        ]
-    )
-    gitignore_path = os.path.join(path, ".gitignore")
-    spec = parse_gitignore(gitignore_path)
-
-    for root, dirs, files in os.walk(path):
-        dirs[:] = [
-            d
-            for d in dirs
-            if d not in exclude_folders
-            and not should_exclude(os.path.join(root, d), spec)
-        ]
-        for file in files:
-            file_path = os.path.join(root, file)
-            if (
-                file.split(".")[-1] in extensions
-                and file not in exclude_files
-                and not should_exclude(file_path, spec)
-            ):
-                yield file_path
 
+@functools.lru_cache(maxsize=1024)
+def _sorted_directory_entries(path, mtime_ns):
+    """Отсортированный листинг папки; mtime_ns папки в ключе сбрасывает кэш"""
+    with os.scandir(path) as entries:
+        return tuple(
+            (entry.name, entry.path, entry.is_dir(), entry.is_file())
+            for entry in sorted(entries, key=operator.attrgetter("name"))
+        )
 
-# Get project structure
-# app.py
+
+def _scan_structure_level(path):
+    """Читает папку один раз: отсортированные записи и её .gitignore"""
+    items = _sorted_directory_entries(path, os.stat(path).st_mtime_ns)
+    spec = parse_gitignore(os.path.join(path, ".gitignore"))
+    return iter(items), spec
 
 
 def get_project_structure(path, exclude_folders=None, exclude_files=None, indent_level=0):
-    if exclude_folders is None:
-        exclude_folders = [
-            "venv",
-            "env",
-            "json_data",
-            ".venv",
-            "__pycache__",
-            ".next",
-            "node_modules",
-            "cache",
-            "mlruns",
-            "backup",
-            "examples",
-            "reports",
-            "scripts",
-            "tests",
-            "model_cache",
-            "models",
-        ]
-    if exclude_files is None:
-        exclude_files = [".gitignore", ".env"]
-
-    exclude_folders.extend(
-        [
-            d
-            for d in os.listdir(path)
-            if os.path.isdir(os.path.join(path, d)) and d.startswith(".")
-        ]
+    exclude_folders = (
+        _DEFAULT_STRUCTURE_EXCLUDE_FOLDERS
+        if exclude_folders is None
+        else frozenset(exclude_folders)
+    )
+    exclude_files = (
+        _DEFAULT_STRUCTURE_EXCLUDE_FILES
+        if exclude_files is None
+        else frozenset(exclude_files)
     )
-    gitignore_path = os.path.join(path, ".gitignore")
-    spec = parse_gitignore(gitignore_path)
-
-    indent = "    " * indent_level
-    structure = ""
-    items = sorted(os.listdir(path))
-    for item in items:
-        item_path = os.path.join(path, item)
-        if os.path.isdir(item_path):
-            if item not in exclude_folders and not should_exclude(item_path, spec):
-                structure += f"{indent}├── {item}/\n"
-                structure += get_project_structure(
-                    item_path, exclude_folders, exclude_files, indent_level + 1
-                )
-        elif os.path.isfile(item_path):
-            if item not in exclude_files and not should_exclude(item_path, spec):
-                structure += f"{indent}├── {item}\n"
-    return structure
+
+    # Итеративный обход в глубину: каждый уровень стека хранит итератор по
+    # записям папки и PathSpec её собственного .gitignore
+    lines = []
+    stack = [(*_scan_structure_level(path), indent_level)]
+    while stack:
+        items, spec, level = stack[-1]
+        entry = next(items, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        indent = "    " * level
+        name, entry_path, is_dir, is_file = entry
+        if is_dir:
+            # Скрытые папки исключаются всегда
+            if (
+                not name.startswith(".")
+                and name not in exclude_folders
+                and not should_exclude(entry_path, spec)
+            ):
+                lines.append(f"{indent}├── {name}/\n")
+                stack.append((*_scan_structure_level(entry_path), level + 1))
+        elif is_file:
+            if name not in exclude_files and not should_exclude(entry_path, spec):
+                lines.append(f"{indent}├── {name}\n")
+    return "".join(lines)
 
 
 # Load template
+@functools.lru_cache(maxsize=16)
+def _compile_template(template_path, mtime):
+    """Compile a Handlebars template once per (path, mtime)."""
+    with open(template_path, encoding="utf-8") as template_file:
+        return Compiler().compile(template_file.read())
+
+
 def load_template(template_name):
     """Load a Handlebars template from the templates directory."""
     template_path = os.path.join("templates", template_name)
-    if os.path.exists(template_path):
-        with open(template_path, encoding="utf-8") as template_file:
-            return Compiler().compile(template_file.read())
-    return None
+    try:
+        mtime = os.path.getmtime(template_path)
+    except OSError:
+        return None
+    return _compile_template(template_path, mtime)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _render_documentation(
+    project_path, template_name, filters_key, tree_signature, template_signature, _filters
+):
+    """Кэширует готовый markdown по входным данным генерации.
+
+    filters_key, подпись входных файлов (пути, mtime, размеры) и mtime шаблона
+    образуют ключ: повторная генерация без изменений не читает файлы и не
+    вычисляет шаблон. Сами FilterSettings передаются без хэширования.
+    """
+    # project_path уже абсолютный, имя проекта - его последний компонент
+    return generation_service.render_documentation(
+        project_path, template_name, _filters, os.path.basename(project_path)
+    )
+
+
+def _filters_cache_key(filters):
+    """Хэшируемое представление FilterSettings для ключа кэша генерации"""
+    return (
+        tuple(filters.include_patterns),
+        tuple(filters.exclude_patterns),
+        filters.max_file_size.kb if filters.max_file_size else None,
+        filters.show_excluded,
+        filters.max_depth,
+        tuple(sorted(filters.selected_files or ())),
+    )
+
+
+def _tree_source_key(project_path, filters):
+    """Путь и поля фильтров, от которых зависит отсканированное дерево"""
+    scan_depth = (
+        filters.max_depth
+        if filters.max_depth is not None and filters.max_depth > 0
+        else None
+    )
+    tree_filters = dataclasses.replace(
+        filters, selected_files=frozenset(), max_depth=scan_depth
+    )
+    return os.path.abspath(project_path), tree_filters
+
+
+def _render_signature(project_path, filters):
+    """Подпись входных файлов генерации для ключа кэша.
+
+    Если дерево уже отсканировано с тем же путем и фильтрами, подпись
+    строится по списку его файлов, mtime отсканированных папок (файл,
+    созданный или удаленный после сканирования, меняет mtime своей папки) и
+    mtime/размерам только тех файлов, чье содержимое попадет в документ, -
+    без повторного обхода каталога. Иначе используется directory_signature
+    с отсечением как у построителя дерева.
+    """
+    source = _tree_source_key(project_path, filters)
+    if st.session_state.get("file_tree_source") != source:
+        return directory_signature(project_path, source[1])
+
+    index = get_file_index()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\0".join(index["all"]).encode(errors="replace"))
+    content_paths = (
+        sorted(filters.selected_files) if filters.selected_files else index["all"]
+    )
+    for path in itertools.chain((source[0],), index["folders"], content_paths):
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            digest.update(f"\n{path}\0-".encode(errors="replace"))
+            continue
+        digest.update(
+            f"\n{path}\0{file_stat.st_mtime_ns}\0{file_stat.st_size}".encode(
+                errors="replace"
+            )
+        )
+    return digest.hexdigest()
 
 
 # Generate Markdown - now just a wrapper around the service
@@ -444,12 +480,25 @@ def generate_markdown(
     Maintains backward compatibility with existing UI code.
     """
     try:
-        # Call the service method
-        return generation_service.generate_and_save_documentation(
-            project_path=project_path,
-            template_name=template_name,
-            filters=filter_settings,
-            reference_url=reference_url,
+        # Имя проекта вычисляется один раз для шаблона и записи истории
+        project_name = generation_service.project_name(project_path)
+        markdown_content, file_count = _render_documentation(
+            os.path.abspath(project_path),
+            template_name,
+            _filters_cache_key(filter_settings),
+            _render_signature(project_path, filter_settings),
+            generation_service.template_signature(template_name),
+            filter_settings,
+        )
+        # Запись в историю сохраняется при каждой генерации, в том числе из кэша
+        generation_service.save_documentation(
+            project_path,
+            template_name,
+            markdown_content,
+            file_count,
+            filter_settings,
+            reference_url,
+            project_name,
         )
     except ValueError as e:
         st.error(f"Validation error: {str(e)}")
@@ -458,51 +507,67 @@ def generate_markdown(
         st.error(f"Error generating documentation: {str(e)}")
         raise
 
+    # В историю добавлена запись - страницы истории и недавние пути устарели
+    get_history.clear()
+    get_unique_project_paths.clear()
+    return markdown_content
+
+
+def _new_folder_node():
+    """Узел дерева папок: файлы текущей папки и вложенные папки"""
+    return {"_files": [], "_dirs": defaultdict(_new_folder_node)}
+
 
 def build_structure_from_selected(project_path, selected_files):
     """Строит структуру проекта только для выбранных файлов"""
-    structure = f"Project: {os.path.basename(project_path)}\n"
-
     # Группируем файлы по папкам
-    folders: dict = {}
+    folders = _new_folder_node()
     for file_path in selected_files:
         if os.path.isfile(file_path):
             rel_path = os.path.relpath(file_path, project_path)
-            dir_parts = rel_path.split(os.sep)[:-1]
-            filename = os.path.basename(file_path)
+            *dir_parts, filename = rel_path.split(os.sep)
 
-            current_dict = folders
+            current = folders
             for part in dir_parts:
-                if part not in current_dict:
-                    current_dict[part] = {}
-                current_dict = current_dict[part]
-
-            if "_files" not in current_dict:
-                current_dict["_files"] = []
-            current_dict["_files"].append(filename)
+                current = current["_dirs"][part]
+            current["_files"].append(filename)
 
-    def build_tree(folder_dict, indent=0):
-        result = ""
+    def build_tree(folder, out, indent=0):
         indent_str = "    " * indent
 
         # Сначала выводим папки
-        for name, content in folder_dict.items():
-            if name != "_files":
-                result += f"{indent_str}├── {name}/\n"
-                result += build_tree(content, indent + 1)
+        for name, content in folder["_dirs"].items():
+            out.write(f"{indent_str}├── {name}/\n")
+            build_tree(content, out, indent + 1)
 
         # Затем выводим файлы
-        if "_files" in folder_dict:
-            for filename in sorted(folder_dict["_files"]):
-                result += f"{indent_str}├── {filename}\n"
-
-        return result
+        for filename in sorted(folder["_files"]):
+            out.write(f"{indent_str}├── {filename}\n")
 
-    structure += build_tree(folders)
-    return structure
+    out = io.StringIO()
+    out.write(f"Project: {os.path.basename(project_path)}\n")
+    build_tree(folders, out)
+    return out.getvalue()
 
 
 # Функции для конвертации контента в различные форматы
+
+# XML 1.0 допустимые символы: #x9 | #xA | #xD | [#x20-#xD7FF] | [#xE000-#xFFFD] |
+# [#x10000-#x10FFFF]. Все недопустимые лежат в BMP и заменяются на пробел.
+_XML_INVALID_TABLE = dict.fromkeys(
+    [
+        code
+        for code in range(0x10000)
+        if not (
+            code in (0x09, 0x0A, 0x0D)
+            or 0x20 <= code <= 0xD7FF
+            or 0xE000 <= code <= 0xFFFD
+        )
+    ],
+    ord(" "),
+)
+
+
 def convert_to_xml(markdown_content, project_name):
     """Конвертирует markdown контент в XML формат"""
     try:
@@ -522,10 +587,9 @@ def convert_to_xml(markdown_content, project_name):
         # Используем CDATA чтобы избежать проблем с специальными символами
         content.text = cleaned_content
 
-        # Красивое форматирование XML
-        rough_string = ET.tostring(root, "utf-8")
-        reparsed = minidom.parseString(rough_string)
-        return reparsed.toprettyxml(indent="  ")
+        # Красивое форматирование XML без повторного разбора через minidom
+        ET.indent(root, space="  ")
+        return '<?xml version="1.0" ?>\n' + ET.tostring(root, encoding="unicode") + "\n"
     except (ET.ParseError, UnicodeDecodeError):
         # Если не удается создать валидный XML, возвращаем простую структуру
         return f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -544,45 +608,54 @@ def clean_xml_content(content):
     if not content:
         return ""
 
-    # Удаляем недопустимые XML символы
-    valid_chars = []
-    for char in content:
-        # XML 1.0 допустимые символы: #x9 | #xA | #xD | [#x20-#xD7FF] | [#xE000-#xFFFD]
-        code = ord(char)
-        if (
-            code == 0x09
-            or code == 0x0A
-            or code == 0x0D
-            or (0x20 <= code <= 0xD7FF)
-            or (0xE000 <= code <= 0xFFFD)
-        ):
-            valid_chars.append(char)
-        else:
-            # Заменяем недопустимые символы на пробел
-            valid_chars.append(" ")
+    # Заменяем недопустимые символы на пробел за один проход в C
+    return content.translate(_XML_INVALID_TABLE)
 
-    return "".join(valid_chars)
 
+def _download_project_name(project_path):
+    return os.path.basename(os.path.abspath(project_path)) if project_path else "project"
 
-def prepare_file_content(content, file_format, project_path):
-    """Подготавливает контент для скачивания в указанном формате"""
-    project_name = (
-        os.path.basename(os.path.abspath(project_path)) if project_path else "project"
-    )
 
-    if file_format == "txt":
-        return content, f"{project_name}_documentation.txt", "text/plain"
-    elif file_format == "md":
-        return content, f"{project_name}_documentation.md", "text/markdown"
+def download_file_info(file_format, project_path):
+    """Имя файла и MIME-тип для скачивания в указанном формате, без подготовки контента"""
+    project_name = _download_project_name(project_path)
+    if file_format == "md":
+        return f"{project_name}_documentation.md", "text/markdown"
     elif file_format == "xml":
-        xml_content = convert_to_xml(content, project_name)
-        return xml_content, f"{project_name}_documentation.xml", "application/xml"
+        return f"{project_name}_documentation.xml", "application/xml"
     else:
-        return content, f"{project_name}_documentation.txt", "text/plain"
+        return f"{project_name}_documentation.txt", "text/plain"
+
+
+def prepare_file_content(content, file_format, project_path):
+    """Подготавливает контент для скачивания в указанном формате"""
+    filename, mime_type = download_file_info(file_format, project_path)
+    if file_format == "xml":
+        content = convert_to_xml(content, _download_project_name(project_path))
+    return content, filename, mime_type
+
+
+def download_button(label, content, file_format, project_path, **kwargs):
+    """st.download_button, который готовит данные только при нажатии.
+
+    Streamlit вызывает переданную функцию лишь по клику, поэтому на обычных
+    rerun не строится XML и контент не копируется в байты для каждой кнопки.
+    """
+    filename, mime_type = download_file_info(file_format, project_path)
+    return st.download_button(
+        label=label,
+        data=lambda: prepare_file_content(content, file_format, project_path)[0],
+        file_name=filename,
+        mime=mime_type,
+        **kwargs,
+    )
 
 
 # Новые функции для интерактивного выбора файлов
-@st.cache_data(ttl=300, max_entries=10, show_spinner=True)
+# Версия формата словаря дерева в дисковом кэше; меняется вместе с to_dict
+_TREE_FORMAT = 2
+
+
 def get_file_tree_structure(
     path,
     max_depth=3,
@@ -593,166 +666,318 @@ def get_file_tree_structure(
     show_excluded=False,
 ):
     """Получает структуру файлов для интерактивного отображения"""
-    # Создаем экземпляр ProjectTreeBuilder
-    builder = ProjectTreeBuilder()
+    # Ключ кэша: настройки фильтров и подпись каталога (пути, mtime, размеры),
+    # поэтому запись живет между перезапусками и сбрасывается при изменении файлов
+    scan_depth = max_depth if max_depth is not None and max_depth > 0 else None
+    filters = _tree_filters(
+        include_patterns, exclude_patterns, max_file_size, show_excluded, scan_depth
+    )
+    cache = get_tree_cache()
+    cache_key = cache.make_key(
+        _TREE_FORMAT,
+        os.path.abspath(path),
+        scan_depth,
+        tuple(include_patterns or ()),
+        tuple(exclude_patterns or ()),
+        max_file_size,
+        show_excluded,
+        # Подпись обходит только папки, в которые спускается построитель
+        directory_signature(path, filters),
+    )
+    tree = cache.get(cache_key)
+    if tree is None:
+        tree = _build_file_tree_structure(
+            path,
+            include_patterns,
+            exclude_patterns,
+            max_file_size,
+            show_excluded,
+            scan_depth,
+        )
+        cache.set(cache_key, tree)
+    return tree
 
-    # Создаем временные FilterSettings для построения дерева
-    filters = FilterSettings(
+
+def _tree_filters(
+    include_patterns, exclude_patterns, max_file_size, show_excluded, max_depth
+):
+    """FilterSettings, с которыми строится и подписывается дерево проекта"""
+    return FilterSettings(
         include_patterns=include_patterns or [],
         exclude_patterns=exclude_patterns or [],
         max_file_size=FileSize(kb=max_file_size) if max_file_size else FileSize(kb=50),
         show_excluded=show_excluded,
-        max_depth=max_depth if max_depth is not None and max_depth > 0 else None,
+        max_depth=max_depth,
+    )
+
+
+def _build_file_tree_structure(
+    path, include_patterns, exclude_patterns, max_file_size, show_excluded, max_depth
+):
+    """Строит структуру файлов через ProjectTreeBuilder без кэширования"""
+    # Создаем экземпляр ProjectTreeBuilder; is_binary в структуру UI не попадает,
+    # поэтому содержимое файлов не читаем
+    builder = ProjectTreeBuilder(sniff_content=False)
+
+    filters = _tree_filters(
+        include_patterns, exclude_patterns, max_file_size, show_excluded, max_depth
     )
 
-    # Строим дерево с помощью ProjectTreeBuilder
+    # Строим дерево с помощью ProjectTreeBuilder и сразу получаем словарь для UI
     root_node = builder.build_tree(path, filters)
+    return root_node.to_dict() if root_node is not None else {}
 
-    # Конвертируем DirectoryNode в структуру словаря
-    # Convert DirectoryNode to a dictionary structure
-    def convert_to_dict(node, filters):
-        result = {}
-        if isinstance(node, DirectoryNode):
-            for child in node.children:
-                if isinstance(child, DirectoryNode):
-                    # Recursively convert child directory
-                    child_dict = convert_to_dict(child, filters)
-                    result[child.name] = {
-                        "type": "folder",
-                        "path": child.path,
-                        "excluded": child.is_excluded(filters),
-                        "children": child_dict,
-                    }
-                elif isinstance(child, FileNode):
-                    result[child.name] = {
-                        "type": "file",
-                        "path": child.path,
-                        "excluded": child.is_excluded(filters),
-                        "size": child.size,
-                    }
-            return result
-        elif isinstance(node, FileNode):
-            return {
-                node.name: {
-                    "type": "file",
-                    "path": node.path,
-                    "excluded": node.is_excluded(filters),
-                    "size": node.size,
-                }
-            }
-        else:
-            return {}
 
-    # Convert root_node to dictionary
-    return convert_to_dict(root_node, filters)
+# Расширения для кнопки "Code Files Only"
+_CODE_EXTENSIONS = frozenset(
+    {".py", ".js", ".ts", ".jsx", ".tsx", ".java", ".cpp", ".c", ".h"}
+)
 
 
-def render_file_tree_ui(structure, prefix="", selected_files=None, key_prefix=""):
-    """Отображает интерактивное дерево файлов с чекбоксами"""
-    if selected_files is None:
-        selected_files = set()
+def code_file_paths(file_index):
+    """Пути файлов с расширениями кода, собранные из by_ext индекса"""
+    by_ext = file_index["by_ext"]
+    return frozenset().union(*(by_ext.get(ext, ()) for ext in _CODE_EXTENSIONS))
 
-    newly_selected: set[str] = set(selected_files)  # Начинаем с текущего выбора
-    updated = False  # Флаг для отслеживания изменений
 
-    for name, info in structure.items():
-        current_key = f"{key_prefix}_{name}_{hash(info['path'])}"  # Используем hash для уникальности
-        indent = "　" * len(prefix.split("├── ")) if prefix else ""
+def iter_tree_files(structure):
+    """Пути не исключенных файлов дерева.
 
-        # Определяем, исключен ли элемент
-        is_excluded = info.get("excluded", False)
+    Обход стеком (deque) вместо рекурсии; исключенные папки пропускаются
+    вместе с содержимым.
+    """
+    stack = deque([structure.items()])
+    while stack:
+        for _name, info in stack.pop():
+            # Пропускаем исключенные элементы
+            if info.get("excluded", False):
+                continue
+            if info["type"] == "file":
+                yield info["path"]
+            elif info.get("children"):
+                stack.append(info["children"].items())
 
+
+def iter_tree_folders(structure):
+    """Пути не исключенных папок дерева; в исключенные папки не спускаемся"""
+    stack = deque([structure.items()])
+    while stack:
+        for _name, info in stack.pop():
+            if info["type"] != "folder" or info.get("excluded", False):
+                continue
+            yield info["path"]
+            if info.get("children"):
+                stack.append(info["children"].items())
+
+
+def build_file_index(structure):
+    """Плоский индекс не исключенных файлов дерева, строится один раз при сканировании.
+
+    "all" - пути файлов, "by_ext" - те же пути по расширению (в нижнем
+    регистре), "file_set" - frozenset путей для подсчета выбранных файлов,
+    "folders" - пути не исключенных папок для подписи генерации.
+    """
+    all_files = list(iter_tree_files(structure))
+    by_ext = defaultdict(list)
+    for path in all_files:
+        by_ext[os.path.splitext(path)[1].lower()].append(path)
+    return {
+        "all": all_files,
+        "by_ext": dict(by_ext),
+        "file_set": frozenset(all_files),
+        "folders": list(iter_tree_folders(structure)),
+    }
+
+
+def get_file_index():
+    """Индекс текущего дерева из session_state; строится, если его еще нет"""
+    index = st.session_state.get("file_tree_flat")
+    if index is None:
+        index = build_file_index(st.session_state.file_tree)
+        st.session_state.file_tree_flat = index
+    return index
+
+
+def count_selected_files(selected_files, file_index):
+    """Число выбранных путей, которые являются файлами.
+
+    Пути из отсканированного дерева считаются пересечением множеств; os.stat
+    нужен только для выбранного вне дерева (например, Quick Actions).
+    """
+    file_set = file_index["file_set"]
+    in_tree = len(file_set.intersection(selected_files))
+    outside = sum(
+        1 for path in selected_files if path not in file_set and os.path.isfile(path)
+    )
+    return in_tree + outside
+
+
+def get_selected_count():
+    """Счетчик выбранных файлов, пересчитываемый только при смене выбора.
+
+    Выбор (frozenset) и индекс дерева заменяются новыми объектами при каждом
+    изменении, поэтому проверка по идентичности позволяет на обычных rerun
+    не делать ни пересечения множеств, ни os.stat.
+    """
+    selected_files = st.session_state.filter_settings.selected_files
+    file_index = get_file_index()
+    cached = st.session_state.get("selected_count_cache")
+    if cached is not None and cached[0] is selected_files and cached[1] is file_index:
+        return cached[2]
+    count = count_selected_files(selected_files, file_index)
+    st.session_state.selected_count_cache = (selected_files, file_index, count)
+    return count
+
+
+def count_tree_items(structure):
+    """Число (папок, файлов) в дереве по итогам, собранным DirectoryNode.to_dict"""
+    folders = files = 0
+    for info in structure.values():
         if info["type"] == "folder":
-            # Получаем пути всех дочерних элементов (включая вложенные)
-            child_paths = get_all_child_paths(info, include_excluded=False)
-            # Проверяем, выбраны ли все дочерние элементы (только не исключенные)
-            all_children_selected = (
-                all(path in selected_files for path in child_paths)
-                if child_paths
-                else False
-            )
+            folders += 1 + info["folder_count"]
+            files += len(info["all_paths"])
+        else:
+            files += 1
+    return folders, files
 
-            # Определяем иконку и стиль для папки
-            if is_excluded:
-                folder_icon = "❌📁"
-                folder_label = f"~~{name}/~~"
-                disabled = True
+
+def count_selected_in_folders(structure, selected_files):
+    """Считает для каждой папки (выбрано, всего) не исключенных файлов за один обход"""
+    folders = []
+    stack = list(structure.values())
+    while stack:
+        info = stack.pop()
+        if info["type"] == "folder":
+            folders.append(info)
+            if info.get("children"):
+                stack.extend(info["children"].values())
+
+    # Обратный порядок обхода гарантирует, что вложенные папки уже посчитаны
+    counts = {}
+    for info in reversed(folders):
+        selected = total = 0
+        for child in (info.get("children") or {}).values():
+            if child.get("excluded", False):
+                continue
+            if child["type"] == "folder":
+                child_selected, child_total = counts[child["path"]]
+                selected += child_selected
+                total += child_total
             else:
-                folder_icon = "📁"
-                folder_label = f"{name}/"
-                disabled = False
-
-            # Folder checkbox
-            folder_selected = st.checkbox(
-                f"{indent}{folder_icon} {folder_label}",
-                value=all_children_selected and not is_excluded,
-                key=f"folder_{current_key}",
-                disabled=disabled,
-                help="Исключено фильтрами" if is_excluded else None,
-            )
+                total += 1
+                selected += child["path"] in selected_files
+        counts[info["path"]] = (selected, total)
+    return counts
 
-            # Если состояние папки изменилось
-            if folder_selected != all_children_selected and not is_excluded:
-                updated = True
-                if folder_selected:
-                    # Выбираем все дочерние элементы (только не исключенные)
-                    for child_path in child_paths:
-                        newly_selected.add(child_path)
-                else:
-                    # Снимаем выбор со всех дочерних элементов
-                    for child_path in get_all_child_paths(info, include_excluded=True):
-                        newly_selected.discard(child_path)
 
-            # Render children and get their selections
-            if info.get("children"):
-                child_selected = render_file_tree_ui(
-                    info["children"],
-                    prefix + "├── ",
-                    newly_selected,
-                    key_prefix + f"_{name}",
-                )
-                # Update selection with children's state only if there were changes
-                if child_selected != newly_selected:
-                    newly_selected = child_selected
-                    updated = True
+def flatten_file_tree(structure, selected_files):
+    """Разворачивает дерево файлов в строки таблицы в порядке обхода в глубину"""
+    selection_counts = count_selected_in_folders(structure, selected_files)
+    rows = []
+    nodes = []
+    stack = [(iter(structure.items()), 0)]
+    while stack:
+        entries, depth = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        name, info = entry
+        is_excluded = info.get("excluded", False)
+        indent = "　" * depth
 
+        if info["type"] == "folder":
+            selected_count, total_count = selection_counts[info["path"]]
+            selected = total_count > 0 and selected_count == total_count
+            icon = "❌📁" if is_excluded else "📁"
+            label = f"{indent}{icon} {name}/"
+            size_str = ""
         else:
-            # File checkbox
-            file_size_kb = info["size"] / 1024 if info["size"] > 0 else 0
-            size_str = f" ({file_size_kb:.1f} KB)" if file_size_kb > 0 else ""
-
-            # Определяем иконку и стиль для файла
-            if is_excluded:
-                file_icon = "❌📄"
-                file_label = f"~~{name}{size_str}~~"
-                disabled = True
-            else:
-                file_icon = "📄"
-                file_label = f"{name}{size_str}"
-                disabled = False
-
-            file_selected = st.checkbox(
-                f"{indent}{file_icon} {file_label}",
-                value=info["path"] in selected_files and not is_excluded,
-                key=f"file_{current_key}",
-                disabled=disabled,
-                help="Исключено фильтрами" if is_excluded else None,
-            )
+            selected = info["path"] in selected_files
+            icon = "❌📄" if is_excluded else "📄"
+            label = f"{indent}{icon} {name}"
+            size_str = f"{info['size'] / 1024:.1f} KB" if info["size"] > 0 else ""
 
-            if not is_excluded:
-                if file_selected and info["path"] not in selected_files:
-                    newly_selected.add(info["path"])
-                    updated = True
-                elif not file_selected and info["path"] in newly_selected:
-                    newly_selected.discard(info["path"])
-                    updated = True
+        rows.append(
+            {
+                "select": selected and not is_excluded,
+                "name": label,
+                "size": size_str,
+                "path": info["path"],
+            }
+        )
+        nodes.append(info)
+
+        if info["type"] == "folder" and info.get("children"):
+            stack.append((iter(info["children"].items()), depth + 1))
+
+    return rows, nodes
 
-    # Возвращаем обновленный набор только если были изменения
-    return newly_selected if updated else selected_files
+
+def render_file_tree_editor(structure, selected_files=None, key_prefix=""):
+    """Отображает дерево файлов одной таблицей st.data_editor вместо чекбоксов"""
+    if selected_files is None:
+        selected_files = set()
+
+    rows, nodes = flatten_file_tree(structure, selected_files)
+    if not rows:
+        return selected_files
+
+    df = pd.DataFrame(rows, columns=["select", "name", "size", "path"])
+    # Ключ зависит от выбора: после изменения таблица строится заново из состояния,
+    # и старые правки редактора не накладываются на новые данные
+    selection_key = hash(frozenset(selected_files))
+    edited = st.data_editor(
+        df,
+        column_config={
+            "select": st.column_config.CheckboxColumn(
+                "✓", help="Отметьте файлы или папки для обработки"
+            ),
+            "name": st.column_config.TextColumn("Имя"),
+            "size": st.column_config.TextColumn("Размер"),
+            "path": None,
+        },
+        disabled=["name", "size", "path"],
+        hide_index=True,
+        key=f"{key_prefix}_editor_{selection_key}",
+    )
+
+    changed = (edited["select"] != df["select"]).to_numpy().nonzero()[0]
+    if not len(changed):
+        return selected_files
+
+    # Счетчик правок: без них вызывающему коду не нужно сравнивать множества
+    st.session_state.selection_version = st.session_state.get("selection_version", 0) + 1
+    newly_selected: set[str] = set(selected_files)
+    for index in changed:
+        info = nodes[index]
+        # Исключенные фильтрами элементы выбрать нельзя
+        if info.get("excluded", False):
+            continue
+        checked = bool(edited["select"].iat[index])
+        if info["type"] == "folder":
+            if checked:
+                newly_selected.update(get_all_child_paths(info, include_excluded=False))
+            else:
+                newly_selected.difference_update(
+                    get_all_child_paths(info, include_excluded=True)
+                )
+        elif checked:
+            newly_selected.add(info["path"])
+        else:
+            newly_selected.discard(info["path"])
+
+    return newly_selected
 
 
 def get_all_child_paths(folder_info, include_excluded=True):
     """Получает все пути файлов в папке рекурсивно"""
+    # Узлы из get_file_tree_structure уже содержат готовые списки путей
+    cached = folder_info.get("all_paths" if include_excluded else "included_paths")
+    if cached is not None:
+        return cached
+
     paths = []
 
     def collect_paths(structure):
@@ -772,88 +997,79 @@ def get_all_child_paths(folder_info, include_excluded=True):
     return paths
 
 
-@st.cache_data(ttl=300, max_entries=10)
-def get_filtered_files_interactive(
-    path,
-    selected_files=None,
-    include_patterns=None,
-    exclude_patterns=None,
-    max_file_size=None,
-):
-    """Получает отфильтрованный список файлов на основе пользовательского выбора"""
-    if selected_files is None:
-        # Fallback to original logic if no selection
-        return get_filtered_files(path)
-
-    # Создаем временные FilterSettings для фильтрации
-    filters = FilterSettings(
-        include_patterns=include_patterns or [],
-        exclude_patterns=exclude_patterns or [],
-        max_file_size=FileSize(kb=max_file_size) if max_file_size else FileSize(kb=50),
-    )
-
-    # Создаем экземпляр ProjectTreeBuilder
-    builder = ProjectTreeBuilder()
-
-    # Строим дерево проекта
-    builder.build_tree(path, filters)
-
-    # Фильтруем выбранные файлы
-    filtered_files = []
-    for file_path in selected_files:
-        if os.path.isfile(file_path):
-            # Проверяем, не исключен ли файл по фильтрам
-            file_node = FileNode(
-                path=file_path,
-                name=os.path.basename(file_path),
-                size=os.path.getsize(file_path) if os.path.exists(file_path) else 0,
-                is_binary=builder._is_binary_file(file_path),
-            )
-
-            if not file_node.is_excluded(filters):
-                filtered_files.append(file_path)
-        elif os.path.isdir(file_path):
-            # Если выбрана папка, получаем все файлы из неё
-            for root, _dirs, files in os.walk(file_path):
-                for file in files:
-                    full_path = os.path.join(root, file)
-                    filtered_files.append(full_path)
+def show_copyable(text, language=None):
+    """Показывает текст в st.code со встроенной кнопкой копирования.
 
-    return filtered_files
+    Копирует сам браузер по клику пользователя на иконку блока. Скрипт с
+    navigator.clipboard без жеста пользователя браузер отклоняет
+    (NotAllowedError), поэтому сервер не копирует и не сообщает об успехе.
+    """
+    st.code(text, language=language, wrap_lines=True, height=300)
 
 
 # Функция для отображения истории с пагинацией и улучшенным UI
-def display_history_with_pagination(history, page_size=10):
-    total_records = len(history)
+def display_history_with_pagination(page_size=10):
+    # Номер страницы берем из состояния виджета до его отрисовки: один запрос
+    # к БД возвращает и строки страницы, и общее число записей
+    page_number = st.session_state.get("history_page", 1)
+    paginated_history, total_records = get_history(page_number, page_size)
     total_pages = math.ceil(total_records / page_size) if total_records > 0 else 1
 
     if total_records == 0:
         st.info("📝 История пуста. Создайте свой первый запрос!")
         return
 
+    # После удаления записей страница может оказаться за концом истории
+    if page_number > total_pages:
+        page_number = total_pages
+        st.session_state.history_page = page_number
+        paginated_history, total_records = get_history(page_number, page_size)
+
     # Пагинация
     page_number = st.number_input(
-        "Страница", min_value=1, max_value=total_pages, value=1, step=1
+        "Страница",
+        min_value=1,
+        max_value=total_pages,
+        step=1,
+        key="history_page",
     )
-    start_index = (page_number - 1) * page_size
-    end_index = start_index + page_size
-    paginated_history = history[start_index:end_index]
 
     # Отображение заголовков с улучшенным дизайном
     st.markdown("### 📊 История Запросов")
 
+    # Пакетное удаление: Delete только ставит запись в очередь, а Apply
+    # удаляет всю очередь одной транзакцией
+    batch_delete = st.checkbox(
+        "Queue deletions",
+        key="history_batch_delete",
+        help="Collect deletions and apply them together",
+    )
+    pending_deletes = st.session_state.setdefault("pending_deletes", set())
+    if pending_deletes:
+        queue_col, apply_col, discard_col = st.columns([4, 1, 1])
+        with queue_col:
+            st.info(f"🗑️ {len(pending_deletes)} records queued for deletion")
+        with apply_col:
+            if st.button("Apply", key="apply_pending_deletes", type="primary"):
+                delete_records(sorted(pending_deletes))
+                pending_deletes.clear()
+                st.rerun()
+        with discard_col:
+            if st.button("Discard", key="discard_pending_deletes"):
+                pending_deletes.clear()
+                st.rerun()
+
     # Создаем DataFrame для лучшего отображения
     display_data = []
     for record in paginated_history:
-        # record structure: id, project_path, template_name, markdown_content, reference_url, processed_at, file_count, filter_settings, project_name
+        # record structure: id, project_path, template_name, markdown_content, reference_url, processed_at, file_count, filters_summary, project_name
         record_id = record[0] if len(record) > 0 else "N/A"
         project_path = record[1] if len(record) > 1 else "N/A"
         template_name = record[2] if len(record) > 2 else "N/A"
-        markdown_content = record[3] if len(record) > 3 else ""
         reference_url = record[4] if len(record) > 4 else ""
         processed_at = record[5] if len(record) > 5 else "N/A"
         file_count = record[6] if len(record) > 6 else 0
-        filter_settings = record[7] if len(record) > 7 else None
+        filter_info = (record[7] if len(record) > 7 else None) or "No filters"
         project_name = (
             record[8]
             if len(record) > 8
@@ -862,36 +1078,6 @@ def display_history_with_pagination(history, page_size=10):
             else "Unknown"
         )
 
-        # Parsing filter settings
-        filter_info = "No filters"
-        if filter_settings:
-            try:
-                settings = json.loads(filter_settings)
-                include_patterns = settings.get("include_patterns", [])
-                exclude_patterns = settings.get("exclude_patterns", [])
-                max_file_size = settings.get("max_file_size", 0)
-                selected_count = settings.get("selected_files_count", 0)
-
-                filter_parts = []
-                if include_patterns:
-                    filter_parts.append(
-                        f"Include: {', '.join(include_patterns[:3])}{'...' if len(include_patterns) > 3 else ''}"
-                    )
-                if exclude_patterns:
-                    filter_parts.append(
-                        f"Exclude: {', '.join(exclude_patterns[:2])}{'...' if len(exclude_patterns) > 2 else ''}"
-                    )
-                if max_file_size:
-                    filter_parts.append(f"Max: {max_file_size}KB")
-                if selected_count:
-                    filter_parts.append(f"Selected: {selected_count}")
-
-                filter_info = (
-                    " | ".join(filter_parts) if filter_parts else "Default filters"
-                )
-            except (KeyError, TypeError, AttributeError):
-                filter_info = "Legacy format"
-
         display_data.append(
             {
                 "ID": record_id,
@@ -903,16 +1089,36 @@ def display_history_with_pagination(history, page_size=10):
                 if processed_at != "N/A"
                 else "N/A",  # Remove microseconds
                 "Path": project_path,
-                "Content": markdown_content,
                 "Reference": reference_url,
             }
         )
 
-    # Отображение данных
-    for _i, data in enumerate(display_data):
-        with st.expander(
-            f"🗂️ {data['Project']} - {data['Template']} ({data['Date']})", expanded=False
-        ):
+    # Отображение данных: тяжелые элементы управления создаются только для
+    # открытой записи, остальные строки - заголовок и одна кнопка
+    expanded_id = st.session_state.get("history_expanded_id")
+    for index, data in enumerate(display_data):
+        title = f"🗂️ {data['Project']} - {data['Template']} ({data['Date']})"
+        if data["ID"] != expanded_id:
+            title_col, open_col = st.columns([5, 1])
+            with title_col:
+                st.markdown(title)
+            with open_col:
+                if st.button("Open", key=f"open_{data['ID']}"):
+                    st.session_state.history_expanded_id = data["ID"]
+                    st.rerun()
+            continue
+
+        with st.expander(title, expanded=True):
+            if st.button("Close", key=f"close_{data['ID']}"):
+                st.session_state.history_expanded_id = None
+                st.rerun()
+
+            # Содержимое запрашивается из БД только для открытой записи
+            markdown_content = fetch_markdown_content(data["ID"])
+            # Следующую запись скорее всего откроют следующей
+            if index + 1 < len(display_data):
+                _prefetch(fetch_markdown_content, display_data[index + 1]["ID"])
+
             # Основная информация
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -925,19 +1131,11 @@ def display_history_with_pagination(history, page_size=10):
                 st.markdown(
                     f"**🔗 Reference:** {data['Reference'] if data['Reference'] else 'None'}"
                 )
-                if data["Path"] != "N/A":
-                    if st.button(
-                        "📋 Copy Path",
-                        key=f"copy_path_{data['ID']}",
-                        help="Copy project path",
-                    ):
-                        pyperclip.copy(data["Path"])
-                        st.toast("Project path copied!", icon="✅")
 
             # Информация о фильтрах
             st.markdown(f"**⚙️ Filters Applied:** {data['Filters']}")
 
-            # Полный путь (без вложенного expander)
+            # Полный путь (без вложенного expander), копируется кнопкой st.code
             if data["Path"] != "N/A":
                 st.markdown("**📂 Full Path:**")
                 st.code(data["Path"], language=None)
@@ -947,13 +1145,11 @@ def display_history_with_pagination(history, page_size=10):
             action_col1, action_col2, action_col3, action_col4 = st.columns(4)
 
             with action_col1:
-                if st.button(
+                show_content = st.button(
                     "📋 Copy Content",
                     key=f"copy_content_{data['ID']}",
-                    help="Copy markdown content",
-                ):
-                    pyperclip.copy(data["Content"])
-                    st.toast("Content copied to clipboard!", icon="✅")
+                    help="Show markdown content with a copy button",
+                )
 
             with action_col2:
                 download_format = st.selectbox(
@@ -964,29 +1160,38 @@ def display_history_with_pagination(history, page_size=10):
                 )
 
             with action_col3:
-                if data["Content"]:
-                    content, filename, mime_type = prepare_file_content(
-                        data["Content"], download_format, data["Path"]
-                    )
-                    st.download_button(
-                        label=f"💾 Download {download_format.upper()}",
-                        data=content,
-                        file_name=filename,
-                        mime=mime_type,
+                if markdown_content:
+                    download_button(
+                        f"💾 Download {download_format.upper()}",
+                        markdown_content,
+                        download_format,
+                        data["Path"],
                         key=f"download_{data['ID']}_{download_format}",
                     )
 
             with action_col4:
-                if st.button(
+                if data["ID"] in pending_deletes:
+                    st.caption("Queued for deletion")
+                elif st.button(
                     "🗑️ Delete",
                     key=f"delete_{data['ID']}",
                     help="Delete this record",
                     type="secondary",
                 ):
-                    delete_record(data["ID"])
-                    st.success("Record deleted!")
+                    if batch_delete:
+                        pending_deletes.add(data["ID"])
+                    else:
+                        delete_records([data["ID"]])
+                        st.success("Record deleted!")
                     st.rerun()
 
+            if show_content:
+                show_copyable(markdown_content, language="markdown")
+
+    # Следующая страница загружается в фоне, пока пользователь смотрит текущую
+    if page_number < total_pages:
+        _prefetch(get_history, page_number + 1, page_size)
+
     # Информация о пагинации
     if total_pages > 1:
         st.markdown(
@@ -995,46 +1200,94 @@ def display_history_with_pagination(history, page_size=10):
 
 
 # Получаем уникальные пути из истории
+@st.cache_data(ttl=60, show_spinner=False)
 def get_unique_project_paths(limit=10):
     """Извлекает уникальные пути из истории запросов."""
-    conn = sqlite3.connect("code2markdown.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT DISTINCT project_path
-        FROM requests
-        ORDER BY processed_at DESC
-        LIMIT ?
-    """,
-        (limit,),
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return [row[0] for row in rows]
+    # Читаем через долгоживущее соединение репозитория вместо connect/close на rerun
+    return history_repository.get_recent_project_paths(limit)
 
 
 # Новые функции для улучшенного управления фильтрами
+def _update_filters(**changes):
+    """Заменяет в st.session_state.filter_settings только переданные поля.
+
+    Остальные поля (в том числе selected_files и max_depth) копируются
+    dataclasses.replace. Значения, равные текущим, отбрасываются: если
+    ничего не изменилось, объект в session_state остается прежним.
+    Выбор файлов хранится как frozenset: неизменяемое множество можно
+    отдавать кнопкам выбора без копирования, а его хэш считается один раз.
+    Возвращает True, если настройки были заменены.
+    """
+    current = st.session_state.filter_settings
+    if changes.get("selected_files") is not None:
+        changes["selected_files"] = frozenset(changes["selected_files"])
+    # Паттерны в FilterSettings хранятся кортежами; списки из UI приводим к
+    # ним, чтобы сравнение с текущими значениями было корректным
+    for name in ("include_patterns", "exclude_patterns"):
+        if isinstance(changes.get(name), list):
+            changes[name] = tuple(changes[name])
+    changes = {
+        name: value for name, value in changes.items() if getattr(current, name) != value
+    }
+    if not changes:
+        return False
+    st.session_state.filter_settings = dataclasses.replace(current, **changes)
+    return True
+
+
+def _parse_pattern_lines(text):
+    """Разбирает текст textarea в список паттернов, по одному на строку."""
+    return [pattern.strip() for pattern in text.split("\n") if pattern.strip()]
+
+
+def merge_patterns(current, additions):
+    """Дописывает к паттернам отсутствующие в них новые, сохраняя порядок.
+
+    Возвращает (итоговый список, реально добавленные паттерны).
+    """
+    known = set(current)
+    added = [pattern for pattern in dict.fromkeys(additions) if pattern not in known]
+    return [*current, *added], added
+
+
+def _stat_key(path):
+    """(mtime_ns, size) файла для ключей кэша или None, если файла нет"""
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+@functools.lru_cache(maxsize=64)
+def _read_gitignore_cached(gitignore_path, stat_key):
+    """Разбирает .gitignore один раз на (путь, mtime, размер)"""
+    with open(gitignore_path, encoding="utf-8") as f:
+        # Пропускаем пустые строки и комментарии
+        return tuple(
+            line
+            for line in (raw.strip() for raw in f)
+            if line and not line.startswith("#")
+        )
+
+
 def read_gitignore_patterns(project_path):
     """Читает паттерны из .gitignore файла"""
     gitignore_path = os.path.join(project_path, ".gitignore")
-    patterns = []
+    stat_key = _stat_key(gitignore_path)
+    if stat_key is None:
+        return []
 
-    if os.path.exists(gitignore_path):
-        try:
-            with open(gitignore_path, encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    # Пропускаем пустые строки и комментарии
-                    if line and not line.startswith("#"):
-                        patterns.append(line)
-        except (FileNotFoundError, PermissionError, UnicodeDecodeError) as e:
-            st.warning(f"Could not read .gitignore: {str(e)}")
-
-    return patterns
+    try:
+        return list(_read_gitignore_cached(gitignore_path, stat_key))
+    except (FileNotFoundError, PermissionError, UnicodeDecodeError) as e:
+        st.warning(f"Could not read .gitignore: {str(e)}")
+        return []
 
 
+@st.cache_data(ttl=30, show_spinner=False)
 def get_ai_agents_folders(project_path):
-    """Получает пути к папкам AI Agents"""
+    """Получает пути к папкам AI Agents (кэш на 30 секунд, сброс - кнопка Rescan)"""
     folders = []
 
     # Ищем memory-bank папку (RooCode)
@@ -1050,14 +1303,88 @@ def get_ai_agents_folders(project_path):
     return folders
 
 
+@st.cache_data(ttl=30, show_spinner=False)
+def _count_files(folder_path, mtime_ns):
+    """Считает файлы в папке одним обходом os.scandir (как os.walk, без symlink-папок)"""
+    count = 0
+    stack = [folder_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.is_dir():
+                        count += 1
+                    elif not entry.is_symlink():
+                        stack.append(entry.path)
+        except OSError:
+            continue
+    return count
+
+
+def count_files(folder_path):
+    """Количество файлов в папке; кэш сбрасывается по mtime папки или через 30 секунд"""
+    try:
+        mtime_ns = os.stat(folder_path).st_mtime_ns
+    except OSError:
+        return 0
+    return _count_files(folder_path, mtime_ns)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
 def get_docs_folder(project_path):
-    """Получает путь к папке docs"""
+    """Получает путь к папке docs (кэш на 30 секунд, сброс - кнопка Rescan)"""
     docs_path = os.path.join(project_path, "docs")
     if os.path.isdir(docs_path):
         return docs_path
     return None
 
 
+def clear_project_probe_caches():
+    """Сбрасывает кэши проверок папок проекта, когда файловая система изменилась"""
+    get_ai_agents_folders.clear()
+    get_docs_folder.clear()
+    _count_files.clear()
+    _read_gitignore_cached.cache_clear()
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_name_patterns(patterns, with_extensions):
+    """Разбирает паттерны один раз: расширения, общий regex для wildcard и подстроки.
+
+    patterns - кортеж; результат кэшируется по содержимому паттернов, поэтому
+    повторные Quick Actions и rerun с теми же фильтрами не компилируют их заново.
+    """
+    extensions = set()
+    wildcards = []
+    substrings = []
+    for pattern in patterns:
+        pattern = pattern.strip().lower()
+        if not pattern:
+            continue
+        # Если паттерн начинается с точки - это расширение
+        if with_extensions and pattern.startswith("."):
+            extensions.add(pattern)
+        # Если содержит звездочку - это wildcard паттерн
+        elif "*" in pattern:
+            wildcards.append(fnmatch.translate(pattern))
+        # Иначе проверяем вхождение в имя файла
+        else:
+            substrings.append(pattern)
+    regex = re.compile("|".join(wildcards)) if wildcards else None
+    return frozenset(extensions), regex, tuple(substrings)
+
+
+def _name_matches(compiled_patterns, name):
+    """Проверяет имя файла (в нижнем регистре) по результату _compile_name_patterns"""
+    extensions, regex, substrings = compiled_patterns
+    if extensions and os.path.splitext(name)[1] in extensions:
+        return True
+    if regex is not None and regex.match(name):
+        return True
+    return any(substring in name for substring in substrings)
+
+
 def select_folder_files(
     folder_path, include_patterns=None, exclude_patterns=None, max_file_size=None
 ):
@@ -1067,72 +1394,47 @@ def select_folder_files(
     if not os.path.exists(folder_path):
         return selected_files
 
-    for root, _dirs, files in os.walk(folder_path):
-        for file in files:
-            file_path = os.path.join(root, file)
+    # Все фильтры компилируются до обхода и проверяются одним предикатом
+    include = (
+        _compile_name_patterns(tuple(include_patterns), True)
+        if include_patterns
+        else None
+    )
+    exclude = (
+        _compile_name_patterns(tuple(exclude_patterns), False)
+        if exclude_patterns
+        else None
+    )
+    max_bytes = max_file_size * 1024 if max_file_size else None  # max_file_size в KB
 
-            # Проверяем размер файла
-            if max_file_size:
-                try:
-                    file_size = os.path.getsize(file_path)
-                    if file_size > max_file_size * 1024:  # max_file_size в KB
-                        continue
-                except (OSError, ValueError):
-                    continue
-
-            # Проверяем include patterns
-            if include_patterns:
-                filename = os.path.basename(file_path)
-                file_ext = os.path.splitext(filename)[1].lower()
-                should_include = False
-
-                for pattern in include_patterns:
-                    pattern = pattern.strip()
-                    if not pattern:
+    # Обход как у os.walk: по символическим ссылкам на папки не спускаемся
+    stack = [folder_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
                         continue
-                    # Если паттерн начинается с точки - это расширение
-                    if pattern.startswith("."):
-                        if file_ext == pattern.lower():
-                            should_include = True
-                            break
-                    # Если содержит звездочку - это wildcard паттерн
-                    elif "*" in pattern:
-                        if fnmatch.fnmatch(filename.lower(), pattern.lower()):
-                            should_include = True
-                            break
-                    # Иначе проверяем вхождение в имя файла
-                    else:
-                        if pattern.lower() in filename.lower():
-                            should_include = True
-                            break
 
-                if not should_include:
-                    continue
-
-            # Проверяем exclude patterns
-            if exclude_patterns:
-                filename = os.path.basename(file_path)
-                should_exclude_file = False
+                    if max_bytes is not None:
+                        try:
+                            if entry.stat().st_size > max_bytes:
+                                continue
+                        except OSError:
+                            continue
 
-                for pattern in exclude_patterns:
-                    pattern = pattern.strip()
-                    if not pattern:
+                    name = entry.name.lower()
+                    if include is not None and not _name_matches(include, name):
+                        continue
+                    if exclude is not None and _name_matches(exclude, name):
                         continue
-                    # Если содержит звездочку - это wildcard паттерн
-                    if "*" in pattern:
-                        if fnmatch.fnmatch(filename.lower(), pattern.lower()):
-                            should_exclude_file = True
-                            break
-                    # Иначе проверяем вхождение
-                    else:
-                        if pattern.lower() in filename.lower():
-                            should_exclude_file = True
-                            break
-
-                if should_exclude_file:
-                    continue
 
-            selected_files.add(file_path)
+                    selected_files.add(entry.path)
+        except OSError:
+            continue
 
     return selected_files
 
@@ -1262,27 +1564,27 @@ try:
                     gitignore_patterns = read_gitignore_patterns(project_path)
                     if gitignore_patterns:
                         # Добавляем новые паттерны к существующим
-                        # Create a new FilterSettings object with updated exclude patterns
-                        current_excludes = (
-                            st.session_state.filter_settings.exclude_patterns
+                        new_excludes, added = merge_patterns(
+                            st.session_state.filter_settings.exclude_patterns,
+                            gitignore_patterns,
                         )
-                        new_excludes = list(set(current_excludes + gitignore_patterns))
-                        try:
-                            st.session_state.filter_settings = FilterSettings(
-                                include_patterns=st.session_state.filter_settings.include_patterns,
-                                exclude_patterns=new_excludes,
-                                max_file_size=st.session_state.filter_settings.max_file_size,
-                                show_excluded=st.session_state.filter_settings.show_excluded,
+                        if not added:
+                            # Ничего не изменилось - rerun не нужен
+                            st.toast(
+                                "All .gitignore patterns are already excluded", icon="ℹ️"
                             )
-                        except ValueError as e:
-                            st.error(
-                                f"Ошибка валидации при добавлении паттернов из .gitignore: {str(e)}"
+                        else:
+                            try:
+                                _update_filters(exclude_patterns=new_excludes)
+                            except ValueError as e:
+                                st.error(
+                                    f"Ошибка валидации при добавлении паттернов из .gitignore: {str(e)}"
+                                )
+                            st.toast(
+                                f"Added {len(added)} patterns from .gitignore!",
+                                icon="✅",
                             )
-                        st.toast(
-                            f"Added {len(gitignore_patterns)} patterns from .gitignore!",
-                            icon="✅",
-                        )
-                        st.rerun()
+                            st.rerun()
                     else:
                         st.toast("No .gitignore found or no patterns to add", icon="ℹ️")
                 else:
@@ -1310,13 +1612,7 @@ try:
                             folder_names.append(f"{folder_name} ({agent_type})")
 
                         try:
-                            st.session_state.filter_settings = FilterSettings(
-                                include_patterns=st.session_state.filter_settings.include_patterns,
-                                exclude_patterns=st.session_state.filter_settings.exclude_patterns,
-                                max_file_size=st.session_state.filter_settings.max_file_size,
-                                selected_files=selected_files,
-                                show_excluded=st.session_state.filter_settings.show_excluded,
-                            )
+                            _update_filters(selected_files=selected_files)
                         except ValueError as e:
                             st.error(f"Ошибка валидации при выборе AI Agents: {str(e)}")
                         st.toast(
@@ -1343,13 +1639,7 @@ try:
                             st.session_state.filter_settings.max_file_size.kb,
                         )
                         try:
-                            st.session_state.filter_settings = FilterSettings(
-                                include_patterns=st.session_state.filter_settings.include_patterns,
-                                exclude_patterns=st.session_state.filter_settings.exclude_patterns,
-                                max_file_size=st.session_state.filter_settings.max_file_size,
-                                selected_files=docs_files,
-                                show_excluded=st.session_state.filter_settings.show_excluded,
-                            )
+                            _update_filters(selected_files=docs_files)
                         except ValueError as e:
                             st.error(f"Ошибка валидации при выборе docs folder: {str(e)}")
                         st.toast(
@@ -1404,18 +1694,13 @@ try:
                 value="\n".join(st.session_state.filter_settings.include_patterns),
                 help="Examples: .py, .js, *.md, config.json",
             )
+            new_includes = _parse_pattern_lines(include_input)
+            # Порядок и повторы строк на фильтрацию не влияют
             try:
-                # Create a new FilterSettings object with updated include patterns
-                st.session_state.filter_settings = FilterSettings(
-                    include_patterns=[
-                        pattern.strip()
-                        for pattern in include_input.split("\n")
-                        if pattern.strip()
-                    ],
-                    exclude_patterns=st.session_state.filter_settings.exclude_patterns,
-                    max_file_size=st.session_state.filter_settings.max_file_size,
-                    show_excluded=st.session_state.filter_settings.show_excluded,
-                )
+                if set(new_includes) != set(
+                    st.session_state.filter_settings.include_patterns
+                ):
+                    _update_filters(include_patterns=new_includes)
             except ValueError as e:
                 st.error(f"Ошибка валидации include patterns: {str(e)}")
 
@@ -1426,18 +1711,13 @@ try:
                 value="\n".join(st.session_state.filter_settings.exclude_patterns),
                 help="Examples: node_modules, __pycache__, *.log, temp",
             )
+            new_excludes = _parse_pattern_lines(exclude_input)
+            # Порядок и повторы строк на фильтрацию не влияют
             try:
-                # Create a new FilterSettings object with updated exclude patterns
-                st.session_state.filter_settings = FilterSettings(
-                    include_patterns=st.session_state.filter_settings.include_patterns,
-                    exclude_patterns=[
-                        pattern.strip()
-                        for pattern in exclude_input.split("\n")
-                        if pattern.strip()
-                    ],
-                    max_file_size=st.session_state.filter_settings.max_file_size,
-                    show_excluded=st.session_state.filter_settings.show_excluded,
-                )
+                if set(new_excludes) != set(
+                    st.session_state.filter_settings.exclude_patterns
+                ):
+                    _update_filters(exclude_patterns=new_excludes)
             except ValueError as e:
                 st.error(f"Ошибка валидации exclude patterns: {str(e)}")
 
@@ -1453,12 +1733,7 @@ try:
         # Update filter_settings with new max_file_size if changed
         if new_max_size != st.session_state.filter_settings.max_file_size.kb:
             try:
-                st.session_state.filter_settings = FilterSettings(
-                    include_patterns=st.session_state.filter_settings.include_patterns,
-                    exclude_patterns=st.session_state.filter_settings.exclude_patterns,
-                    max_file_size=FileSize(kb=new_max_size),
-                    show_excluded=st.session_state.filter_settings.show_excluded,
-                )
+                _update_filters(max_file_size=FileSize(kb=new_max_size))
             except ValueError as e:
                 st.error(f"Ошибка валидации максимального размера файла: {str(e)}")
 
@@ -1472,12 +1747,7 @@ try:
         # Update filter_settings with new show_excluded if changed
         if new_show_excluded != st.session_state.filter_settings.show_excluded:
             try:
-                st.session_state.filter_settings = FilterSettings(
-                    include_patterns=st.session_state.filter_settings.include_patterns,
-                    exclude_patterns=st.session_state.filter_settings.exclude_patterns,
-                    max_file_size=st.session_state.filter_settings.max_file_size,
-                    show_excluded=new_show_excluded,
-                )
+                _update_filters(show_excluded=new_show_excluded)
             except ValueError as e:
                 st.error(f"Ошибка валидации настроек отображения: {str(e)}")
 
@@ -1491,18 +1761,19 @@ try:
         value=0,
         help="0 - без ограничений, 1 - только корень, 2 - до 2 уровней",
     )
-    current = st.session_state.filter_settings
-    st.session_state.filter_settings = FilterSettings(
-        include_patterns=current.include_patterns,
-        exclude_patterns=current.exclude_patterns,
-        max_file_size=current.max_file_size,
-        show_excluded=current.show_excluded,
-        selected_files=current.selected_files,
-        max_depth=max_depth if max_depth > 0 else None,
-    )
+    new_max_depth = max_depth if max_depth > 0 else None
+    if new_max_depth != st.session_state.filter_settings.max_depth:
+        _update_filters(max_depth=new_max_depth)
 
     # Информационная панель о доступных специальных папках
     if project_path and os.path.isdir(project_path):
+        if st.button(
+            "🔄 Rescan",
+            key="rescan_project_probes",
+            help="Re-check AI Agents, docs and .gitignore after changing files on disk",
+        ):
+            clear_project_probe_caches()
+
         info_col1, info_col2, info_col3 = st.columns(3)
 
         with info_col1:
@@ -1510,9 +1781,7 @@ try:
             if ai_folders:
                 folder_info = []
                 for folder_name, folder_path, agent_type in ai_folders:
-                    file_count = sum(
-                        1 for _, _, files in os.walk(folder_path) for _ in files
-                    )
+                    file_count = count_files(folder_path)
                     folder_info.append(
                         f"**{agent_type}** ({folder_name}): {file_count} files"
                     )
@@ -1523,9 +1792,7 @@ try:
         with info_col2:
             docs_path = get_docs_folder(project_path)
             if docs_path:
-                docs_file_count = sum(
-                    1 for _, _, files in os.walk(docs_path) for _ in files
-                )
+                docs_file_count = count_files(docs_path)
                 st.info(f"📚 **Docs Folder:** {docs_file_count} files")
             else:
                 st.info("📚 **Docs Folder:** Not found")
@@ -1546,22 +1813,9 @@ try:
                 if st.button("Сканировать папку", key="scan_button"):
                     # Показываем индикатор загрузки
                     with st.spinner("Scanning project structure..."):
-                        # Создаем временные FilterSettings для построения дерева
-                        filters = FilterSettings(
-                            include_patterns=st.session_state.filter_settings.include_patterns
-                            or [],
-                            exclude_patterns=st.session_state.filter_settings.exclude_patterns
-                            or [],
-                            max_file_size=st.session_state.filter_settings.max_file_size,
-                            show_excluded=st.session_state.filter_settings.show_excluded,
-                            max_depth=st.session_state.filter_settings.max_depth,
-                        )
+                        filters = st.session_state.filter_settings
 
-                        # Получаем структуру файлов
-                        builder = ProjectTreeBuilder()
-                        file_tree = builder.build_tree(project_path, filters)
-
-                        # Конвертируем DirectoryNode в словарь перед сохранением
+                        # Получаем структуру файлов (из дискового кэша, если каталог не менялся)
                         st.session_state.file_tree = get_file_tree_structure(
                             project_path,
                             max_depth=filters.max_depth,
@@ -1570,27 +1824,20 @@ try:
                             max_file_size=filters.max_file_size.kb,
                             show_excluded=filters.show_excluded,
                         )
-
-                    # Считаем количество файлов и папок
-                    def count_items(structure):
-                        folders = 0
-                        files = 0
-                        for _name, info in structure.items():
-                            if info["type"] == "folder":
-                                folders += 1
-                                if info.get("children"):
-                                    child_folders, child_files = count_items(
-                                        info["children"]
-                                    )
-                                    folders += child_folders
-                                    files += child_files
-                            else:
-                                files += 1
-                        return folders, files
+                        # Плоский индекс для кнопок выбора и счетчика выбранных
+                        st.session_state.file_tree_flat = build_file_index(
+                            st.session_state.file_tree
+                        )
+                        # Генерация с теми же путем и фильтрами берет подпись из дерева
+                        st.session_state.file_tree_source = _tree_source_key(
+                            project_path, filters
+                        )
 
                     # Показываем статистику
                     if st.session_state.file_tree:
-                        folder_count, file_count = count_items(st.session_state.file_tree)
+                        folder_count, file_count = count_tree_items(
+                            st.session_state.file_tree
+                        )
                         st.success(
                             f"Scan complete: {folder_count} folders, {file_count} files found"
                         )
@@ -1611,30 +1858,8 @@ try:
                             key="select_all_btn",
                         ):
                             if st.session_state.get("file_tree"):
-                                all_paths = []
-
-                                def collect_all_paths(structure):
-                                    for _name, info in structure.items():
-                                        # Пропускаем исключенные элементы
-                                        if not info.get("excluded", False):
-                                            if info["type"] == "file":
-                                                all_paths.append(info["path"])
-                                            elif info["type"] == "folder" and info.get(
-                                                "children"
-                                            ):
-                                                # Добавляем только файлы, не папки
-                                                collect_all_paths(info["children"])
-
-                                collect_all_paths(st.session_state.file_tree)
-                                # Создаем новую FilterSettings с обновленным selected_files
-                                current = st.session_state.filter_settings
-                                st.session_state.filter_settings = FilterSettings(
-                                    include_patterns=current.include_patterns,
-                                    exclude_patterns=current.exclude_patterns,
-                                    max_file_size=current.max_file_size,
-                                    show_excluded=current.show_excluded,
-                                    selected_files=set(all_paths),
-                                    max_depth=current.max_depth,
+                                _update_filters(
+                                    selected_files=get_file_index()["file_set"]
                                 )
                             else:
                                 st.warning("Please scan the project structure first")
@@ -1645,42 +1870,8 @@ try:
                             help="Select only code files",
                             key="code_only_btn",
                         ):
-                            code_extensions = [
-                                ".py",
-                                ".js",
-                                ".ts",
-                                ".jsx",
-                                ".tsx",
-                                ".java",
-                                ".cpp",
-                                ".c",
-                                ".h",
-                            ]
-                            code_paths = []
-
-                            def collect_code_paths(structure):
-                                for name, info in structure.items():
-                                    # Пропускаем исключенные элементы
-                                    if not info.get("excluded", False):
-                                        if info["type"] == "file":
-                                            _, ext = os.path.splitext(name)
-                                            if ext.lower() in code_extensions:
-                                                code_paths.append(info["path"])
-                                        elif info["type"] == "folder" and info.get(
-                                            "children"
-                                        ):
-                                            collect_code_paths(info["children"])
-
-                            collect_code_paths(file_tree)
-                            # Создаем новую FilterSettings с обновленным selected_files
-                            current = st.session_state.filter_settings
-                            st.session_state.filter_settings = FilterSettings(
-                                include_patterns=current.include_patterns,
-                                exclude_patterns=current.exclude_patterns,
-                                max_file_size=current.max_file_size,
-                                show_excluded=current.show_excluded,
-                                selected_files=set(code_paths),
-                                max_depth=current.max_depth,
+                            _update_filters(
+                                selected_files=code_file_paths(get_file_index())
                             )
 
                     with sel_col3:
@@ -1689,41 +1880,33 @@ try:
                             help="Deselect all files",
                             key="clear_selection_btn",
                         ):
-                            # Создаем новую FilterSettings с пустым selected_files
-                            current = st.session_state.filter_settings
-                            st.session_state.filter_settings = FilterSettings(
-                                include_patterns=current.include_patterns,
-                                exclude_patterns=current.exclude_patterns,
-                                max_file_size=current.max_file_size,
-                                show_excluded=current.show_excluded,
-                                selected_files=set(),
-                                max_depth=current.max_depth,
-                            )
+                            _update_filters(selected_files=frozenset())
 
                     # Отображаем количество выбранных файлов
-                    selected_count = len(
-                        [
-                            path
-                            for path in st.session_state.filter_settings.selected_files
-                            if os.path.isfile(path)
-                        ]
-                    )
+                    selected_count = get_selected_count()
                     st.info(f"📊 Selected files: {selected_count}")
 
                     # Отладочная информация
                     # st.write(f"DEBUG: selected_files length: {len(st.session_state.filter_settings.selected_files)}")
                     # st.write(f"DEBUG: file_tree keys: {list(st.session_state.file_tree.keys()) if st.session_state.get('file_tree') else 'No file tree'}")
 
-                    # Рендерим дерево файлов с чекбоксами
-                    newly_selected = render_file_tree_ui(
+                    # Рендерим дерево файлов таблицей с чекбоксами
+                    newly_selected = render_file_tree_editor(
                         file_tree,
                         selected_files=st.session_state.filter_settings.selected_files,
                         key_prefix="tree",
                     )
 
-                    # Обновляем выбранные файлы только если есть изменения
-                    if newly_selected != st.session_state.filter_settings.selected_files:
-                        st.session_state.filter_settings.selected_files = newly_selected
+                    # Обновляем выбранные файлы только если в таблице были правки:
+                    # сравнение чисел вместо сравнения множеств на каждом rerun
+                    selection_version = st.session_state.get("selection_version", 0)
+                    if selection_version != st.session_state.get(
+                        "selection_version_applied", 0
+                    ):
+                        st.session_state.selection_version_applied = selection_version
+                        if _update_filters(selected_files=newly_selected):
+                            # Перерисовываем, чтобы отметки папок отразились на файлах
+                            st.rerun()
                 else:
                     st.info("Нажмите 'Сканировать папку' для отображения структуры")
             except NameError as e:
@@ -1741,7 +1924,7 @@ try:
     st.subheader("🚀 Actions")
 
     # Основные действия
-    col1, col2, col3 = st.columns(3)
+    col1, col2 = st.columns(2)
     with col1:
         if st.button(
             "Generate Markdown",
@@ -1769,15 +1952,6 @@ try:
             else:
                 st.error("Please provide a valid project directory path.")
     with col2:
-        if st.button(
-            "📋 Copy to Clipboard", help="Copy the generated Markdown to your clipboard"
-        ):
-            if st.session_state.markdown_content:
-                pyperclip.copy(st.session_state.markdown_content)
-                st.toast("Markdown content copied to clipboard!", icon="✅")
-            else:
-                st.error("No Markdown content to copy. Please generate Markdown first.")
-    with col3:
         if st.button("🔄 Refresh", help="Clear the generated Markdown content"):
             st.session_state.markdown_content = ""
             st.toast("Markdown content cleared!", icon="✅")
@@ -1787,54 +1961,41 @@ try:
         st.subheader("💾 Download Options")
         download_col1, download_col2, download_col3 = st.columns(3)
 
+        # Данные готовятся при нажатии: одна копия контента в session_state
         with download_col1:
             # Скачивание в формате TXT
-            txt_content, txt_filename, txt_mime = prepare_file_content(
-                st.session_state.markdown_content, "txt", st.session_state.project_path
-            )
-            st.download_button(
-                label="📄 Download as TXT",
-                data=txt_content,
-                file_name=txt_filename,
-                mime=txt_mime,
+            download_button(
+                "📄 Download as TXT",
+                st.session_state.markdown_content,
+                "txt",
+                st.session_state.project_path,
                 help="Download as plain text file",
             )
 
         with download_col2:
             # Скачивание в формате MD
-            md_content, md_filename, md_mime = prepare_file_content(
-                st.session_state.markdown_content, "md", st.session_state.project_path
-            )
-            st.download_button(
-                label="📝 Download as MD",
-                data=md_content,
-                file_name=md_filename,
-                mime=md_mime,
+            download_button(
+                "📝 Download as MD",
+                st.session_state.markdown_content,
+                "md",
+                st.session_state.project_path,
                 help="Download as Markdown file",
             )
 
         with download_col3:
             # Скачивание в формате XML
-            xml_content, xml_filename, xml_mime = prepare_file_content(
-                st.session_state.markdown_content, "xml", st.session_state.project_path
-            )
-            st.download_button(
-                label="🗂️ Download as XML",
-                data=xml_content,
-                file_name=xml_filename,
-                mime=xml_mime,
+            download_button(
+                "🗂️ Download as XML",
+                st.session_state.markdown_content,
+                "xml",
+                st.session_state.project_path,
                 help="Download as XML file",
             )
 
-    # Display generated Markdown
+    # Сгенерированный Markdown в st.code: копируется встроенной кнопкой браузера
     if st.session_state.markdown_content:
         st.subheader("📝 Generated Markdown")
-        st.text_area(
-            "Generated Markdown",
-            st.session_state.markdown_content,
-            height=300,
-            label_visibility="collapsed",
-        )
+        show_copyable(st.session_state.markdown_content, language="markdown")
 
     # Error handling for invalid paths
     if project_path and not os.path.isdir(project_path):
@@ -1844,12 +2005,7 @@ try:
 
     elif page == "История запросов":
         st.title("📜 История запросов")
-        history = get_history()
-
-        if history:
-            display_history_with_pagination(history)
-        else:
-            st.info("История запросов пуста.")
+        display_history_with_pagination()
 
 except tornado.iostream.StreamClosedError:
     st.warning("Соединение прервано. Пожалуйста, перезагрузите страницу.")
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 
 from code2markdown.domain.request import GenerationRequest
 
@@ -11,12 +12,50 @@ class IHistoryRepository(ABC):
         """Save a generation request to the repository."""
         pass
 
+    def save_many(self, requests: list[GenerationRequest]) -> None:
+        """Save several generation requests; implementations may batch them."""
+        for request in requests:
+            self.save(request)
+
     @abstractmethod
     def get_all(self) -> list[GenerationRequest]:
         """Retrieve all generation requests from the repository."""
         pass
 
+    def iter_all(self) -> Iterator[GenerationRequest]:
+        """Yield all generation requests; implementations may stream them."""
+        yield from self.get_all()
+
+    def get_page(
+        self, limit: int, offset: int = 0
+    ) -> tuple[list[GenerationRequest], int]:
+        """Return one page of requests (newest first) and the total count."""
+        requests = sorted(self.get_all(), key=lambda r: r.processed_at, reverse=True)
+        return requests[offset : offset + limit], len(requests)
+
+    def get_markdown_content(self, request_id: int) -> str | None:
+        """Return the generated markdown of one request, or None if missing."""
+        for request in self.iter_all():
+            if request.id == request_id:
+                return request.markdown_content
+        return None
+
+    def get_recent_project_paths(self, limit: int = 10) -> list[str]:
+        """Return distinct project paths, most recently processed first."""
+        paths = dict.fromkeys(
+            request.project_path
+            for request in sorted(
+                self.get_all(), key=lambda r: r.processed_at, reverse=True
+            )
+        )
+        return list(paths)[:limit]
+
     @abstractmethod
     def delete(self, request_id: int) -> None:
         """Delete a generation request by ID."""
         pass
+
+    def delete_many(self, request_ids: list[int]) -> None:
+        """Delete several generation requests; implementations may batch them."""
+        for request_id in request_ids:
+            self.delete(request_id)
@@ -1,16 +1,41 @@
-import html
 import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 
 from pybars import Compiler
 
 from code2markdown.application.repository import IHistoryRepository
-from code2markdown.domain.files import DirectoryNode, FileNode, ProjectTreeBuilder
+from code2markdown.domain.files import (
+    BINARY_EXTENSIONS,
+    BINARY_SNIFF_BYTES,
+    DirectoryNode,
+    FileNode,
+    ProjectTreeBuilder,
+    is_binary_content,
+)
 from code2markdown.domain.filters import FilterSettings
 from code2markdown.domain.request import GenerationRequest
 
 
+@lru_cache(maxsize=32)
+def _compile_template(template_path: str, mtime_ns: int):
+    """
+    Read and compile a Handlebars template.
+
+    The modification time is part of the cache key, so editing the template
+    file produces a fresh compile on the next call.
+    """
+    with open(template_path, encoding="utf-8") as template_file:
+        return Compiler().compile(template_file.read())
+
+
+# Below this many files reading them serially is cheaper than starting threads
+PARALLEL_READ_THRESHOLD = 8
+MAX_READ_WORKERS = 32
+
+
 class GenerationService:
     """
     Service class responsible for generating documentation and saving it to the history repository.
@@ -28,6 +53,16 @@ class GenerationService:
         """
         self._history_repo = history_repo
         self._templates_dir = templates_dir
+        if templates_dir:
+            # If templates_dir is specified, use only it
+            template_dirs = [templates_dir]
+        else:
+            # Project's templates directory, then application's (relative) one;
+            # both usually resolve to the same folder, so keep it once
+            template_dirs = [os.path.join(os.getcwd(), "templates"), "templates"]
+        self._template_dirs = tuple(
+            dict.fromkeys(os.path.abspath(path) for path in template_dirs)
+        )
 
     def _load_template(self, template_name: str) -> Compiler | None:
         """
@@ -39,25 +74,15 @@ class GenerationService:
         Returns:
             Compiled template or None if template not found
         """
-        # If templates_dir is specified, use it
-        if self._templates_dir:
-            template_path = os.path.join(self._templates_dir, template_name)
-            if os.path.exists(template_path):
-                with open(template_path, encoding="utf-8") as template_file:
-                    return Compiler().compile(template_file.read())
-            return None
-
-        # First try in project's templates directory
-        project_template_path = os.path.join(os.getcwd(), "templates", template_name)
-        if os.path.exists(project_template_path):
-            with open(project_template_path, encoding="utf-8") as template_file:
-                return Compiler().compile(template_file.read())
-
-        # Then try in application's templates directory
-        app_template_path = os.path.join("templates", template_name)
-        if os.path.exists(app_template_path):
-            with open(app_template_path, encoding="utf-8") as template_file:
-                return Compiler().compile(template_file.read())
+        for template_dir in self._template_dirs:
+            template_path = os.path.join(template_dir, template_name)
+            # One stat per candidate both checks existence and keys the cache;
+            # the file is opened only when the compiled template is stale
+            try:
+                mtime_ns = os.stat(template_path).st_mtime_ns
+                return _compile_template(template_path, mtime_ns)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
 
         return None
 
@@ -71,181 +96,166 @@ class GenerationService:
         Returns:
             True if the file is binary, False otherwise
         """
-        # Known binary extensions
-        binary_extensions = {
-            ".pyc",
-            ".pyo",
-            ".exe",
-            ".dll",
-            ".so",
-            ".dylib",
-            ".bin",
-            ".dat",
-            ".jpg",
-            ".jpeg",
-            ".png",
-            ".gif",
-            ".bmp",
-            ".tiff",
-            ".ico",
-            ".mp3",
-            ".mp4",
-            ".avi",
-            ".mkv",
-            ".mov",
-            ".wmv",
-            ".flv",
-            ".pdf",
-            ".doc",
-            ".docx",
-            ".xls",
-            ".xlsx",
-            ".ppt",
-            ".pptx",
-            ".zip",
-            ".rar",
-            ".7z",
-            ".tar",
-            ".gz",
-            ".bz2",
-            ".sqlite",
-            ".db",
-            ".dbf",
-        }
-
         # Check extension
         _, ext = os.path.splitext(file_path.lower())
-        if ext in binary_extensions:
+        if ext in BINARY_EXTENSIONS:
             return True
 
-        # Additional check: try to read first few bytes
+        # Additional check: one read of the first bytes, no UTF-8 decode
         try:
             with open(file_path, "rb") as f:
-                chunk = f.read(1024)
-                # If there are many null bytes, it's likely binary
-                if b"\x00" in chunk:
-                    return True
-                # Check for non-printable characters
-                try:
-                    chunk.decode("utf-8")
-                    return False
-                except UnicodeDecodeError:
-                    return True
+                return is_binary_content(f.read(BINARY_SNIFF_BYTES))
         except OSError:
             return True
 
-        return False
-
-    def _build_project_structure_from_tree(
-        self, node: DirectoryNode, selected_files: list[str] | None = None
-    ) -> str:
+    def _read_text_file(self, file_path: str) -> str | None:
         """
-        Build project structure string from DirectoryNode tree.
+        Read a text file for the documentation with a single open and read.
+
+        The binary check runs on the bytes already read, so the tree builder
+        does not need to sniff file contents beforehand.
 
         Args:
-            node: Root node of the directory tree
-            selected_files: Optional list of selected files to filter the structure
+            file_path: Path to the file to read
 
         Returns:
-            String representation of the project structure
+            File content, or None if the file is binary or not UTF-8 text
         """
-        structure = f"Project: {node.name}\n"
-
-        def build_tree(node: DirectoryNode, indent: int = 0) -> str:
-            result = ""
-            indent_str = "    " * indent
-
-            # First output folders
-            for child in node.children:
-                if isinstance(child, DirectoryNode):
-                    result += f"{indent_str}├── {child.name}/\n"
-                    result += build_tree(child, indent + 1)
+        try:
+            with open(file_path, "rb") as file:
+                data = file.read()
+            if is_binary_content(data[:BINARY_SNIFF_BYTES]):
+                return None
+            text = data.decode("utf-8")
+            # Same universal newlines as reading in text mode
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            return text
+        except UnicodeDecodeError:
+            # Skip files with encoding issues
+            pass
+        except PermissionError as e:
+            # Log warning but continue processing other files
+            print(f"Permission denied for file {os.path.basename(file_path)}: {str(e)}")
+        except FileNotFoundError as e:
+            # Log warning but continue processing other files
+            print(f"File not found {os.path.basename(file_path)}: {str(e)}")
+        except OSError as e:
+            # Log warning but continue processing other files
+            print(f"Skipping file {os.path.basename(file_path)}: {str(e)}")
+        return None
 
-            # Then output files
-            for child in node.children:
-                if isinstance(child, FileNode):
-                    # If we have selected files, only include those
-                    if selected_files is None or child.path in selected_files:
-                        result += f"{indent_str}├── {child.name}\n"
+    def _collect_from_tree(
+        self, root: DirectoryNode, selected_set: frozenset[str] | None = None
+    ) -> tuple[str, list[dict]]:
+        """
+        Build the project structure string and read file contents in one traversal.
 
-            return result
+        Each level lists folders first, then files, as before; file contents are
+        collected in tree order. The walk only gathers the paths to read; the
+        reads themselves run on a thread pool when there are enough of them,
+        since open().read() releases the GIL while waiting on I/O.
 
-        structure += build_tree(node)
-        return structure
+        Args:
+            root: Root node of the directory tree
+            selected_set: Optional set of selected file paths (if None, process all)
 
-    def _process_files_from_tree(
-        self,
-        node: DirectoryNode,
-        selected_files: list[str] | None,
-        files: list[dict],
-        filters: FilterSettings,
-    ):
+        Returns:
+            Tuple of (project structure string, list of {"path", "code"} dicts)
         """
-        Recursively process files from the directory tree.
+        lines = [f"Project: {root.name}"]
+        paths_to_read: list[str] = []
+
+        # Explicit stack instead of recursion: no Python frame per folder and no
+        # recursion limit on deep trees. Each entry holds an iterator over the
+        # folder's children, its indent and the file lines deferred until all
+        # of its subfolders have been written.
+        stack = [(iter(root.children), "", [])]
+        while stack:
+            children, indent_str, file_lines = stack[-1]
+            child = next(children, None)
+            if child is None:
+                # Files of this level go after all of its folders
+                lines.extend(file_lines)
+                stack.pop()
+                continue
 
-        Args:
-            node: Current node in the tree
-            selected_files: List of selected files (if None, process all)
-            files: List to append processed files to
-            filters: Filter settings for file processing
-        """
-        for child in node.children:
             if isinstance(child, DirectoryNode):
-                self._process_files_from_tree(child, selected_files, files, filters)
+                lines.append(f"{indent_str}├── {child.name}/")
+                stack.append((iter(child.children), indent_str + "    ", []))
             elif isinstance(child, FileNode):
-                # Skip if we have selected files and this file is not in the list
-                if selected_files is not None and child.path not in (
-                    selected_files or []
-                ):
+                # If we have selected files, only include those
+                if selected_set is not None and child.path not in selected_set:
                     continue
+                file_lines.append(f"{indent_str}├── {child.name}")
 
                 # Skip binary files
-                if child.is_binary:
-                    continue
+                if not child.is_binary:
+                    paths_to_read.append(child.path)
 
-                # Read file content
-                try:
-                    with open(child.path, encoding="utf-8") as file:
-                        file_content = file.read()
-
-                    files.append({"path": child.path, "code": file_content})
-                except UnicodeDecodeError:
-                    # Skip files with encoding issues
-                    pass
-                except PermissionError as e:
-                    # Log warning but continue processing other files
-                    print(
-                        f"Permission denied for file {os.path.basename(child.path)}: {str(e)}"
-                    )
-                except FileNotFoundError as e:
-                    # Log warning but continue processing other files
-                    print(f"File not found {os.path.basename(child.path)}: {str(e)}")
-                except OSError as e:
-                    # Log warning but continue processing other files
-                    print(f"Skipping file {os.path.basename(child.path)}: {str(e)}")
+        if len(paths_to_read) > PARALLEL_READ_THRESHOLD:
+            workers = min(MAX_READ_WORKERS, len(paths_to_read))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                contents = list(executor.map(self._read_text_file, paths_to_read))
+        else:
+            contents = [self._read_text_file(path) for path in paths_to_read]
 
-    def generate_and_save_documentation(
+        # executor.map keeps input order, so files stay in tree order
+        files = [
+            {"path": path, "code": content}
+            for path, content in zip(paths_to_read, contents, strict=True)
+            if content is not None
+        ]
+        return "\n".join(lines) + "\n", files
+
+    def template_signature(self, template_name: str) -> int | None:
+        """
+        Return the modification time of the template that would be used.
+
+        Callers that cache rendered documentation include it in their cache key,
+        so editing the template invalidates the cached output.
+
+        Args:
+            template_name: Name of the template file
+
+        Returns:
+            st_mtime_ns of the resolved template file, or None if not found
+        """
+        for template_dir in self._template_dirs:
+            try:
+                return os.stat(os.path.join(template_dir, template_name)).st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        return None
+
+    @staticmethod
+    def project_name(project_path: str) -> str:
+        """Return the display name of a project: the last component of its path."""
+        return (
+            os.path.basename(os.path.abspath(project_path)) if project_path else "Unknown"
+        )
+
+    def render_documentation(
         self,
         project_path: str,
         template_name: str,
         filters: FilterSettings,
-        reference_url: str | None = None,
-    ) -> str:
+        project_name: str | None = None,
+    ) -> tuple[str, int]:
         """
-        Generate documentation for a project and save it to the history repository.
+        Generate documentation for a project without saving it.
 
         Args:
             project_path: Path to the project directory
             template_name: Name of the template to use for generation
             filters: Filter settings for file selection and processing
-            reference_url: Optional reference URL to include in the documentation
+            project_name: Precomputed project_name(project_path), if available
 
         Returns:
-            Generated markdown content
+            Tuple of (generated markdown content, number of processed files)
 
         Raises:
             ValueError: If project_path is invalid or template not found
-            Exception: If there's an error saving to the repository
         """
         # Validate inputs
         if not project_path or not os.path.isdir(project_path):
@@ -257,69 +267,69 @@ class GenerationService:
 
         # Initialize variables
         files: list[dict] = []
-        file_count = 0
         project_structure = ""
 
-        # Get selected files from filters if they exist
-        selected_files = None
+        # Selected files stay a set: no list copy, O(1) membership per file.
+        # Without a selection all files in the project are processed.
+        selected_set = None
         if hasattr(filters, "selected_files") and filters.selected_files:
-            selected_files = list(filters.selected_files)
-
-        if selected_files:
-            # Создаем экземпляр ProjectTreeBuilder
-            builder = ProjectTreeBuilder()
-
-            # Строим дерево проекта с выбранными файлами
-            root_node = builder.build_tree(project_path, filters)
+            selected_set = frozenset(filters.selected_files)
 
-            if root_node is not None:
-                # Собираем структуру проекта и содержимое файлов
-                project_structure = self._build_project_structure_from_tree(
-                    root_node, selected_files
-                )
+        # Строим дерево проекта; содержимое файлов проверяется при чтении,
+        # поэтому построитель определяет бинарные файлы только по расширению
+        builder = ProjectTreeBuilder(sniff_content=False)
+        root_node = builder.build_tree(project_path, filters)
 
-                # Проходим по всем файлам в дереве
-                self._process_files_from_tree(root_node, selected_files, files, filters)
-            else:
-                project_structure = "Error: Could not build project tree."
-
-            # Считаем количество обработанных файлов
-            file_count = len(files)
+        if root_node is not None:
+            # Собираем структуру проекта и содержимое файлов за один обход
+            project_structure, files = self._collect_from_tree(root_node, selected_set)
         else:
-            # Fallback to legacy behavior - process all files in project
-            builder = ProjectTreeBuilder()
-            root_node = builder.build_tree(project_path, filters)
-
-            if root_node is not None:
-                # Собираем структуру проекта
-                project_structure = self._build_project_structure_from_tree(root_node)
-
-                # Проходим по всем файлам в дереве
-                self._process_files_from_tree(root_node, None, files, filters)
-            else:
-                project_structure = "Error: Could not build project tree."
-
-            # Считаем количество обработанных файлов
-            file_count = len(files)
+            project_structure = "Error: Could not build project tree."
 
         # Prepare context for template
         context = {
-            "absolute_code_path": os.path.basename(os.path.abspath(project_path)),
+            "absolute_code_path": project_name or self.project_name(project_path),
             "source_tree": project_structure,
             "files": files,
         }
 
-        # Generate markdown content
+        # Generate markdown content; templates use {{{...}}}, so values are
+        # inserted verbatim and the output needs no unescape pass
         markdown_content = template(context)
-        markdown_content = html.unescape(markdown_content)
 
+        # Считаем количество обработанных файлов
+        return markdown_content, len(files)
+
+    def save_documentation(
+        self,
+        project_path: str,
+        template_name: str,
+        markdown_content: str,
+        file_count: int,
+        filters: FilterSettings,
+        reference_url: str | None = None,
+        project_name: str | None = None,
+    ) -> None:
+        """
+        Save generated documentation to the history repository.
+
+        Args:
+            project_path: Path to the project directory
+            template_name: Name of the template used for generation
+            markdown_content: Generated markdown content
+            file_count: Number of processed files
+            filters: Filter settings used for generation
+            reference_url: Optional reference URL to include in the documentation
+            project_name: Precomputed project_name(project_path), if available
+
+        Raises:
+            Exception: If there's an error saving to the repository
+        """
         # Create GenerationRequest object
         request = GenerationRequest(
             id=None,
             project_path=project_path,
-            project_name=os.path.basename(os.path.abspath(project_path))
-            if project_path
-            else "Unknown",
+            project_name=project_name or self.project_name(project_path),
             template_name=template_name,
             markdown_content=markdown_content,
             reference_url=reference_url,
@@ -334,4 +344,41 @@ class GenerationService:
         except sqlite3.Error as e:
             raise Exception(f"Database error saving request: {str(e)}") from e
 
+    def generate_and_save_documentation(
+        self,
+        project_path: str,
+        template_name: str,
+        filters: FilterSettings,
+        reference_url: str | None = None,
+    ) -> str:
+        """
+        Generate documentation for a project and save it to the history repository.
+
+        Args:
+            project_path: Path to the project directory
+            template_name: Name of the template to use for generation
+            filters: Filter settings for file selection and processing
+            reference_url: Optional reference URL to include in the documentation
+
+        Returns:
+            Generated markdown content
+
+        Raises:
+            ValueError: If project_path is invalid or template not found
+            Exception: If there's an error saving to the repository
+        """
+        # abspath calls getcwd for relative paths: resolve the name once
+        project_name = self.project_name(project_path)
+        markdown_content, file_count = self.render_documentation(
+            project_path, template_name, filters, project_name
+        )
+        self.save_documentation(
+            project_path,
+            template_name,
+            markdown_content,
+            file_count,
+            filters,
+            reference_url,
+            project_name,
+        )
         return markdown_content
@@ -1,7 +1,6 @@
-import fnmatch
-import hashlib
-import json
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Union
 
@@ -9,145 +8,288 @@ import pathspec
 
 from code2markdown.domain.filters import FilterSettings
 
+# Известные бинарные расширения: такие файлы не читаются
+BINARY_EXTENSIONS = frozenset(
+    {
+        ".pyc",
+        ".pyo",
+        ".exe",
+        ".dll",
+        ".so",
+        ".dylib",
+        ".bin",
+        ".dat",
+        ".jpg",
+        ".jpeg",
+        ".png",
+        ".gif",
+        ".bmp",
+        ".tiff",
+        ".ico",
+        ".mp3",
+        ".mp4",
+        ".avi",
+        ".mkv",
+        ".mov",
+        ".wmv",
+        ".flv",
+        ".pdf",
+        ".doc",
+        ".docx",
+        ".xls",
+        ".xlsx",
+        ".ppt",
+        ".pptx",
+        ".zip",
+        ".rar",
+        ".7z",
+        ".tar",
+        ".gz",
+        ".bz2",
+        ".sqlite",
+        ".db",
+        ".dbf",
+    }
+)
+# Известные текстовые расширения: для них содержимое не читаем
+TEXT_EXTENSIONS = frozenset(
+    {
+        ".py",
+        ".js",
+        ".mjs",
+        ".ts",
+        ".tsx",
+        ".jsx",
+        ".css",
+        ".html",
+        ".md",
+        ".txt",
+        ".toml",
+        ".ipynb",
+        ".json",
+        ".yaml",
+        ".yml",
+    }
+)
+# Сколько первых байт файла читается для определения бинарного содержимого
+BINARY_SNIFF_BYTES = 8192
+# Байты, которые встречаются в текстовых файлах (включая UTF-8 последовательности)
+_TEXT_CHARS = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7F})
+# Сколько путей помнят LRU-кэши stat и бинарности в ProjectTreeBuilder
+FILE_CACHE_SIZE = 1024
+# Корень с большим числом вложенных папок обходится в пуле потоков
+PARALLEL_SUBDIR_THRESHOLD = 4
+MAX_TREE_WORKERS = 8
+# Меньше этого числа файлов начало файлов читается без пула потоков
+PARALLEL_SNIFF_THRESHOLD = 8
+MAX_SNIFF_WORKERS = 16
+# Общий PathSpec для папок без .gitignore
+_EMPTY_GITIGNORE_SPEC = pathspec.PathSpec([])
+
+
+def is_binary_content(chunk: bytes) -> bool:
+    """
+    Эвристика file(1)/git по началу файла, без декодирования UTF-8.
+
+    Нулевой байт или больше 30% непечатаемых байтов означают бинарный файл.
+    find и translate выполняются в C, поэтому проверка дешевле, чем decode.
+    """
+    if not chunk:
+        return False
+    if chunk.find(b"\x00") != -1:
+        return True
+    nontext = chunk.translate(None, _TEXT_CHARS)
+    return len(nontext) / len(chunk) > 0.30
+
+
+def _stat_path(path: str) -> tuple[bool, int]:
+    """Существует ли путь и его размер; (False, 0) при ошибке os.stat."""
+    try:
+        return True, os.stat(path).st_size
+    except OSError:
+        return False, 0
+
+
+def read_gitignore_spec(dir_path: str) -> pathspec.PathSpec:
+    """
+    Разбирает .gitignore папки; без файла возвращает пустой PathSpec.
+
+    Args:
+        dir_path: Путь к папке, в которой ищется .gitignore
+
+    Returns:
+        PathSpec с правилами .gitignore
+    """
+    try:
+        with open(os.path.join(dir_path, ".gitignore"), encoding="utf-8") as f:
+            return pathspec.PathSpec.from_lines("gitwildmatch", f)
+    except OSError:
+        return _EMPTY_GITIGNORE_SPEC
+
 
-@dataclass
+@dataclass(slots=True)
 class FileNode:
     path: str
     name: str
     size: int
     is_binary: bool
     content: str | None = None
+    # Результат is_excluded, вычисленный ProjectTreeBuilder при построении дерева
+    excluded: bool = False
+
+    def to_dict(self) -> dict:
+        """Запись файла в словарной структуре дерева, которую хранит UI."""
+        return {
+            "type": "file",
+            "path": self.path,
+            "excluded": self.excluded,
+            "size": self.size,
+        }
 
-    def is_excluded(self, filters: FilterSettings) -> bool:
+    def is_excluded(
+        self, filters: FilterSettings, gitignore_spec: pathspec.PathSpec | None = None
+    ) -> bool:
         """
         Проверяет, должен ли файл быть исключен на основе настроек фильтрации.
 
         Args:
             filters: Настройки фильтрации
+            gitignore_spec: Уже разобранный .gitignore родительской папки;
+                если не передан, файл читается с диска
 
         Returns:
             True если файл должен быть исключен, False в противном случае
         """
-        # Проверка по расширению .gitignore
-        gitignore_path = os.path.join(os.path.dirname(self.path), ".gitignore")
-        try:
-            if os.path.exists(gitignore_path):
-                with open(gitignore_path, encoding="utf-8") as f:
-                    lines = f.readlines()
-                spec = pathspec.PathSpec.from_lines("gitwildmatch", lines)
-                if spec.match_file(self.path):
-                    return True
-        except FileNotFoundError:
-            # Если файл .gitignore не найден, пропускаем его
-            pass
+        # Проверка по .gitignore родительской папки
+        if gitignore_spec is None:
+            gitignore_spec = read_gitignore_spec(os.path.dirname(self.path))
+        if gitignore_spec.match_file(self.path):
+            return True
+
+        return self.is_filtered_out(filters)
+
+    def is_oversized(self, filters: FilterSettings) -> bool:
+        """Превышает ли файл max_file_size из настроек фильтрации."""
+        return bool(filters.max_file_size) and self.size > filters.max_file_size.bytes
+
+    def is_filtered_out(self, filters: FilterSettings) -> bool:
+        """
+        Проверяет файл по размеру и паттернам фильтров, без .gitignore.
+
+        ProjectTreeBuilder проверяет .gitignore сразу для всех файлов папки,
+        а для каждого файла вызывает только этот метод.
 
-        # Проверка размера файла
-        if filters.max_file_size and self.size > filters.max_file_size.bytes:
+        Args:
+            filters: Настройки фильтрации
+
+        Returns:
+            True если файл отсекается фильтрами, False в противном случае
+        """
+        # Размер проверяется первым: это одно сравнение, без разбора имени
+        if self.is_oversized(filters):
             return True
 
-        # Проверка include patterns
-        if filters.include_patterns:
-            filename = os.path.basename(self.path)
-            file_ext = os.path.splitext(filename)[1].lower()
-            should_include = False
-
-            for pattern in filters.include_patterns:
-                pattern = pattern.strip()
-                if not pattern:
-                    continue
-                # Если паттерн начинается с точки - это расширение
-                if pattern.startswith("."):
-                    if file_ext == pattern.lower():
-                        should_include = True
-                        break
-                # Если содержит звездочку - это wildcard паттерн
-                elif "*" in pattern:
-                    if fnmatch.fnmatch(filename.lower(), pattern.lower()):
-                        should_include = True
-                        break
-                # Иначе проверяем вхождение в имя файла
-                else:
-                    if pattern.lower() in filename.lower():
-                        should_include = True
-                        break
+        # Паттерны разобраны в FilterSettings; имя приводим к нижнему регистру
+        # один раз на файл
+        filename = os.path.basename(self.path).lower()
 
-            if not should_include:
-                return True
+        # Проверка include patterns
+        if not filters.includes_file(filename, os.path.splitext(filename)[1]):
+            return True
 
         # Проверка exclude patterns
-        if filters.exclude_patterns:
-            filename = os.path.basename(self.path)
-
-            for pattern in filters.exclude_patterns:
-                pattern = pattern.strip()
-                if not pattern:
-                    continue
-                # Если содержит звездочку - это wildcard паттерн
-                if "*" in pattern:
-                    if fnmatch.fnmatch(filename.lower(), pattern.lower()):
-                        return True
-                # Иначе проверяем вхождение
-                else:
-                    if pattern.lower() in filename.lower():
-                        return True
+        if filters.excludes_file(filename):
+            return True
 
         return False
 
 
-@dataclass
+@dataclass(slots=True)
 class DirectoryNode:
     path: str
     name: str
     children: list[Union["DirectoryNode", "FileNode"]] = field(default_factory=list)
+    # Результат is_excluded, вычисленный ProjectTreeBuilder при построении дерева
+    excluded: bool = False
 
-    def is_excluded(self, filters: FilterSettings) -> bool:
+    def to_dict(self) -> dict:
         """
-        Проверяет, должна ли директория быть исключена на основе настроек фильтрации.
+        Преобразует потомков директории в словарь {имя: запись} для UI.
 
-        Args:
-            filters: Настройки фильтрации
+        Записи папок содержат "children", а также "all_paths" и
+        "included_paths" - пути всех и не исключенных файлов поддерева - и
+        "folder_count" - число вложенных папок. Все это собирается один раз,
+        чтобы UI не обходил поддерево при каждом рендере.
 
         Returns:
-            True если директория должна быть исключена, False в противном случае
+            Словарь потомков; сама директория в него не входит
         """
-        # Проверка по расширению .gitignore
-        gitignore_path = os.path.join(self.path, ".gitignore")
-        try:
-            if os.path.exists(gitignore_path):
-                with open(gitignore_path, encoding="utf-8") as f:
-                    lines = f.readlines()
-                spec = pathspec.PathSpec.from_lines("gitwildmatch", lines)
-                if spec.match_file(self.path):
-                    return True
-        except FileNotFoundError:
-            # Если файл .gitignore не найден, пропускаем его
-            pass
+        # Обход стеком вместо рекурсии; папки запоминаем в порядке обхода,
+        # чтобы затем в обратном порядке собрать пути потомков снизу вверх
+        result: dict = {}
+        folders = []
+        stack: list[tuple[DirectoryNode, dict]] = [(self, result)]
+        while stack:
+            node, target = stack.pop()
+            for child in node.children:
+                if isinstance(child, DirectoryNode):
+                    entry = {
+                        "type": "folder",
+                        "path": child.path,
+                        "excluded": child.excluded,
+                        "children": {},
+                    }
+                    folders.append(entry)
+                    stack.append((child, entry["children"]))
+                elif isinstance(child, FileNode):
+                    entry = child.to_dict()
+                else:
+                    continue
+                target[child.name] = entry
+
+        for folder in reversed(folders):
+            all_paths = []
+            included_paths = []
+            folder_count = 0
+            for entry in folder["children"].values():
+                if entry["type"] == "folder":
+                    folder_count += 1 + entry["folder_count"]
+                    all_paths.extend(entry["all_paths"])
+                    if not entry["excluded"]:
+                        included_paths.extend(entry["included_paths"])
+                else:
+                    all_paths.append(entry["path"])
+                    if not entry["excluded"]:
+                        included_paths.append(entry["path"])
+            folder["all_paths"] = all_paths
+            folder["included_paths"] = included_paths
+            folder["folder_count"] = folder_count
 
-        # Проверка exclude patterns
-        if filters.exclude_patterns:
-            # Используем только имя директории для проверки паттернов
-            dir_name = os.path.basename(self.path)
+        return result
 
-            for pattern in filters.exclude_patterns:
-                pattern = pattern.strip()
-                if not pattern:
-                    continue
+    def is_excluded(
+        self, filters: FilterSettings, gitignore_spec: pathspec.PathSpec | None = None
+    ) -> bool:
+        """
+        Проверяет, должна ли директория быть исключена на основе настроек фильтрации.
 
-                # Удаляем trailing slash из паттерна если есть
-                pattern = pattern.rstrip("/")
+        Args:
+            filters: Настройки фильтрации
+            gitignore_spec: Уже разобранный .gitignore этой директории;
+                если не передан, файл читается с диска
 
-                # Если паттерн заканчивается на /, проверяем только директории
-                is_dir_pattern = pattern.endswith("/")
-                if is_dir_pattern:
-                    pattern = pattern[:-1]
+        Returns:
+            True если директория должна быть исключена, False в противном случае
+        """
+        # Проверка по собственному .gitignore директории
+        if gitignore_spec is None:
+            gitignore_spec = read_gitignore_spec(self.path)
+        if gitignore_spec.match_file(self.path):
+            return True
 
-                # Если содержит звездочку - это wildcard паттерн
-                if "*" in pattern:
-                    if fnmatch.fnmatch(dir_name.lower(), pattern.lower()):
-                        return True
-                # Иначе проверяем вхождение
-                elif pattern.lower() in dir_name.lower():
-                    return True
+        # Проверка exclude patterns по имени директории
+        if filters.excludes_directory(os.path.basename(self.path).lower()):
+            return True
 
         return False
 
@@ -157,49 +299,63 @@ class ProjectTreeBuilder:
     Класс для построения дерева проекта с применением фильтров.
     """
 
-    def __init__(self):
-        self._cache: dict[str, DirectoryNode | None] = {}
+    def __init__(self, sniff_content: bool = True):
+        """
+        Args:
+            sniff_content: Читать ли начало файла для определения бинарных
+                файлов. При False is_binary определяется только по расширению -
+                для вызывающего кода, который сам проверяет содержимое при чтении.
+        """
+        self._sniff_content = sniff_content
+        self._cache: dict[tuple, DirectoryNode | None] = {}
         self._cache_stats = {"hits": 0, "misses": 0}
-        # Initialize caches for methods that previously used lru_cache
-        self._file_stat_cache: dict[str, tuple[bool, int]] = {}
-        self._is_binary_file_cache: dict[str, bool] = {}
+        # LRU-кэши на экземпляр: старые пути вытесняются, а не перестают
+        # кэшироваться после заполнения
+        self._get_file_stat = functools.lru_cache(maxsize=FILE_CACHE_SIZE)(_stat_path)
+        self._is_binary_cached = functools.lru_cache(maxsize=FILE_CACHE_SIZE)(
+            self._detect_binary
+        )
+        # Разобранные .gitignore по пути папки вместе с mtime_ns файла
+        self._gitignore_cache: dict[str, tuple[int, pathspec.PathSpec]] = {}
 
     def _get_cache_key(
         self, root_path: str, filters: FilterSettings, current_depth: int = 0
-    ) -> str:
+    ) -> tuple:
         """
         Генерирует уникальный ключ для кэширования на основе параметров.
-        """
-        filters_data = {
-            "include_patterns": sorted(filters.include_patterns or []),
-            "exclude_patterns": sorted(filters.exclude_patterns or []),
-            "max_file_size": filters.max_file_size.bytes if filters.max_file_size else 0,
-            "max_depth": filters.max_depth,
-        }
-        cache_data = (
-            f"{root_path}|{json.dumps(filters_data, sort_keys=True)}|{current_depth}"
-        )
-        return hashlib.md5(cache_data.encode()).hexdigest()
 
-    def _get_file_stat(self, path: str) -> tuple[bool, int]:
+        FilterSettings неизменяем и хэшируем, поэтому входит в ключ целиком.
         """
-        Кэширует результаты проверки существования файла и получения его размера.
+        return (root_path, filters, current_depth)
+
+    def clear_caches(self) -> None:
+        """Сбрасывает кэши деревьев, stat и проверок на бинарность."""
+        self._cache.clear()
+        self._get_file_stat.cache_clear()
+        self._is_binary_cached.cache_clear()
+        self._gitignore_cache.clear()
+
+    def _get_gitignore_spec(self, dir_path: str) -> pathspec.PathSpec:
         """
-        # Check if result is already cached
-        if path in self._file_stat_cache:
-            return self._file_stat_cache[path]
+        Возвращает PathSpec .gitignore папки, разбирая файл один раз.
 
+        Запись кэша сверяется с mtime файла, поэтому измененный .gitignore
+        перечитывается при следующем построении дерева.
+        """
+        gitignore_path = os.path.join(dir_path, ".gitignore")
         try:
-            stat = os.stat(path)
-            result = True, stat.st_size
+            mtime_ns = os.stat(gitignore_path).st_mtime_ns
         except OSError:
-            result = False, 0
+            self._gitignore_cache.pop(dir_path, None)
+            return _EMPTY_GITIGNORE_SPEC
 
-        # Cache the result
-        if len(self._file_stat_cache) < 128:  # Respect the original maxsize
-            self._file_stat_cache[path] = result
+        cached = self._gitignore_cache.get(dir_path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
 
-        return result
+        spec = read_gitignore_spec(dir_path)
+        self._gitignore_cache[dir_path] = (mtime_ns, spec)
+        return spec
 
     def build_tree(
         self, root_path: str, filters: FilterSettings, current_depth: int = 0
@@ -223,10 +379,13 @@ class ProjectTreeBuilder:
 
         self._cache_stats["misses"] += 1
 
-        # Строим дерево
+        # Строим дерево; содержимое файлов с неоднозначным расширением
+        # проверяется одним пакетом после обхода
+        pending_sniff: list[FileNode] = []
         node_result: DirectoryNode | FileNode | None = self._build_node(
-            root_path, filters, current_depth
+            root_path, filters, current_depth, pending_sniff=pending_sniff, parallel=True
         )
+        self._sniff_files(pending_sniff)
         # build_tree должен возвращать только DirectoryNode или None, поэтому если _build_node вернул FileNode, возвращаем None
         result: DirectoryNode | None = (
             node_result if isinstance(node_result, DirectoryNode) else None
@@ -235,7 +394,13 @@ class ProjectTreeBuilder:
         return result
 
     def _build_node(
-        self, path: str, filters: FilterSettings, current_depth: int
+        self,
+        path: str,
+        filters: FilterSettings,
+        current_depth: int,
+        entry: os.DirEntry | None = None,
+        pending_sniff: list[FileNode] | None = None,
+        parallel: bool = False,
     ) -> DirectoryNode | FileNode | None:
         """
         Внутренний метод для построения узла дерева.
@@ -244,31 +409,56 @@ class ProjectTreeBuilder:
             path: Путь к файлу или директории
             filters: Настройки фильтрации
             current_depth: Текущая глубина обхода
+            entry: Запись os.scandir родительской папки, если есть: тип и размер
+                берутся из нее без отдельных os.stat/os.path.isfile
+            pending_sniff: Список, куда откладываются вошедшие в дерево файлы,
+                которым нужно читать содержимое для is_binary; без него
+                содержимое читается сразу
+            parallel: Строить поддеревья вложенных папок в пуле потоков, если
+                их больше PARALLEL_SUBDIR_THRESHOLD (только для корня дерева)
 
         Returns:
             DirectoryNode или FileNode в зависимости от типа пути
         """
-        # Используем кэшированную проверку существования и размера
-        exists, size = self._get_file_stat(path)
-        if not exists:
-            return None
-
-        name = os.path.basename(path)
-
-        # Проверяем, является ли путь файлом или директорией
-        is_file = os.path.isfile(path)
+        if entry is not None:
+            # Тип известен из scandir; stat нужен только файлам ради размера
+            try:
+                is_file = entry.is_file()
+                if not is_file and not entry.is_dir():
+                    return None
+                size = entry.stat().st_size if is_file else 0
+            except OSError:
+                return None
+            name = entry.name
+        else:
+            # Используем кэшированную проверку существования и размера
+            exists, size = self._get_file_stat(path)
+            if not exists:
+                return None
+            name = os.path.basename(path)
+            # Проверяем, является ли путь файлом или директорией
+            is_file = os.path.isfile(path)
 
         # Если это файл, создаем FileNode
         if is_file:
-            is_binary = self._is_binary_file(path)
-            file_node = FileNode(path=path, name=name, size=size, is_binary=is_binary)
+            is_binary = self._binary_by_extension(path)
+            if is_binary is None and pending_sniff is None:
+                is_binary = self._is_binary_file(path, size)
+            file_node = FileNode(
+                path=path, name=name, size=size, is_binary=bool(is_binary)
+            )
             return file_node
 
         # Если это директория, создаем DirectoryNode
         dir_node = DirectoryNode(path=path, name=name)
 
+        # .gitignore папки разбирается один раз и используется и для нее самой,
+        # и для всех ее файлов
+        gitignore_spec = self._get_gitignore_spec(path)
+
         # Проверяем, должна ли директория быть исключена
-        is_excluded = dir_node.is_excluded(filters)
+        is_excluded = dir_node.is_excluded(filters, gitignore_spec)
+        dir_node.excluded = is_excluded
         if is_excluded and not filters.show_excluded:
             return dir_node
 
@@ -292,106 +482,128 @@ class ProjectTreeBuilder:
                 # Сортируем записи по имени
                 sorted_entries = sorted(entries, key=lambda x: x.name.lower())
 
-                for entry in sorted_entries:
-                    item_path = entry.path
-
-                    # Рекурсивно строим дочерние узлы с увеличением глубины
-                    child_node = self._build_node(item_path, filters, current_depth + 1)
-
-                    if child_node is not None:
-                        # Для файлов проверяем фильтры
-                        if isinstance(child_node, FileNode):
-                            if not child_node.is_excluded(filters):
-                                dir_node.children.append(child_node)
-                        # Для директорий добавляем только если они не исключены
-                        else:
-                            if not child_node.is_excluded(filters):
-                                dir_node.children.append(child_node)
+            def build_child(entry: os.DirEntry) -> DirectoryNode | FileNode | None:
+                # Рекурсивно строим дочерние узлы с увеличением глубины
+                return self._build_node(
+                    entry.path, filters, current_depth + 1, entry, pending_sniff
+                )
+
+            # scandir и stat отпускают GIL, поэтому широкий корень обходится
+            # в несколько потоков; map сохраняет порядок записей
+            subdir_count = (
+                sum(entry.is_dir() for entry in sorted_entries) if parallel else 0
+            )
+            if subdir_count > PARALLEL_SUBDIR_THRESHOLD:
+                workers = min(MAX_TREE_WORKERS, os.cpu_count() or 1, subdir_count)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    built = list(executor.map(build_child, sorted_entries))
+            else:
+                built = [build_child(entry) for entry in sorted_entries]
+            child_nodes = [node for node in built if node is not None]
+
+            # .gitignore папки применяется ко всем ее файлам одним пакетом;
+            # слишком большие файлы отсекаются раньше, без сопоставления
+            file_paths = [
+                c.path
+                for c in child_nodes
+                if isinstance(c, FileNode) and not c.is_oversized(filters)
+            ]
+            ignored = (
+                set(gitignore_spec.match_files(file_paths))
+                if file_paths and gitignore_spec.patterns
+                else set()
+            )
+
+            for child_node in child_nodes:
+                # Для файлов проверяем фильтры и запоминаем результат
+                if isinstance(child_node, FileNode):
+                    child_node.excluded = (
+                        child_node.path in ignored or child_node.is_filtered_out(filters)
+                    )
+                    if not child_node.excluded:
+                        dir_node.children.append(child_node)
+                        if (
+                            pending_sniff is not None
+                            and self._binary_by_extension(child_node.path) is None
+                        ):
+                            pending_sniff.append(child_node)
+                # Директории уже проверены в _build_node
+                elif not child_node.excluded:
+                    dir_node.children.append(child_node)
 
         except (PermissionError, OSError):
             pass
 
         return dir_node
 
-    def _is_binary_file(self, file_path: str) -> bool:
+    def _is_binary_file(self, file_path: str, size: int | None = None) -> bool:
         """
         Проверяет, является ли файл бинарным.
 
         Args:
             file_path: Путь к файлу
+            size: Размер файла, если уже известен (иначе берется os.stat)
 
         Returns:
             True если файл бинарный, False в противном случае
         """
-        # Check if result is already cached
-        if file_path in self._is_binary_file_cache:
-            return self._is_binary_file_cache[file_path]
-        # Известные бинарные расширения
-        binary_extensions = {
-            ".pyc",
-            ".pyo",
-            ".exe",
-            ".dll",
-            ".so",
-            ".dylib",
-            ".bin",
-            ".dat",
-            ".jpg",
-            ".jpeg",
-            ".png",
-            ".gif",
-            ".bmp",
-            ".tiff",
-            ".ico",
-            ".mp3",
-            ".mp4",
-            ".avi",
-            ".mkv",
-            ".mov",
-            ".wmv",
-            ".flv",
-            ".pdf",
-            ".doc",
-            ".docx",
-            ".xls",
-            ".xlsx",
-            ".ppt",
-            ".pptx",
-            ".zip",
-            ".rar",
-            ".7z",
-            ".tar",
-            ".gz",
-            ".bz2",
-            ".sqlite",
-            ".db",
-            ".dbf",
-        }
+        return self._is_binary_cached(file_path, size)
+
+    def _sniff_files(self, file_nodes: list[FileNode]) -> None:
+        """
+        Заполняет is_binary файлов, для которых нужно читать содержимое.
 
-        # Проверяем расширение
+        Чтения независимы и упираются в ввод-вывод, поэтому при большом
+        числе файлов они выполняются в пуле потоков.
+        """
+        if len(file_nodes) > PARALLEL_SNIFF_THRESHOLD:
+            workers = min(MAX_SNIFF_WORKERS, len(file_nodes))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                flags = list(
+                    executor.map(
+                        lambda node: self._is_binary_file(node.path, node.size),
+                        file_nodes,
+                    )
+                )
+        else:
+            flags = [self._is_binary_file(node.path, node.size) for node in file_nodes]
+
+        for node, is_binary in zip(file_nodes, flags, strict=True):
+            node.is_binary = is_binary
+
+    def _binary_by_extension(self, file_path: str) -> bool | None:
+        """
+        Определяет бинарность по расширению без чтения файла.
+
+        Returns:
+            True/False, если расширения достаточно, или None, если нужно
+            читать содержимое
+        """
         _, ext = os.path.splitext(file_path.lower())
-        if ext in binary_extensions:
+        if ext in BINARY_EXTENSIONS:
             return True
+        # Содержимое читаем только для файлов с неоднозначным расширением
+        if not self._sniff_content or ext in TEXT_EXTENSIONS:
+            return False
+        return None
+
+    def _detect_binary(self, file_path: str, size: int | None) -> bool:
+        """Определяет бинарность файла без кэша; см. _is_binary_file."""
+        by_extension = self._binary_by_extension(file_path)
+        if by_extension is not None:
+            return by_extension
 
         # Дополнительная проверка: пытаемся прочитать первые несколько байт
         try:
-            # Используем кэшированную проверку существования
-            exists, size = self._get_file_stat(file_path)
-            if not exists or size == 0:
+            if size is None:
+                # Используем кэшированную проверку существования
+                exists, size = self._get_file_stat(file_path)
+                if not exists:
+                    return False
+            if size == 0:
                 return False
 
             with open(file_path, "rb") as f:
-                chunk = f.read(1024)
-                # Если в первых 1024 байтах много нулевых байтов, это вероятно бинарный файл
-                if b"\x00" in chunk:
-                    return True
-                # Проверяем на наличие непечатаемых символов
-                try:
-                    chunk.decode("utf-8")
-                    return False
-                except UnicodeDecodeError:
-                    return True
+                return is_binary_content(f.read(BINARY_SNIFF_BYTES))
         except OSError:
             return True
-
-        return False
@@ -1,7 +1,60 @@
+import fnmatch
+import re
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class _NameMatcher:
+    """
+    Паттерны имен, собранные в множество расширений и одно регулярное выражение.
+
+    Wildcard и подстроки объединяются в одну альтернацию, поэтому имя
+    проверяется одним вызовом regex в C вместо цикла по паттернам.
+    """
+
+    extensions: frozenset[str] = frozenset()
+    regex: re.Pattern[str] | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.extensions and self.regex is None
+
+    def matches(self, name_lower: str, ext: str = "") -> bool:
+        """Проверяет имя (уже в нижнем регистре) и его расширение."""
+        if ext in self.extensions:
+            return True
+        return self.regex is not None and self.regex.search(name_lower) is not None
+
+
+def _compile_patterns(patterns: Iterable[str], allow_ext: bool = False) -> _NameMatcher:
+    """
+    Разбирает паттерны один раз: расширения, wildcard и подстроки.
+
+    Wildcard переводится в regex через fnmatch.translate и привязывается к
+    началу имени, поэтому совпадения те же, что у fnmatch.fnmatch.
+    """
+    extensions = set()
+    alternatives = []
+    for pattern in patterns:
+        lowered = pattern.lower()
+        # Если паттерн начинается с точки - это расширение (только для include)
+        if allow_ext and lowered.startswith("."):
+            extensions.add(lowered)
+        # Если содержит звездочку - это wildcard паттерн
+        elif "*" in lowered:
+            alternatives.append(r"\A" + fnmatch.translate(lowered))
+        # Иначе проверяем вхождение в имя
+        else:
+            alternatives.append(re.escape(lowered))
+    regex = re.compile("|".join(alternatives)) if alternatives else None
+    return _NameMatcher(frozenset(extensions), regex)
+
+
+_EMPTY_MATCHER = _NameMatcher()
+
+
+@dataclass(frozen=True, slots=True)
 class FileSize:
     """Value Object для размера файла в килобайтах."""
 
@@ -16,22 +69,41 @@ class FileSize:
         return self.kb * 1024
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FilterSettings:
-    """Value Object, инкапсулирующий все настройки фильтрации."""
+    """
+    Value Object, инкапсулирующий все настройки фильтрации.
+
+    Неизменяемый и хэшируемый: паттерны хранятся кортежами, выбор файлов -
+    frozenset, поэтому сам объект годится в ключ кэша. Изменения делаются
+    через dataclasses.replace.
+    """
 
-    include_patterns: list[str] = field(default_factory=list)
-    exclude_patterns: list[str] = field(default_factory=list)
+    include_patterns: tuple[str, ...] = ()
+    exclude_patterns: tuple[str, ...] = ()
     max_file_size: FileSize = field(default_factory=lambda: FileSize(kb=50))
     show_excluded: bool = False
-    selected_files: set[str] | None = field(default_factory=set)
+    selected_files: frozenset[str] | None = frozenset()
     max_depth: int | None = None  # None - без ограничений, иначе максимальная глубина
+    # Паттерны, разобранные в __post_init__ для is_excluded файлов и папок
+    _include_matcher: _NameMatcher = field(
+        init=False, repr=False, compare=False, default=_EMPTY_MATCHER
+    )
+    _exclude_matcher: _NameMatcher = field(
+        init=False, repr=False, compare=False, default=_EMPTY_MATCHER
+    )
+    _exclude_dir_matcher: _NameMatcher = field(
+        init=False, repr=False, compare=False, default=_EMPTY_MATCHER
+    )
 
     def __post_init__(self):
-        """Проверяет, что include_patterns и exclude_patterns являются списками строк."""
-        if not isinstance(self.include_patterns, list):
+        """
+        Проверяет, что паттерны - списки или кортежи строк, и приводит
+        паттерны к кортежам, а selected_files - к frozenset.
+        """
+        if not isinstance(self.include_patterns, list | tuple):
             raise ValueError("include_patterns должен быть списком строк")
-        if not isinstance(self.exclude_patterns, list):
+        if not isinstance(self.exclude_patterns, list | tuple):
             raise ValueError("exclude_patterns должен быть списком строк")
         # Проверяем, что все элементы в списках являются строками
         for pattern in self.include_patterns:
@@ -40,3 +112,64 @@ class FilterSettings:
         for pattern in self.exclude_patterns:
             if not isinstance(pattern, str):
                 raise ValueError("Все элементы exclude_patterns должны быть строками")
+
+        # Объект заморожен, поэтому поля выставляются через object.__setattr__
+        object.__setattr__(self, "include_patterns", tuple(self.include_patterns))
+        object.__setattr__(self, "exclude_patterns", tuple(self.exclude_patterns))
+        if self.selected_files is not None:
+            object.__setattr__(self, "selected_files", frozenset(self.selected_files))
+
+        include = [p.strip() for p in self.include_patterns]
+        exclude = [p.strip() for p in self.exclude_patterns]
+        object.__setattr__(
+            self,
+            "_include_matcher",
+            _compile_patterns((p for p in include if p), allow_ext=True),
+        )
+        object.__setattr__(
+            self, "_exclude_matcher", _compile_patterns(p for p in exclude if p)
+        )
+        # Для папок trailing slash в паттерне не учитывается
+        object.__setattr__(
+            self,
+            "_exclude_dir_matcher",
+            _compile_patterns(p.rstrip("/") for p in exclude if p),
+        )
+
+    def includes_file(self, filename: str, ext: str) -> bool:
+        """
+        Проверяет имя файла по include patterns.
+
+        Args:
+            filename: Имя файла в нижнем регистре
+            ext: Расширение файла в нижнем регистре
+
+        Returns:
+            True если паттернов нет или имя подходит под один из них
+        """
+        if self._include_matcher.is_empty:
+            return True
+        return self._include_matcher.matches(filename, ext)
+
+    def excludes_file(self, filename: str) -> bool:
+        """Проверяет имя файла (в нижнем регистре) по exclude patterns."""
+        return self._exclude_matcher.matches(filename)
+
+    def excludes_directory(self, dir_name: str) -> bool:
+        """Проверяет имя папки (в нижнем регистре) по exclude patterns."""
+        return self._exclude_dir_matcher.matches(dir_name)
+
+    def summary(self) -> str:
+        """Краткое описание фильтров для списка истории."""
+        parts = []
+        if self.include_patterns:
+            more = "..." if len(self.include_patterns) > 3 else ""
+            parts.append(f"Include: {', '.join(self.include_patterns[:3])}{more}")
+        if self.exclude_patterns:
+            more = "..." if len(self.exclude_patterns) > 2 else ""
+            parts.append(f"Exclude: {', '.join(self.exclude_patterns[:2])}{more}")
+        if self.max_file_size:
+            parts.append(f"Max: {self.max_file_size.kb}KB")
+        if self.selected_files:
+            parts.append(f"Selected: {len(self.selected_files)}")
+        return " | ".join(parts) if parts else "Default filters"
@@ -4,7 +4,7 @@ from datetime import datetime
 from code2markdown.domain.filters import FilterSettings
 
 
-@dataclass
+@dataclass(slots=True)
 class GenerationRequest:
     """Entity representing a documentation generation request."""
 
@@ -17,3 +17,4 @@ class GenerationRequest:
     file_count: int
     processed_at: datetime
     reference_url: str | None = None
+    filters_summary: str | None = None  # Заполняется хранилищем при сохранении
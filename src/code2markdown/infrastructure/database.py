@@ -1,168 +1,422 @@
 import json
 import os
+import queue
 import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
 
 from code2markdown.application.repository import IHistoryRepository
 from code2markdown.domain.filters import FileSize, FilterSettings
 from code2markdown.domain.request import GenerationRequest
 
+# Bump when the requests table changes; stored in PRAGMA user_version
+SCHEMA_VERSION = 3
+
+_CREATE_REQUESTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS requests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_path TEXT NOT NULL,
+        template_name TEXT NOT NULL,
+        markdown_content TEXT NOT NULL,
+        reference_url TEXT,
+        processed_at DATETIME NOT NULL,
+        file_count INTEGER DEFAULT 0,
+        filter_settings TEXT,
+        project_name TEXT,
+        filters_summary TEXT
+    )
+"""
+
+# Columns added after the first release (backward compatibility)
+_ADDED_COLUMNS = {
+    "file_count": "INTEGER DEFAULT 0",
+    "filter_settings": "TEXT",
+    "project_name": "TEXT",
+    "filters_summary": "TEXT",
+}
+
+# Version 2: serves "recent project paths" and history ordering from an index
+_CREATE_INDEXES = (
+    """
+    CREATE INDEX IF NOT EXISTS idx_requests_processed_path
+    ON requests(processed_at DESC, project_path)
+    """,
+)
+
+# VACUUM runs at most this often; the last run time lives in "<db>.last_vacuum"
+VACUUM_INTERVAL_SECONDS = 24 * 60 * 60
+
+_INSERT_REQUEST = """
+    INSERT INTO requests
+    (project_path, project_name, template_name, markdown_content, reference_url, processed_at, file_count, filter_settings, filters_summary)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Columns read back into GenerationRequest; rows are sqlite3.Row, accessed by name
+_REQUEST_COLUMNS = (
+    "id, project_path, project_name, template_name, markdown_content, reference_url, "
+    "processed_at, file_count, filter_settings, filters_summary"
+)
+
+# Shown in history for rows without stored filters or with unreadable JSON
+_NO_FILTERS_SUMMARY = "No filters"
+_LEGACY_FILTERS_SUMMARY = "Legacy format"
+
+# Tuning applied to every connection. WAL lets the UI read history while a
+# generation is being saved, and synchronous=NORMAL is durable under WAL.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+
+# Upper bound on read-only connections; callers beyond it wait for a free one
+MAX_READERS = 4
+
+
+def open_connection(db_path: str, **kwargs) -> sqlite3.Connection:
+    """Open a SQLite connection with the history database PRAGMAs applied."""
+    conn = sqlite3.connect(db_path, **kwargs)
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def parse_filter_settings(filter_settings_json: str | None) -> FilterSettings | None:
+    """Rebuild FilterSettings from its stored JSON; None if missing or invalid."""
+    if not filter_settings_json:
+        return None
+    try:
+        data = json.loads(filter_settings_json)
+        return FilterSettings(
+            include_patterns=data.get("include_patterns", []),
+            exclude_patterns=data.get("exclude_patterns", []),
+            max_file_size=FileSize(kb=data.get("max_file_size", 50)),
+            show_excluded=data.get("show_excluded", False),
+        )
+    except (json.JSONDecodeError, ValueError, AttributeError):
+        # Handle legacy format or corrupted data
+        return None
+
+
+def _backfill_filters_summary(conn: sqlite3.Connection) -> None:
+    """Compute filters_summary once for rows stored before the column existed."""
+    rows = conn.execute(
+        "SELECT id, filter_settings FROM requests WHERE filters_summary IS NULL"
+    ).fetchall()
+    updates = []
+    for request_id, filter_settings_json in rows:
+        filter_settings = parse_filter_settings(filter_settings_json)
+        if filter_settings is not None:
+            summary = filter_settings.summary()
+        elif filter_settings_json:
+            summary = _LEGACY_FILTERS_SUMMARY
+        else:
+            summary = _NO_FILTERS_SUMMARY
+        updates.append((summary, request_id))
+    conn.executemany("UPDATE requests SET filters_summary = ? WHERE id = ?", updates)
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """
+    Create or migrate the requests table unless the schema is already current.
+
+    The connection must be in autocommit mode (isolation_level=None) so that
+    the migration runs in a single explicit transaction.
+    """
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    if version >= SCHEMA_VERSION:
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(_CREATE_REQUESTS_TABLE)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(requests)")}
+        for column, definition in _ADDED_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE requests ADD COLUMN {column} {definition}")
+        for statement in _CREATE_INDEXES:
+            conn.execute(statement)
+        _backfill_filters_summary(conn)
+        # Give the planner statistics for the new indexes right away
+        conn.execute("ANALYZE")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+
 
 class SqliteHistoryRepository(IHistoryRepository):
     """Implementation of history repository using SQLite database."""
 
-    def __init__(self, db_path: str = "code2markdown.db"):
+    def __init__(self, db_path: str = "code2markdown.db", max_readers: int = MAX_READERS):
         self._db_path = db_path
+        # A single long-lived writer shared by all threads, serialized by a
+        # reentrant lock so a thread may write while it iterates a read.
+        self._write_conn = open_connection(
+            db_path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._write_lock = threading.RLock()
+        # Read-only connections are pooled: at most max_readers are opened,
+        # lazily, and handed to whichever thread reads next. An in-memory
+        # database has no file to reopen, so it is read through the writer.
+        self._in_memory = db_path == ":memory:"
+        self._reader_slots = threading.BoundedSemaphore(max_readers)
+        self._idle_readers: queue.SimpleQueue[sqlite3.Connection] = queue.SimpleQueue()
+        self._read_conns: list[sqlite3.Connection] = []
         self._init_db()
 
     def _init_db(self) -> None:
         """Initialize the database and create required tables and columns."""
-        conn = sqlite3.connect(self._db_path)
-        cursor = conn.cursor()
-
-        # Create table if it doesn't exist
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS requests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                project_path TEXT NOT NULL,
-                template_name TEXT NOT NULL,
-                markdown_content TEXT NOT NULL,
-                reference_url TEXT,
-                processed_at DATETIME NOT NULL,
-                file_count INTEGER DEFAULT 0,
-                filter_settings TEXT,
-                project_name TEXT
-            )
-        """)
+        with self._write_lock:
+            ensure_schema(self._write_conn)
 
-        # Add new columns if they don't exist (backward compatibility)
-        try:
-            cursor.execute("ALTER TABLE requests ADD COLUMN file_count INTEGER DEFAULT 0")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
+    def run_maintenance(self, vacuum_interval: float = VACUUM_INTERVAL_SECONDS) -> bool:
+        """
+        Refresh planner statistics and VACUUM at most once per interval.
 
+        PRAGMA optimize re-analyzes only tables whose statistics are stale, so
+        it is cheap enough for every startup. Maintenance is best effort: a
+        busy database skips it instead of failing. Returns True if VACUUM ran.
+        """
+        marker = Path(f"{self._db_path}.last_vacuum")
         try:
-            cursor.execute("ALTER TABLE requests ADD COLUMN filter_settings TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
+            last_vacuum = float(marker.read_text())
+        except (OSError, ValueError):
+            last_vacuum = 0.0
+        now = time.time()
+
+        with self._write_lock:
+            try:
+                self._write_conn.execute("PRAGMA optimize")
+                if now - last_vacuum < vacuum_interval:
+                    return False
+                self._write_conn.execute("VACUUM")
+                self._write_conn.execute("ANALYZE")
+            except sqlite3.OperationalError:
+                return False
 
         try:
-            cursor.execute("ALTER TABLE requests ADD COLUMN project_name TEXT")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
+            marker.write_text(str(now))
+        except OSError:
+            pass
+        return True
 
-        conn.commit()
-        conn.close()
+    def _open_reader(self) -> sqlite3.Connection:
+        """Open a read-only connection to the database file."""
+        uri = f"{Path(self._db_path).resolve().as_uri()}?mode=ro"
+        conn = open_connection(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        with self._write_lock:
+            self._read_conns.append(conn)
+        return conn
 
-    def save(self, request: GenerationRequest) -> None:
-        """Save a generation request to the database."""
-        conn = sqlite3.connect(self._db_path)
-        cursor = conn.cursor()
+    @contextmanager
+    def _reading(self) -> Iterator[sqlite3.Cursor]:
+        """Borrow a cursor that returns sqlite3.Row from the reader pool."""
+        if self._in_memory:
+            with self._write_lock:
+                cursor = self._write_conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                yield cursor
+            return
 
-        try:
-            # Convert FilterSettings to JSON for storage
-            filter_settings_json = json.dumps(
-                {
-                    "include_patterns": request.filter_settings.include_patterns,
-                    "exclude_patterns": request.filter_settings.exclude_patterns,
-                    "max_file_size": request.filter_settings.max_file_size.kb,
-                    "show_excluded": request.filter_settings.show_excluded,
-                }
-            )
+        with self._reader_slots:
+            try:
+                conn = self._idle_readers.get_nowait()
+            except queue.Empty:
+                conn = self._open_reader()
+            try:
+                yield conn.cursor()
+            finally:
+                self._idle_readers.put(conn)
 
-            cursor.execute(
-                """
-                INSERT INTO requests
-                (project_path, project_name, template_name, markdown_content, reference_url, processed_at, file_count, filter_settings)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    request.project_path,
-                    request.project_name,
-                    request.template_name,
-                    request.markdown_content,
-                    request.reference_url,
-                    request.processed_at.isoformat(),
-                    request.file_count,
-                    filter_settings_json,
-                ),
-            )
+    def close(self) -> None:
+        """Close the writer and every reader connection."""
+        with self._write_lock:
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns.clear()
+            self._idle_readers = queue.SimpleQueue()
+            self._write_conn.close()
+
+    @staticmethod
+    def _to_row(request: GenerationRequest) -> tuple:
+        """Convert a request into the parameter tuple used by _INSERT_REQUEST."""
+        # Convert FilterSettings to JSON for storage
+        filter_settings_json = json.dumps(
+            {
+                "include_patterns": request.filter_settings.include_patterns,
+                "exclude_patterns": request.filter_settings.exclude_patterns,
+                "max_file_size": request.filter_settings.max_file_size.kb,
+                "show_excluded": request.filter_settings.show_excluded,
+            }
+        )
+        return (
+            request.project_path,
+            request.project_name,
+            request.template_name,
+            request.markdown_content,
+            request.reference_url,
+            request.processed_at.isoformat(),
+            request.file_count,
+            filter_settings_json,
+            request.filter_settings.summary(),
+        )
+
+    def save(self, request: GenerationRequest) -> None:
+        """Save a generation request to the database."""
+        row = self._to_row(request)
+        with self._write_lock:
+            cursor = self._write_conn.execute(_INSERT_REQUEST, row)
 
             # Update the request ID with the auto-generated value
             request.id = cursor.lastrowid
 
-            conn.commit()
-        except sqlite3.Error as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+    def save_many(self, requests: list[GenerationRequest]) -> None:
+        """Save several generation requests in a single write transaction."""
+        if not requests:
+            return
+
+        rows = [self._to_row(request) for request in requests]
+        with self._write_lock:
+            conn = self._write_conn
+            # IMMEDIATE takes the write lock up front, avoiding SQLITE_BUSY
+            # on a later read-to-write lock upgrade
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_INSERT_REQUEST, rows)
+                (last_id,) = conn.execute("SELECT last_insert_rowid()").fetchone()
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+
+        # Rows inserted within one locked transaction get consecutive ids
+        first_id = last_id - len(requests) + 1
+        for offset, request in enumerate(requests):
+            request.id = first_id + offset
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> GenerationRequest:
+        """Build a GenerationRequest from a row with the _REQUEST_COLUMNS names."""
+        filter_settings = parse_filter_settings(row["filter_settings"])
+        project_path = row["project_path"]
+
+        # Handle legacy data where project_name might be missing
+        project_name = row["project_name"] or (
+            os.path.basename(project_path) if project_path != "N/A" else "Unknown"
+        )
+
+        return GenerationRequest(
+            id=row["id"],
+            project_path=project_path,
+            project_name=project_name,
+            template_name=row["template_name"],
+            markdown_content=row["markdown_content"],
+            reference_url=row["reference_url"],
+            processed_at=datetime.fromisoformat(row["processed_at"]),
+            file_count=row["file_count"],
+            filter_settings=filter_settings
+            or FilterSettings(),  # Use default if parsing failed
+            filters_summary=row["filters_summary"],
+        )
+
+    def iter_all(self) -> Iterator[GenerationRequest]:
+        """
+        Yield generation requests newest first, converting rows as they are read.
+
+        The cursor is consumed row by row, so only the current row is held in
+        memory and the first request is available before the scan finishes.
+        """
+        with self._reading() as cursor:
+            cursor.execute(
+                f"SELECT {_REQUEST_COLUMNS} FROM requests ORDER BY processed_at DESC"
+            )
+            for row in cursor:
+                yield self._from_row(row)
 
     def get_all(self) -> list[GenerationRequest]:
         """Retrieve all generation requests from the database."""
-        conn = sqlite3.connect(self._db_path)
-        cursor = conn.cursor()
+        return list(self.iter_all())
 
-        try:
-            cursor.execute("SELECT * FROM requests ORDER BY processed_at DESC")
-            rows = cursor.fetchall()
-
-            requests = []
-            for row in rows:
-                # Extract filter settings and parse JSON
-                filter_settings_data = row[7]  # filter_settings column
-                filter_settings = None
-                if filter_settings_data:
-                    try:
-                        data = json.loads(filter_settings_data)
-                        # Reconstruct FilterSettings object
-                        filter_settings = FilterSettings(
-                            include_patterns=data.get("include_patterns", []),
-                            exclude_patterns=data.get("exclude_patterns", []),
-                            max_file_size=FileSize(kb=data.get("max_file_size", 50)),
-                            show_excluded=data.get("show_excluded", False),
-                        )
-                    except (json.JSONDecodeError, ValueError):
-                        # Handle legacy format or corrupted data
-                        pass
-
-                # Handle legacy data where project_name might be missing
-                project_name = (
-                    row[8]
-                    if len(row) > 8
-                    else os.path.basename(row[1])
-                    if row[1] != "N/A"
-                    else "Unknown"
-                )
-
-                request = GenerationRequest(
-                    id=row[0],
-                    project_path=row[1],
-                    project_name=project_name,
-                    template_name=row[2],
-                    markdown_content=row[3],
-                    reference_url=row[4],
-                    processed_at=datetime.fromisoformat(row[5]),
-                    file_count=row[6],
-                    filter_settings=filter_settings
-                    or FilterSettings(),  # Use default if parsing failed
-                )
-                requests.append(request)
-
-            return requests
-        finally:
-            conn.close()
+    def get_page(
+        self, limit: int, offset: int = 0
+    ) -> tuple[list[GenerationRequest], int]:
+        """
+        Return one page of requests (newest first) and the total row count.
+
+        markdown_content is left empty: the blobs dominate row size and are
+        only needed for the opened record, see get_markdown_content.
+        """
+        # COUNT(*) OVER() is evaluated before LIMIT, so every row carries the
+        # size of the whole table and one query serves both the page and the
+        # pager; ORDER BY processed_at walks idx_requests_processed_path
+        with self._reading() as cursor:
+            rows = cursor.execute(
+                """
+                SELECT id, project_path, project_name, template_name,
+                       '' AS markdown_content, reference_url, processed_at, file_count,
+                       filter_settings, filters_summary, COUNT(*) OVER () AS total
+                FROM requests
+                ORDER BY processed_at DESC
+                LIMIT ? OFFSET ?
+                """,
+                (limit, offset),
+            ).fetchall()
+            if not rows:
+                # An offset past the end yields no rows, and with them no total
+                (total,) = cursor.execute("SELECT COUNT(*) FROM requests").fetchone()
+                return [], total
+        return [self._from_row(row) for row in rows], rows[0]["total"]
+
+    def get_markdown_content(self, request_id: int) -> str | None:
+        """Return the generated markdown of one request, or None if missing."""
+        with self._reading() as cursor:
+            row = cursor.execute(
+                "SELECT markdown_content FROM requests WHERE id = ?", (request_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_recent_project_paths(self, limit: int = 10) -> list[str]:
+        """Return distinct project paths, most recently processed first."""
+        with self._reading() as cursor:
+            cursor.execute(
+                """
+                SELECT DISTINCT project_path
+                FROM requests
+                ORDER BY processed_at DESC
+                LIMIT ?
+                """,
+                (limit,),
+            )
+            return [row[0] for row in cursor.fetchall()]
 
     def delete(self, request_id: int) -> None:
         """Delete a generation request by ID."""
-        conn = sqlite3.connect(self._db_path)
-        cursor = conn.cursor()
+        with self._write_lock:
+            self._write_conn.execute("DELETE FROM requests WHERE id = ?", (request_id,))
 
-        try:
-            cursor.execute("DELETE FROM requests WHERE id = ?", (request_id,))
-            conn.commit()
-        except sqlite3.Error as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+    def delete_many(self, request_ids: list[int]) -> None:
+        """Delete several generation requests in a single write transaction."""
+        if not request_ids:
+            return
+
+        rows = [(request_id,) for request_id in request_ids]
+        with self._write_lock:
+            conn = self._write_conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("DELETE FROM requests WHERE id = ?", rows)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import pathspec
+
+from code2markdown.domain.files import read_gitignore_spec
+from code2markdown.domain.filters import FilterSettings
+
+DEFAULT_CACHE_DIR = ".code2markdown_cache"
+
+
+@lru_cache(maxsize=256)
+def _gitignore_spec(dir_path: str, mtime_ns: int) -> pathspec.PathSpec:
+    """Parse a folder's .gitignore once per (folder, mtime)."""
+    return read_gitignore_spec(dir_path)
+
+
+def _excluded_by_own_gitignore(dir_path: str, digest: hashlib.blake2b) -> bool:
+    """
+    Apply DirectoryNode's rule: a folder is matched against its own .gitignore.
+
+    The .gitignore stat goes into the digest, so editing it changes the
+    signature even when the folder ends up pruned.
+    """
+    gitignore_path = os.path.join(dir_path, ".gitignore")
+    try:
+        mtime_ns = os.stat(gitignore_path).st_mtime_ns
+    except OSError:
+        return False
+    digest.update(f"{gitignore_path}\0{mtime_ns}\n".encode(errors="replace"))
+    return _gitignore_spec(dir_path, mtime_ns).match_file(dir_path)
+
+
+def _is_pruned(dir_path: str, filters: FilterSettings, digest: hashlib.blake2b) -> bool:
+    """True if ProjectTreeBuilder would not descend into dir_path."""
+    if filters.excludes_directory(os.path.basename(dir_path).lower()):
+        return True
+    return _excluded_by_own_gitignore(dir_path, digest)
+
+
+def directory_signature(root_path: str, filters: FilterSettings | None = None) -> str:
+    """
+    Hash the (path, mtime, size) of the entries ProjectTreeBuilder scans.
+
+    The walk prunes exactly where the builder stops descending: folders
+    matched by filters.exclude_patterns or by their own .gitignore, and
+    folders at depth >= filters.max_depth. Files inside scanned folders are
+    hashed even when a pattern or .gitignore drops them, which can only
+    cause a spurious cache miss, never a stale hit. The filter fields that
+    shape the tree are hashed too, so one signature never serves two
+    different filter settings.
+    """
+    filters = filters or FilterSettings()
+    max_depth = filters.max_depth
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        repr(
+            (
+                filters.include_patterns,
+                filters.exclude_patterns,
+                filters.max_file_size.kb if filters.max_file_size else None,
+                filters.show_excluded,
+                max_depth,
+            )
+        ).encode(errors="replace")
+    )
+    try:
+        root_stat = os.stat(root_path)
+    except OSError:
+        return digest.hexdigest()
+    digest.update(f"{root_path}\0{root_stat.st_mtime_ns}\n".encode(errors="replace"))
+    if _is_pruned(root_path, filters, digest):
+        return digest.hexdigest()
+
+    stack = [(root_path, 0)]
+    while stack:
+        path, depth = stack.pop()
+        if max_depth is not None and max_depth >= 0 and depth >= max_depth:
+            continue
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        for entry in entries:
+            try:
+                entry_stat = entry.stat()
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            digest.update(
+                f"{entry.path}\0{entry_stat.st_mtime_ns}\0{entry_stat.st_size}\n".encode(
+                    errors="replace"
+                )
+            )
+            if is_dir and not _is_pruned(entry.path, filters, digest):
+                stack.append((entry.path, depth + 1))
+
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Pickle-per-key cache that survives app restarts."""
+
+    def __init__(self, cache_dir: str | Path = DEFAULT_CACHE_DIR, max_entries: int = 64):
+        self._cache_dir = Path(cache_dir)
+        self._max_entries = max_entries
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a stable key from hashable, repr-able parts."""
+        return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self._cache_dir / f"{key}.pkl"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or unreadable."""
+        try:
+            with open(self._entry_path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value atomically; cache write failures are never fatal."""
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._prune()
+
+    def _prune(self) -> None:
+        """Drop the least recently written entries beyond max_entries."""
+        try:
+            entries = [
+                (entry.stat().st_mtime_ns, entry.path)
+                for entry in os.scandir(self._cache_dir)
+                if entry.name.endswith(".pkl")
+            ]
+        except OSError:
+            return
+
+        if len(entries) <= self._max_entries:
+            return
+        entries.sort()
+        for _mtime, path in entries[: len(entries) - self._max_entries]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
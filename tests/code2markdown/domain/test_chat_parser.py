@@ -25,6 +25,8 @@ def test_filename_to_title():
         parser._filename_to_title("documentation-maintenance.md")
         == "Documentation Maintenance"
     )
+    # Only the trailing extension is removed
+    assert parser._filename_to_title("my.md-notes.md") == "My.Md Notes"
 
 
 def test_extract_filename_from_parentheses():
@@ -56,6 +58,11 @@ def test_extract_filename_from_title():
         parser._extract_filename_from_title("# Требования проекта") == "requirements.md"
     )
     assert parser._extract_filename_from_title("# Бэклог проекта") == "backlog.md"
+    # Several keywords: the earlier entry of TITLE_TO_FILENAME_MAP wins
+    assert parser._extract_filename_from_title("Backlog and GAP Analysis") == "gap.md"
+    # Overlapping keywords: "gap analysis" starts inside the "backlog" match
+    assert parser._extract_filename_from_title("backlogap analysis") == "gap.md"
+    assert parser._extract_filename_from_title("# Notes") is None
     assert (
         parser._extract_filename_from_title("# Roadmap for the project") == "roadmap.md"
     )
@@ -108,6 +115,9 @@ Some text after
     assert len(log) > 0
     assert "Starting chat file parsing..." in log
     assert "Found 2 documents with valid filenames" in log
+    # The block count is reported right after the start, before per-block entries
+    assert log[1] == "Found 2 markdown code blocks"
+    assert log[2] == "Found document block for gap.md"
 
 
 def test_parse_chat_file_with_new_format():
@@ -265,6 +275,8 @@ def test_create_zip_archive():
             # Check that both files are in the zip
             assert "test1.md" in zipf.namelist()
             assert "test2.md" in zipf.namelist()
+            assert zipf.getinfo("test1.md").compress_type == zipfile.ZIP_DEFLATED
+            assert zipf.getinfo("test1.md").date_time == (1980, 1, 1, 0, 0, 0)
 
             # Check the contents of the files
             with zipf.open("test1.md") as f:
@@ -274,6 +286,13 @@ def test_create_zip_archive():
             with zipf.open("test2.md") as f:
                 content2 = f.read().decode("utf-8")
                 assert "# Test 2" in content2
+
+        # Same documents produce a byte-identical archive
+        with open(zip_path, "rb") as f:
+            first_bytes = f.read()
+        parser.create_zip_archive(documents, zip_path)
+        with open(zip_path, "rb") as f:
+            assert f.read() == first_bytes
     finally:
         # Clean up the temporary file
         if os.path.exists(zip_path):
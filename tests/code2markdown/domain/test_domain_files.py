@@ -1,8 +1,18 @@
 import os
 import tempfile
 import unittest
-
-from code2markdown.domain.files import DirectoryNode, FileNode, ProjectTreeBuilder
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from code2markdown.domain.files import (
+    PARALLEL_SNIFF_THRESHOLD,
+    PARALLEL_SUBDIR_THRESHOLD,
+    DirectoryNode,
+    FileNode,
+    ProjectTreeBuilder,
+    is_binary_content,
+    read_gitignore_spec,
+)
 from code2markdown.domain.filters import FileSize, FilterSettings
 
 
@@ -277,6 +287,162 @@ class TestProjectTreeBuilder(unittest.TestCase):
         # With max_depth=0, root should have no children
         self.assertEqual(len(root_node.children), 0)
 
+    def test_build_tree_without_content_sniffing(self):
+        with open(os.path.join(self.test_dir, "blob.raw"), "wb") as f:
+            f.write(b"\x00\x01binary")
+        filters = FilterSettings(include_patterns=[".raw", ".txt"], exclude_patterns=[])
+
+        sniffing = ProjectTreeBuilder().build_tree(self.test_dir, filters)
+        by_extension = ProjectTreeBuilder(sniff_content=False).build_tree(
+            self.test_dir, filters
+        )
+
+        def binary_flags(root):
+            return {c.name: c.is_binary for c in root.children if isinstance(c, FileNode)}
+
+        self.assertTrue(binary_flags(sniffing)["blob.raw"])
+        self.assertFalse(binary_flags(by_extension)["blob.raw"])
+        # Известное текстовое расширение решает без чтения содержимого
+        self.assertFalse(binary_flags(sniffing)["file2.txt"])
+
+    def test_build_tree_takes_type_and_size_from_scandir(self):
+        filters = FilterSettings(include_patterns=[".py", ".txt"], exclude_patterns=[])
+        with (
+            patch("code2markdown.domain.files.os.stat", wraps=os.stat) as stat,
+            patch(
+                "code2markdown.domain.files.os.path.isfile", wraps=os.path.isfile
+            ) as isfile,
+        ):
+            root = ProjectTreeBuilder().build_tree(self.test_dir, filters)
+
+        # Только корень проверяется через os.stat/isfile, дочерние узлы - через DirEntry
+        stat_paths = [call.args[0] for call in stat.call_args_list]
+        self.assertNotIn(self.file1_path, stat_paths)
+        self.assertNotIn(self.subdir_path, stat_paths)
+        self.assertEqual(isfile.call_count, 1)
+        sizes = {c.name: c.size for c in root.children if isinstance(c, FileNode)}
+        self.assertEqual(sizes["file1.py"], len("print('file1')"))
+
+    def test_build_tree_parses_gitignore_once_per_directory(self):
+        """Test that .gitignore is parsed once per folder and reread on change"""
+        gitignore_path = os.path.join(self.test_dir, ".gitignore")
+        with open(gitignore_path, "w") as f:
+            f.write("*.txt\n")
+        filters = FilterSettings(include_patterns=[], exclude_patterns=[])
+        builder = ProjectTreeBuilder()
+
+        with patch(
+            "code2markdown.domain.files.read_gitignore_spec",
+            wraps=read_gitignore_spec,
+        ) as read_spec:
+            root = builder.build_tree(self.test_dir, filters)
+            builder._cache.clear()
+            builder.build_tree(self.test_dir, filters)
+
+        names = {child.name for child in root.children}
+        self.assertIn("file1.py", names)
+        self.assertNotIn("file2.txt", names)
+        self.assertEqual(read_spec.call_count, 1)
+
+        with open(gitignore_path, "w") as f:
+            f.write("*.py\n")
+        stat = os.stat(gitignore_path)
+        os.utime(gitignore_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        builder._cache.clear()
+        root = builder.build_tree(self.test_dir, filters)
+
+        names = {child.name for child in root.children}
+        self.assertNotIn("file1.py", names)
+        self.assertIn("file2.txt", names)
+
+    def test_binary_checks_are_cached_until_cleared(self):
+        """Test that binary detection results are kept in the LRU cache"""
+        blob_path = os.path.join(self.test_dir, "blob.raw")
+        with open(blob_path, "wb") as f:
+            f.write(b"\x00\x01\x02")
+        builder = ProjectTreeBuilder()
+
+        with patch("builtins.open", wraps=open) as opened:
+            self.assertTrue(builder._is_binary_file(blob_path))
+            self.assertTrue(builder._is_binary_file(blob_path))
+            self.assertEqual(opened.call_count, 1)
+
+            builder.clear_caches()
+            self.assertTrue(builder._is_binary_file(blob_path))
+            self.assertEqual(opened.call_count, 2)
+
+    def test_build_tree_sniffs_unknown_extensions_in_thread_pool(self):
+        """Test that content sniffing of many files goes through a thread pool"""
+        for i in range(PARALLEL_SNIFF_THRESHOLD + 2):
+            with open(os.path.join(self.test_dir, f"data{i}.raw"), "wb") as f:
+                f.write(b"\x00\x01" if i % 2 else b"plain text")
+        filters = FilterSettings(include_patterns=[], exclude_patterns=[])
+
+        with patch(
+            "code2markdown.domain.files.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+        ) as executor:
+            root = ProjectTreeBuilder().build_tree(self.test_dir, filters)
+
+        executor.assert_called_once()
+        flags = {c.name: c.is_binary for c in root.children if isinstance(c, FileNode)}
+        self.assertTrue(flags["data1.raw"])
+        self.assertFalse(flags["data0.raw"])
+        self.assertFalse(flags["file1.py"])
+
+    def test_oversized_files_skip_gitignore_matching(self):
+        """Test that files over max_file_size never reach the .gitignore spec"""
+        big_path = os.path.join(self.test_dir, "big.py")
+        with open(big_path, "w") as f:
+            f.write("x" * 2048)
+        with open(os.path.join(self.test_dir, ".gitignore"), "w") as f:
+            f.write("*.log\n")
+
+        with patch(
+            "pathspec.PathSpec.match_files", autospec=True, return_value=[]
+        ) as match:
+            root = ProjectTreeBuilder().build_tree(self.test_dir, self.filters)
+
+        matched_paths = [path for call in match.call_args_list for path in call.args[1]]
+        self.assertIn(self.file1_path, matched_paths)
+        self.assertNotIn(big_path, matched_paths)
+        self.assertNotIn("big.py", {child.name for child in root.children})
+
+    def test_build_tree_walks_wide_root_in_thread_pool(self):
+        """Test that a root with many subfolders is built in parallel, in order"""
+        for i in range(PARALLEL_SUBDIR_THRESHOLD + 1):
+            os.mkdir(os.path.join(self.test_dir, f"pkg{i}"))
+            with open(os.path.join(self.test_dir, f"pkg{i}", "mod.py"), "w") as f:
+                f.write("x = 1")
+        filters = FilterSettings(include_patterns=[".py"], exclude_patterns=[])
+        serial = ProjectTreeBuilder()._build_node(self.test_dir, filters, 0)
+
+        with patch(
+            "code2markdown.domain.files.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+        ) as executor:
+            root = ProjectTreeBuilder().build_tree(self.test_dir, filters)
+
+        executor.assert_called_once()
+        self.assertEqual(root, serial)
+        self.assertEqual(
+            [child.name for child in root.children][:3],
+            ["excluded.py", "file1.py", "pkg0"],
+        )
+
+    def test_build_tree_records_excluded_flag(self):
+        """Test that build_tree stores the is_excluded result on each node"""
+        cache_dir = os.path.join(self.test_dir, "cache")
+        os.mkdir(cache_dir)
+
+        root_node = self.builder.build_tree(self.test_dir, self.filters)
+
+        self.assertFalse(root_node.excluded)
+        for child in root_node.children:
+            self.assertFalse(child.excluded)
+            self.assertEqual(child.excluded, child.is_excluded(self.filters))
+
+        cache_node = self.builder._build_node(cache_dir, self.filters, 1)
+        self.assertTrue(cache_node.excluded)
+
     def test_build_tree_with_max_depth_two(self):
         """Test that build_tree with max_depth=2 explores to second level"""
         # Create filters with max_depth=2
@@ -369,6 +535,59 @@ class TestDirectoryNode(unittest.TestCase):
         self.assertEqual(len(dir_node.children), 1)
         self.assertEqual(dir_node.children[0], file_node)
 
+    def test_to_dict_builds_ui_structure(self):
+        """Test that to_dict nests children and collects subtree paths"""
+        tree = DirectoryNode(
+            path="/p",
+            name="p",
+            children=[
+                DirectoryNode(
+                    path="/p/pkg",
+                    name="pkg",
+                    children=[
+                        FileNode(
+                            path="/p/pkg/a.py", name="a.py", size=3, is_binary=False
+                        ),
+                        FileNode(
+                            path="/p/pkg/b.log",
+                            name="b.log",
+                            size=5,
+                            is_binary=False,
+                            excluded=True,
+                        ),
+                    ],
+                ),
+                FileNode(path="/p/main.py", name="main.py", size=7, is_binary=False),
+            ],
+        )
+
+        result = tree.to_dict()
+
+        self.assertEqual(set(result), {"pkg", "main.py"})
+        self.assertEqual(
+            result["main.py"],
+            {"type": "file", "path": "/p/main.py", "excluded": False, "size": 7},
+        )
+        pkg = result["pkg"]
+        self.assertEqual(pkg["type"], "folder")
+        self.assertEqual(set(pkg["children"]), {"a.py", "b.log"})
+        self.assertEqual(pkg["all_paths"], ["/p/pkg/a.py", "/p/pkg/b.log"])
+        self.assertEqual(pkg["included_paths"], ["/p/pkg/a.py"])
+        self.assertEqual(pkg["folder_count"], 0)
+
+
+class TestIsBinaryContent(unittest.TestCase):
+    def test_text_and_truncated_utf8_are_not_binary(self):
+        text = "Привет, мир\n".encode() * 100
+        self.assertFalse(is_binary_content(b""))
+        self.assertFalse(is_binary_content(text))
+        # Обрезанная посередине многобайтовая последовательность остается текстом
+        self.assertFalse(is_binary_content(text[:-2]))
+
+    def test_null_or_control_bytes_are_binary(self):
+        self.assertTrue(is_binary_content(b"abc\x00def"))
+        self.assertTrue(is_binary_content(bytes(range(1, 7)) * 10 + b"text"))
+
 
 if __name__ == "__main__":
     unittest.main()
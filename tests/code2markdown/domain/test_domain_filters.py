@@ -1,3 +1,5 @@
+import dataclasses
+
 import pytest
 
 from code2markdown.domain.filters import FileSize, FilterSettings
@@ -47,8 +49,8 @@ class TestFilterSettings:
             show_excluded=True,
         )
 
-        assert settings.include_patterns == [".py", ".txt"]
-        assert settings.exclude_patterns == ["node_modules", ".git"]
+        assert settings.include_patterns == (".py", ".txt")
+        assert settings.exclude_patterns == ("node_modules", ".git")
         assert settings.max_file_size.kb == 50
         assert settings.show_excluded is True
 
@@ -57,8 +59,8 @@ class TestFilterSettings:
             include_patterns=[], exclude_patterns=[], max_file_size=FileSize(kb=100)
         )
 
-        assert settings.include_patterns == []
-        assert settings.exclude_patterns == []
+        assert settings.include_patterns == ()
+        assert settings.exclude_patterns == ()
         assert settings.max_file_size.kb == 100
         assert settings.show_excluded is False  # значение по умолчанию
 
@@ -121,3 +123,63 @@ class TestFilterSettings:
             FilterSettings(
                 include_patterns=[".py", 123], exclude_patterns=["node_modules", 456]
             )
+
+    def test_summary(self):
+        """Тест краткого описания фильтров для истории"""
+        settings = FilterSettings(
+            include_patterns=[".py", ".md", ".txt", ".js"],
+            exclude_patterns=["node_modules"],
+            max_file_size=FileSize(kb=75),
+            selected_files={"a.py", "b.py"},
+        )
+
+        assert settings.summary() == (
+            "Include: .py, .md, .txt... | Exclude: node_modules | Max: 75KB | Selected: 2"
+        )
+        assert FilterSettings().summary() == "Max: 50KB"
+
+    def test_compiled_patterns_match_like_fnmatch(self):
+        """Тест разобранных паттернов: расширение, wildcard и подстрока"""
+        settings = FilterSettings(
+            include_patterns=[".PY", "Make*", "readme", "  "],
+            exclude_patterns=["*_test.py", "build/", "tmp"],
+        )
+
+        assert settings.includes_file("main.py", ".py")
+        assert settings.includes_file("makefile", "")
+        assert settings.includes_file("old_readme.rst", ".rst")
+        assert not settings.includes_file("main.js", ".js")
+        assert FilterSettings().includes_file("main.js", ".js")
+
+        assert settings.excludes_file("app_test.py")
+        assert settings.excludes_file("tmp_notes.md")
+        assert not settings.excludes_file("app.py")
+        assert settings.excludes_directory("build")
+        assert not settings.excludes_directory("src")
+
+        # Служебные поля не участвуют в сравнении и repr
+        assert settings == FilterSettings(
+            include_patterns=[".PY", "Make*", "readme", "  "],
+            exclude_patterns=["*_test.py", "build/", "tmp"],
+        )
+        assert "_matcher" not in repr(settings)
+
+    def test_settings_are_frozen_and_hashable(self):
+        """Тест неизменяемости: равные настройки дают один ключ словаря"""
+        settings = FilterSettings(
+            include_patterns=[".py"], selected_files={"a.py"}, max_depth=2
+        )
+
+        assert settings.selected_files == frozenset({"a.py"})
+        assert hash(settings) == hash(
+            FilterSettings(
+                include_patterns=(".py",), selected_files={"a.py"}, max_depth=2
+            )
+        )
+        assert {settings: 1}[
+            FilterSettings(
+                include_patterns=[".py"], max_depth=2, selected_files=frozenset({"a.py"})
+            )
+        ] == 1
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            settings.max_depth = 3
@@ -1,12 +1,14 @@
+import dataclasses
 import os
 import sqlite3
+import threading
 from datetime import datetime
 
 import pytest
 
 from code2markdown.domain.filters import FileSize, FilterSettings
 from code2markdown.domain.request import GenerationRequest
-from code2markdown.infrastructure.database import SqliteHistoryRepository
+from code2markdown.infrastructure.database import SCHEMA_VERSION, SqliteHistoryRepository
 
 
 class TestSqliteHistoryRepository:
@@ -26,6 +28,7 @@ class TestSqliteHistoryRepository:
         repo = SqliteHistoryRepository(db_path=db_path)
         yield repo
         # Cleanup
+        repo.close()
         if os.path.exists(db_path):
             os.remove(db_path)
 
@@ -79,13 +82,11 @@ class TestSqliteHistoryRepository:
         """Test saving multiple requests."""
         # Modify the sample request for multiple saves
         request1 = sample_request
-        request2 = GenerationRequest(
-            **{
-                **sample_request.__dict__,
-                "id": None,
-                "project_path": "/path/to/another/project",
-                "processed_at": datetime(2025, 1, 2, 12, 0, 0),
-            }
+        request2 = dataclasses.replace(
+            sample_request,
+            id=None,
+            project_path="/path/to/another/project",
+            processed_at=datetime(2025, 1, 2, 12, 0, 0),
         )
 
         # Save both requests
@@ -226,6 +227,7 @@ class TestSqliteHistoryRepository:
         # Create repository and test
         repo = SqliteHistoryRepository(db_path=db_path)
         requests = repo.get_all()
+        repo.close()
 
         # Should handle both cases gracefully
         assert len(requests) == 2
@@ -235,8 +237,8 @@ class TestSqliteHistoryRepository:
         legacy_request = next(
             req for req in requests if req.project_path == "/legacy/path"
         )
-        assert legacy_request.filter_settings.include_patterns == [".py"]
-        assert legacy_request.filter_settings.exclude_patterns == ["node_modules"]
+        assert legacy_request.filter_settings.include_patterns == (".py",)
+        assert legacy_request.filter_settings.exclude_patterns == ("node_modules",)
         assert legacy_request.filter_settings.max_file_size.kb == 50
         assert legacy_request.filter_settings.show_excluded is False
         # Second request should have default filter settings due to malformed JSON
@@ -255,6 +257,32 @@ class TestSqliteHistoryRepository:
             requests[1].filter_settings, FilterSettings
         )  # Should be default settings
 
+    def test_missing_project_name_falls_back_to_path(self, repository, db_path):
+        """Test that rows without project_name get one from the project path."""
+        conn = sqlite3.connect(db_path)
+        conn.executemany(
+            """
+            INSERT INTO requests
+            (project_path, template_name, markdown_content, processed_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            [
+                ("/old/project", "default_template.hbs", "# Old", "2024-01-02T00:00:00"),
+                ("N/A", "default_template.hbs", "# Chat", "2024-01-01T00:00:00"),
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+        requests = repository.get_all()
+        page, total = repository.get_page(limit=10)
+
+        assert [r.project_name for r in requests] == ["project", "Unknown"]
+        assert [r.project_name for r in page] == ["project", "Unknown"]
+        assert total == 2
+        assert requests[0].markdown_content == "# Old"
+        assert page[0].markdown_content == ""
+
     def test_error_handling_on_save(self, repository, sample_request):
         """Test error handling when saving fails."""
         # Creating repository with invalid path should raise OperationalError
@@ -266,3 +294,320 @@ class TestSqliteHistoryRepository:
         # Creating repository with invalid path should raise OperationalError
         with pytest.raises(sqlite3.OperationalError):
             SqliteHistoryRepository(db_path="/invalid/path/db.db")
+
+    def test_init_sets_schema_version(self, repository, db_path):
+        """Test that initialization records the current schema version."""
+        conn = sqlite3.connect(db_path)
+        try:
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+        finally:
+            conn.close()
+
+        assert version == SCHEMA_VERSION
+
+    def test_init_creates_history_index(self, repository, db_path):
+        """Test that the schema migration creates the history ordering index."""
+        conn = sqlite3.connect(db_path)
+        try:
+            indexes = {row[1] for row in conn.execute("PRAGMA index_list(requests)")}
+        finally:
+            conn.close()
+
+        assert "idx_requests_processed_path" in indexes
+
+    def test_init_adds_missing_columns_to_legacy_table(self, db_path):
+        """Test that a pre-migration table gains the newer columns once."""
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute("""
+            CREATE TABLE requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_path TEXT NOT NULL,
+                template_name TEXT NOT NULL,
+                markdown_content TEXT NOT NULL,
+                reference_url TEXT,
+                processed_at DATETIME NOT NULL
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+        try:
+            SqliteHistoryRepository(db_path=db_path).close()
+            # A second initialization must be a no-op
+            SqliteHistoryRepository(db_path=db_path).close()
+
+            conn = sqlite3.connect(db_path)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(requests)")}
+            conn.close()
+            assert {"file_count", "filter_settings", "project_name"} <= columns
+        finally:
+            if os.path.exists(db_path):
+                os.remove(db_path)
+
+    def test_init_enables_wal_journal_mode(self, repository, db_path):
+        """Test that the history database is switched to WAL mode."""
+        conn = sqlite3.connect(db_path)
+        try:
+            (mode,) = conn.execute("PRAGMA journal_mode").fetchone()
+        finally:
+            conn.close()
+
+        assert mode == "wal"
+
+    def test_reads_see_writes_across_threads(self, repository, sample_request):
+        """Test that a reader in another thread sees rows from the shared writer."""
+        repository.save(sample_request)
+        results = []
+        reader = threading.Thread(target=lambda: results.append(repository.get_all()))
+        reader.start()
+        reader.join()
+
+        assert len(results[0]) == 1
+        assert results[0][0].id == sample_request.id
+
+    def test_reader_connections_are_bounded(self, db_path, sample_request):
+        """Test that many reading threads share a bounded set of connections."""
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        repository = SqliteHistoryRepository(db_path=db_path, max_readers=2)
+        try:
+            repository.save(sample_request)
+            threads = [threading.Thread(target=repository.get_all) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert 1 <= len(repository._read_conns) <= 2
+        finally:
+            repository.close()
+            if os.path.exists(db_path):
+                os.remove(db_path)
+
+    def test_in_memory_database_reads_its_writes(self, sample_request):
+        """Test that an in-memory repository reads through its only connection."""
+        repository = SqliteHistoryRepository(db_path=":memory:")
+        try:
+            repository.save(sample_request)
+
+            assert [req.id for req in repository.get_all()] == [sample_request.id]
+            assert repository.get_page(10)[1] == 1
+            assert repository._read_conns == []
+            assert not os.path.exists(":memory:")
+        finally:
+            repository.close()
+
+    def test_save_many_assigns_ids_in_order(self, repository, sample_request):
+        """Test that a batch insert stores every request and assigns their IDs."""
+        repository.save(sample_request)
+        batch = [
+            GenerationRequest(
+                id=None,
+                project_path=f"/path/to/project{i}",
+                project_name=f"project{i}",
+                template_name="default_template.hbs",
+                markdown_content=f"# Project {i}",
+                filter_settings=FilterSettings(),
+                file_count=i,
+                processed_at=datetime(2025, 1, 2, 12, 0, i),
+            )
+            for i in range(3)
+        ]
+
+        repository.save_many(batch)
+
+        stored = {req.id: req.project_path for req in repository.get_all()}
+        assert len(stored) == 4
+        for req in batch:
+            assert stored[req.id] == req.project_path
+
+    def test_iter_all_streams_newest_first(self, repository):
+        """Test that iter_all is lazy and yields requests newest first."""
+        repository.save_many(
+            [
+                GenerationRequest(
+                    id=None,
+                    project_path=f"/project{second}",
+                    project_name=f"project{second}",
+                    template_name="default_template.hbs",
+                    markdown_content="# Project",
+                    filter_settings=FilterSettings(),
+                    file_count=1,
+                    processed_at=datetime(2025, 1, 2, 12, 0, second),
+                )
+                for second in range(3)
+            ]
+        )
+
+        requests = repository.iter_all()
+
+        assert not isinstance(requests, list)
+        assert next(requests).project_path == "/project2"
+        assert [r.project_path for r in requests] == ["/project1", "/project0"]
+
+    def test_get_recent_project_paths(self, repository):
+        """Test that distinct project paths come back newest first."""
+        repository.save_many(
+            [
+                GenerationRequest(
+                    id=None,
+                    project_path=path,
+                    project_name=os.path.basename(path),
+                    template_name="default_template.hbs",
+                    markdown_content="# Project",
+                    filter_settings=FilterSettings(),
+                    file_count=1,
+                    processed_at=datetime(2025, 1, 2, 12, 0, second),
+                )
+                for second, path in enumerate(["/old", "/new", "/newest"])
+            ]
+        )
+
+        assert repository.get_recent_project_paths() == ["/newest", "/new", "/old"]
+        assert repository.get_recent_project_paths(limit=2) == ["/newest", "/new"]
+
+    def test_get_page_returns_slice_and_total(self, repository):
+        """Test that get_page slices newest first and reports the full count."""
+        repository.save_many(
+            [
+                GenerationRequest(
+                    id=None,
+                    project_path=f"/project{second}",
+                    project_name=f"project{second}",
+                    template_name="default_template.hbs",
+                    markdown_content="# Project",
+                    filter_settings=FilterSettings(),
+                    file_count=1,
+                    processed_at=datetime(2025, 1, 2, 12, 0, second),
+                )
+                for second in range(5)
+            ]
+        )
+
+        page, total = repository.get_page(limit=2, offset=2)
+        assert total == 5
+        assert [req.project_path for req in page] == ["/project2", "/project1"]
+
+        page, total = repository.get_page(limit=2, offset=10)
+        assert page == []
+        assert total == 5
+
+    def test_get_page_defers_markdown_content(self, repository, sample_request):
+        """Test that page rows omit content and get_markdown_content loads it."""
+        repository.save(sample_request)
+
+        page, _total = repository.get_page(limit=10)
+        assert page[0].markdown_content == ""
+        assert (
+            repository.get_markdown_content(sample_request.id)
+            == sample_request.markdown_content
+        )
+        assert repository.get_markdown_content(sample_request.id + 1) is None
+
+    def test_save_stores_filters_summary(self, repository, sample_request):
+        """Test that the filter summary is computed once when a request is saved."""
+        repository.save(sample_request)
+
+        page, _total = repository.get_page(limit=10)
+        assert page[0].filters_summary == (
+            "Include: .py, .txt | Exclude: node_modules, .git | Max: 50KB"
+        )
+
+    def test_init_backfills_filters_summary(self, db_path):
+        """Test that rows saved before the filters_summary column get one."""
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute("""
+            CREATE TABLE requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_path TEXT NOT NULL,
+                template_name TEXT NOT NULL,
+                markdown_content TEXT NOT NULL,
+                reference_url TEXT,
+                processed_at DATETIME NOT NULL,
+                file_count INTEGER DEFAULT 0,
+                filter_settings TEXT,
+                project_name TEXT
+            )
+        """)
+        conn.executemany(
+            """
+            INSERT INTO requests
+            (project_path, template_name, markdown_content, processed_at, filter_settings)
+            VALUES (?, 'default_template.hbs', '# Project', ?, ?)
+            """,
+            [
+                ("/json", "2024-01-03 12:00:00", '{"include_patterns": [".py"]}'),
+                ("/broken", "2024-01-02 12:00:00", "this is not valid json"),
+                ("/empty", "2024-01-01 12:00:00", None),
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+        try:
+            repo = SqliteHistoryRepository(db_path=db_path)
+            summaries = {req.project_path: req.filters_summary for req in repo.get_all()}
+            repo.close()
+        finally:
+            if os.path.exists(db_path):
+                os.remove(db_path)
+
+        assert summaries == {
+            "/json": "Include: .py | Max: 50KB",
+            "/broken": "Legacy format",
+            "/empty": "No filters",
+        }
+
+    def test_init_analyzes_schema(self, repository, db_path):
+        """Test that the migration collects planner statistics."""
+        conn = sqlite3.connect(db_path)
+        try:
+            tables = {
+                row[0]
+                for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table'"
+                )
+            }
+        finally:
+            conn.close()
+
+        assert "sqlite_stat1" in tables
+
+    def test_run_maintenance_vacuums_once_per_interval(self, repository, db_path):
+        """Test that VACUUM runs only when the interval since the last one passed."""
+        marker = f"{db_path}.last_vacuum"
+        try:
+            assert repository.run_maintenance() is True
+            assert os.path.exists(marker)
+            assert repository.run_maintenance() is False
+            assert repository.run_maintenance(vacuum_interval=0) is True
+        finally:
+            if os.path.exists(marker):
+                os.remove(marker)
+
+    def test_delete_many_removes_requests_in_one_call(self, repository, sample_request):
+        """Test that delete_many removes exactly the given requests."""
+        batch = [
+            GenerationRequest(
+                id=None,
+                project_path=f"/project{index}",
+                project_name=f"project{index}",
+                template_name="default_template.hbs",
+                markdown_content="# Project",
+                filter_settings=FilterSettings(),
+                file_count=1,
+                processed_at=datetime(2025, 1, 3, 12, 0, index),
+            )
+            for index in range(4)
+        ]
+        repository.save_many(batch)
+
+        repository.delete_many([batch[0].id, batch[2].id])
+        repository.delete_many([])
+
+        remaining = {req.project_path for req in repository.get_all()}
+        assert remaining == {"/project1", "/project3"}
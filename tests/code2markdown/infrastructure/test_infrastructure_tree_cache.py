@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from code2markdown.domain.filters import FilterSettings
+from code2markdown.infrastructure.tree_cache import DiskCache, directory_signature
+
+
+class TestDirectorySignature:
+    """Test suite for directory_signature."""
+
+    @pytest.fixture
+    def project(self, tmp_path):
+        """Fixture providing a small nested project."""
+        (tmp_path / "pkg" / "deep").mkdir(parents=True)
+        (tmp_path / "main.py").write_text("print('hi')")
+        (tmp_path / "pkg" / "mod.py").write_text("x = 1")
+        (tmp_path / "pkg" / "deep" / "inner.py").write_text("y = 2")
+        return tmp_path
+
+    def test_signature_is_stable(self, project):
+        """Test that an unchanged tree yields the same signature."""
+        assert directory_signature(str(project)) == directory_signature(str(project))
+
+    def test_signature_changes_when_file_changes(self, project):
+        """Test that resizing or touching a file changes the signature."""
+        before = directory_signature(str(project))
+
+        (project / "pkg" / "mod.py").write_text("x = 100")
+
+        assert directory_signature(str(project)) != before
+
+    def test_signature_ignores_entries_beyond_max_depth(self, project):
+        """Test that folders below max_depth are not scanned."""
+        before = directory_signature(str(project), FilterSettings(max_depth=2))
+
+        inner = project / "pkg" / "deep" / "inner.py"
+        inner.write_text("y = 200")
+        stat = inner.stat()
+        os.utime(inner, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert directory_signature(str(project), FilterSettings(max_depth=2)) == before
+        assert directory_signature(str(project)) != directory_signature(
+            str(project), FilterSettings(max_depth=2)
+        )
+
+    def test_signature_skips_excluded_directories(self, project):
+        """Test that folders the tree builder prunes are not scanned."""
+        (project / "node_modules").mkdir()
+        dep = project / "node_modules" / "dep.js"
+        dep.write_text("a")
+        filters = FilterSettings(exclude_patterns=["node_modules"])
+        before = directory_signature(str(project), filters)
+
+        dep.write_text("abc")
+
+        assert directory_signature(str(project), filters) == before
+
+    def test_signature_skips_gitignored_directories(self, project):
+        """Test that a folder ignored by its own .gitignore is not scanned."""
+        (project / "pkg" / ".gitignore").write_text("pkg\n")
+        before = directory_signature(str(project))
+
+        (project / "pkg" / "mod.py").write_text("x = 100")
+
+        assert directory_signature(str(project)) == before
+
+    def test_signature_depends_on_filters(self, project):
+        """Test that different filter settings yield different signatures."""
+        assert directory_signature(
+            str(project), FilterSettings(exclude_patterns=["*.log"])
+        ) != directory_signature(str(project))
+
+
+class TestDiskCache:
+    """Test suite for DiskCache."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that stored values are read back from disk by a new instance."""
+        key = DiskCache.make_key("/proj", ("*.py",), 50)
+        DiskCache(tmp_path).set(key, {"main.py": {"type": "file"}})
+
+        assert DiskCache(tmp_path).get(key) == {"main.py": {"type": "file"}}
+        assert DiskCache(tmp_path).get("missing", "default") == "default"
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path):
+        """Test that an unreadable entry is treated as missing."""
+        (tmp_path / "broken.pkl").write_bytes(b"not a pickle")
+
+        assert DiskCache(tmp_path).get("broken") is None
+
+    def test_prunes_oldest_entries(self, tmp_path):
+        """Test that the cache keeps at most max_entries files."""
+        cache = DiskCache(tmp_path, max_entries=2)
+        for index in range(3):
+            cache.set(f"key{index}", index)
+            path = tmp_path / f"key{index}.pkl"
+            os.utime(path, ns=(0, (index + 1) * 10**9))
+
+        assert cache.get("key0") is None
+        assert cache.get("key2") == 2
+        assert len(list(tmp_path.glob("*.pkl"))) == 2
@@ -0,0 +1,748 @@
+"""
+Tests for the file scanning helpers in app.py.
+"""
+
+import dataclasses
+import os
+import re
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pathspec
+import pytest
+
+import code2markdown.app as app_module
+from code2markdown.app import (
+    build_structure_from_selected,
+    clean_xml_content,
+    clear_project_probe_caches,
+    count_files,
+    count_selected_in_folders,
+    count_tree_items,
+    get_ai_agents_folders,
+    get_all_child_paths,
+    get_docs_folder,
+    get_file_tree_structure,
+    get_project_structure,
+    is_binary_file,
+    iter_tree_files,
+    load_template,
+    merge_patterns,
+    parse_gitignore,
+    read_gitignore_patterns,
+    select_folder_files,
+)
+from code2markdown.application.repository import IHistoryRepository
+from code2markdown.application.services import GenerationService
+from code2markdown.domain.filters import FilterSettings
+from code2markdown.infrastructure.tree_cache import DiskCache
+
+
+class TestGetProjectStructure:
+    """Test suite for the legacy get_project_structure renderer."""
+
+    def test_renders_sorted_nested_tree(self, tmp_path):
+        """Test that folders and files are rendered depth-first in name order."""
+        (tmp_path / "b_dir").mkdir()
+        (tmp_path / "b_dir" / "inner.py").write_text("")
+        (tmp_path / "b_dir" / "skip.log").write_text("")
+        (tmp_path / "b_dir" / ".gitignore").write_text("*.log\n")
+        (tmp_path / "a.py").write_text("")
+        (tmp_path / ".git").mkdir()
+        (tmp_path / "node_modules").mkdir()
+
+        structure = get_project_structure(str(tmp_path))
+
+        assert structure == "├── a.py\n├── b_dir/\n    ├── inner.py\n"
+
+    def test_cached_listing_refreshes_when_folder_changes(self, tmp_path):
+        """Test that a new file shows up despite the cached directory listing."""
+        (tmp_path / "a.py").write_text("")
+        assert get_project_structure(str(tmp_path)) == "├── a.py\n"
+
+        (tmp_path / "b.py").write_text("")
+        stat = tmp_path.stat()
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert get_project_structure(str(tmp_path)) == "├── a.py\n├── b.py\n"
+
+
+class TestIsBinaryFile:
+    """Test suite for the byte-level is_binary_file heuristic."""
+
+    def test_utf8_text_is_not_binary(self, tmp_path):
+        """Test that multi-byte UTF-8 text is classified as text."""
+        path = tmp_path / "notes.md"
+        path.write_text("Привет, мир! " * 20, encoding="utf-8")
+
+        assert is_binary_file(str(path)) is False
+
+    def test_null_byte_is_binary(self, tmp_path):
+        """Test that content containing NUL bytes is classified as binary."""
+        path = tmp_path / "blob.raw"
+        path.write_bytes(b"abc\x00def")
+
+        assert is_binary_file(str(path)) is True
+
+    def test_mostly_control_bytes_is_binary(self, tmp_path):
+        """Test that content dominated by control bytes is classified as binary."""
+        path = tmp_path / "blob.raw"
+        path.write_bytes(bytes(range(1, 7)) * 20 + b"text")
+
+        assert is_binary_file(str(path)) is True
+
+    def test_known_extensions_skip_content_probe(self, tmp_path):
+        """Test that known text and binary extensions are classified by name."""
+        source = tmp_path / "module.py"
+        source.write_bytes(b"\x00\x01\x02")
+        image = tmp_path / "logo.png"
+        image.write_bytes(b"plain text")
+
+        assert is_binary_file(str(source)) is False
+        assert is_binary_file(str(image)) is True
+        assert is_binary_file(str(tmp_path / "missing.py")) is False
+
+    def test_empty_file_is_not_binary(self, tmp_path):
+        """Test that an empty file is treated as text."""
+        path = tmp_path / "empty.txt"
+        path.write_bytes(b"")
+
+        assert is_binary_file(str(path)) is False
+
+
+class TestCleanXmlContent:
+    """Test suite for clean_xml_content."""
+
+    def test_replaces_invalid_characters_with_spaces(self):
+        """Test that control characters and surrogates become spaces."""
+        content = "ok\x00\x01\tline\n\r\x1f\ud800\ufffe<&>"
+
+        assert clean_xml_content(content) == "ok  \tline\n\r   <&>"
+
+    def test_keeps_valid_unicode(self):
+        """Test that valid BMP and astral characters are preserved."""
+        content = "Привет \ue000 \ufffd 🚀"
+
+        assert clean_xml_content(content) == content
+
+    def test_empty_content(self):
+        """Test that empty or None content yields an empty string."""
+        assert clean_xml_content("") == ""
+        assert clean_xml_content(None) == ""
+
+
+class TestBuildStructureFromSelected:
+    """Test suite for build_structure_from_selected."""
+
+    def test_groups_selected_files_by_folder(self, tmp_path):
+        """Test that folders come first in selection order and files are sorted."""
+        (tmp_path / "src" / "pkg").mkdir(parents=True)
+        (tmp_path / "_files").mkdir()
+        paths = [
+            tmp_path / "src" / "pkg" / "b.py",
+            tmp_path / "src" / "pkg" / "a.py",
+            tmp_path / "_files" / "data.txt",
+            tmp_path / "README.md",
+        ]
+        for path in paths:
+            path.write_text("")
+
+        structure = build_structure_from_selected(
+            str(tmp_path), [str(p) for p in paths] + [str(tmp_path / "missing.py")]
+        )
+
+        assert structure == (
+            f"Project: {tmp_path.name}\n"
+            "├── src/\n"
+            "    ├── pkg/\n"
+            "        ├── a.py\n"
+            "        ├── b.py\n"
+            "├── _files/\n"
+            "    ├── data.txt\n"
+            "├── README.md\n"
+        )
+
+
+class TestParseGitignore:
+    """Test suite for the cached parse_gitignore helper."""
+
+    def test_reuses_spec_until_file_changes(self, tmp_path):
+        """Test that the compiled spec is cached per path and mtime."""
+        gitignore = tmp_path / ".gitignore"
+        gitignore.write_text("*.log\n")
+
+        first = parse_gitignore(str(gitignore))
+        assert parse_gitignore(str(gitignore)) is first
+        assert first.match_file("debug.log")
+
+        gitignore.write_text("*.tmp\n")
+        stat = gitignore.stat()
+        os.utime(gitignore, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        updated = parse_gitignore(str(gitignore))
+        assert updated is not first
+        assert updated.match_file("cache.tmp")
+        assert not updated.match_file("debug.log")
+
+    def test_matches_like_gitignore_spec(self, tmp_path):
+        """Test that the merged matcher agrees with pathspec, negations included."""
+        for lines in (
+            ["build", "dist/", "*.log", "/anchored", "docs/*.md"],
+            ["*.log", "!keep.log", "build/"],
+        ):
+            gitignore = tmp_path / f"{len(lines)}.gitignore"
+            gitignore.write_text("\n".join(lines) + "\n")
+            spec = pathspec.GitIgnoreSpec.from_lines(lines)
+            matcher = parse_gitignore(str(gitignore))
+
+            for path in (
+                "/proj/build",
+                "/proj/build/out.js",
+                "/proj/dist",
+                "/proj/dist/app.js",
+                "/proj/src/debug.log",
+                "/proj/keep.log",
+                "anchored/file.py",
+                "src/anchored/file.py",
+                "docs/guide.md",
+                "docs/api/guide.md",
+                "/proj/src/main.py",
+            ):
+                assert matcher.match_file(path) == spec.match_file(path), (lines, path)
+
+    def test_merges_regexes_regardless_of_group_names(self):
+        """Test that any named group is stripped and an unjoinable spec falls back."""
+        patterns = [
+            SimpleNamespace(
+                pattern=f"*.{ext}",
+                include=True,
+                regex=re.compile(rf"^(?:.+/)?[^/]*\.{ext}(?:(?P<dir>/)|$)"),
+            )
+            for ext in ("log", "tmp")
+        ]
+        spec = SimpleNamespace(patterns=patterns, match_file=Mock(return_value=False))
+        matcher = app_module._GitignoreMatcher(spec)
+
+        assert matcher.match_file("/proj/debug.log")
+        assert matcher.match_file("/proj/cache.tmp/x")
+        assert not matcher.match_file("/proj/main.py")
+        spec.match_file.assert_not_called()
+
+        backref = SimpleNamespace(
+            pattern="aa", include=True, regex=re.compile(r"^(?P<x>a)(?P=x)$")
+        )
+        spec.patterns = [backref]
+        matcher = app_module._GitignoreMatcher(spec)
+
+        assert not matcher.match_file("aa")
+        spec.match_file.assert_called_once_with("aa")
+
+    def test_missing_file_matches_nothing(self, tmp_path):
+        """Test that a missing .gitignore yields an empty spec."""
+        spec = parse_gitignore(str(tmp_path / ".gitignore"))
+
+        assert not spec.match_file("anything.py")
+
+
+class TestGetFileTreeStructure:
+    """Test suite for the precomputed folder paths in get_file_tree_structure."""
+
+    @pytest.fixture(autouse=True)
+    def tree_cache(self, tmp_path, monkeypatch):
+        """Fixture redirecting the disk tree cache into a temporary folder."""
+        cache = DiskCache(tmp_path / "cache")
+        monkeypatch.setattr("code2markdown.app.get_tree_cache", lambda: cache)
+        return cache
+
+    def test_folder_nodes_carry_child_paths(self, tmp_path):
+        """Test that folder nodes list all and included descendant paths."""
+        (tmp_path / "pkg" / "sub").mkdir(parents=True)
+        (tmp_path / "pkg" / "a.py").write_text("a = 1")
+        (tmp_path / "pkg" / "sub" / "b.py").write_text("b = 2")
+        (tmp_path / "pkg" / "sub" / "c.tmp").write_text("tmp")
+
+        tree = get_file_tree_structure(
+            str(tmp_path),
+            max_depth=5,
+            exclude_patterns=["*.tmp"],
+        )
+
+        pkg = tree["pkg"]
+        expected = [
+            str(tmp_path / "pkg" / "a.py"),
+            str(tmp_path / "pkg" / "sub" / "b.py"),
+        ]
+        assert sorted(pkg["all_paths"]) == expected
+        assert sorted(pkg["included_paths"]) == expected
+        assert get_all_child_paths(pkg, include_excluded=False) is pkg["included_paths"]
+
+    def test_hand_built_nodes_fall_back_to_walking(self):
+        """Test that nodes without cached lists are still walked recursively."""
+        folder = {
+            "type": "folder",
+            "path": "/proj/pkg",
+            "children": {
+                "a.py": {"type": "file", "path": "/proj/pkg/a.py", "excluded": False},
+                "b.log": {"type": "file", "path": "/proj/pkg/b.log", "excluded": True},
+            },
+        }
+
+        assert get_all_child_paths(folder) == ["/proj/pkg/a.py", "/proj/pkg/b.log"]
+        assert get_all_child_paths(folder, include_excluded=False) == ["/proj/pkg/a.py"]
+
+    def test_reuses_cached_tree_until_files_change(self, tmp_path, monkeypatch):
+        """Test that the tree is rebuilt only when the directory signature changes."""
+        project = tmp_path / "project"
+        project.mkdir()
+        (project / "main.py").write_text("print('hi')")
+
+        calls = []
+        build = app_module._build_file_tree_structure
+
+        def counting_build(*args):
+            calls.append(args)
+            return build(*args)
+
+        monkeypatch.setattr(app_module, "_build_file_tree_structure", counting_build)
+
+        first = get_file_tree_structure(str(project))
+        assert get_file_tree_structure(str(project)) == first
+        assert len(calls) == 1
+
+        (project / "extra.py").write_text("x = 1")
+        updated = get_file_tree_structure(str(project))
+
+        assert len(calls) == 2
+        assert "extra.py" in updated
+
+
+class TestCountSelectedInFolders:
+    """Test suite for count_selected_in_folders."""
+
+    def test_counts_included_descendants(self):
+        """Test that counts roll up nested folders and skip excluded nodes."""
+        tree = {
+            "pkg": {
+                "type": "folder",
+                "path": "/p/pkg",
+                "children": {
+                    "a.py": {"type": "file", "path": "/p/pkg/a.py"},
+                    "skip.log": {
+                        "type": "file",
+                        "path": "/p/pkg/skip.log",
+                        "excluded": True,
+                    },
+                    "sub": {
+                        "type": "folder",
+                        "path": "/p/pkg/sub",
+                        "children": {
+                            "b.py": {"type": "file", "path": "/p/pkg/sub/b.py"},
+                        },
+                    },
+                    "empty": {"type": "folder", "path": "/p/pkg/empty", "children": {}},
+                },
+            },
+        }
+
+        counts = count_selected_in_folders(tree, {"/p/pkg/sub/b.py", "/p/pkg/skip.log"})
+
+        assert counts == {
+            "/p/pkg": (1, 2),
+            "/p/pkg/sub": (1, 1),
+            "/p/pkg/empty": (0, 0),
+        }
+
+
+class TestLoadTemplate:
+    """Test suite for the cached load_template helper."""
+
+    def test_compiles_once_until_template_changes(self, tmp_path, monkeypatch):
+        """Test that the compiled template is reused per path and mtime."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "templates").mkdir()
+        template_path = tmp_path / "templates" / "t.hbs"
+        template_path.write_text("Hello {{name}}")
+
+        first = load_template("t.hbs")
+        assert load_template("t.hbs") is first
+        assert first({"name": "World"}) == "Hello World"
+
+        template_path.write_text("Bye {{name}}")
+        stat = template_path.stat()
+        os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert load_template("t.hbs")({"name": "World"}) == "Bye World"
+        assert load_template("missing.hbs") is None
+
+
+class TestGenerateMarkdownCache:
+    """Test suite for reusing rendered documentation between generations."""
+
+    def test_rerenders_only_when_inputs_change(self, tmp_path, monkeypatch):
+        """Test that unchanged inputs skip rendering but still save history."""
+        templates = tmp_path / "templates"
+        templates.mkdir()
+        (templates / "t.hbs").write_text("{{#each files}}{{{code}}};{{/each}}")
+        project = tmp_path / "proj"
+        project.mkdir()
+        (project / "a.py").write_text("A")
+
+        repo = Mock(spec=IHistoryRepository)
+        service = GenerationService(repo, templates_dir=str(templates))
+        render = Mock(wraps=service.render_documentation)
+        monkeypatch.setattr(service, "render_documentation", render)
+        monkeypatch.setattr(app_module, "generation_service", service)
+        app_module._render_documentation.clear()
+        filters = FilterSettings(include_patterns=[".py"])
+
+        first = app_module.generate_markdown(
+            str(project), "t.hbs", filter_settings=filters
+        )
+        second = app_module.generate_markdown(
+            str(project), "t.hbs", filter_settings=filters
+        )
+
+        assert first == second == "A;"
+        assert render.call_count == 1
+        assert repo.save.call_count == 2
+
+        (project / "b.py").write_text("B")
+        assert (
+            app_module.generate_markdown(str(project), "t.hbs", filter_settings=filters)
+            == "A;B;"
+        )
+        assert render.call_count == 2
+        app_module._render_documentation.clear()
+
+    def test_scanned_tree_skips_directory_walk(self, tmp_path, monkeypatch):
+        """Test that a scanned tree keys the cache on the selected files only."""
+        templates = tmp_path / "templates"
+        templates.mkdir()
+        (templates / "t.hbs").write_text("{{#each files}}{{{code}}};{{/each}}")
+        project = tmp_path / "proj"
+        project.mkdir()
+        (project / "a.py").write_text("A")
+        (project / "b.py").write_text("B")
+
+        repo = Mock(spec=IHistoryRepository)
+        service = GenerationService(repo, templates_dir=str(templates))
+        render = Mock(wraps=service.render_documentation)
+        monkeypatch.setattr(service, "render_documentation", render)
+        monkeypatch.setattr(app_module, "generation_service", service)
+        monkeypatch.setattr(
+            app_module, "directory_signature", Mock(side_effect=AssertionError)
+        )
+        app_module._render_documentation.clear()
+        filters = FilterSettings(include_patterns=[".py"])
+        session = app_module.st.session_state
+        session.clear()
+        session.file_tree = app_module._build_file_tree_structure(
+            str(project), [".py"], [], 50, False, None
+        )
+        session.file_tree_source = app_module._tree_source_key(str(project), filters)
+        selected = dataclasses.replace(
+            filters, selected_files=frozenset({str(project / "a.py")})
+        )
+
+        try:
+            assert (
+                app_module.generate_markdown(
+                    str(project), "t.hbs", filter_settings=selected
+                )
+                == "A;"
+            )
+            (project / "b.py").write_text("BB")
+            app_module.generate_markdown(str(project), "t.hbs", filter_settings=selected)
+            assert render.call_count == 1
+
+            (project / "a.py").write_text("AA")
+            assert (
+                app_module.generate_markdown(
+                    str(project), "t.hbs", filter_settings=selected
+                )
+                == "AA;"
+            )
+            assert render.call_count == 2
+
+            # A file created after the scan changes its folder mtime
+            assert (
+                app_module.generate_markdown(
+                    str(project), "t.hbs", filter_settings=filters
+                )
+                == "AA;BB;"
+            )
+            (project / "c.py").write_text("C")
+            stat = project.stat()
+            os.utime(project, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            assert (
+                app_module.generate_markdown(
+                    str(project), "t.hbs", filter_settings=filters
+                )
+                == "AA;BB;C;"
+            )
+            assert render.call_count == 4
+        finally:
+            session.clear()
+            app_module._render_documentation.clear()
+
+
+class TestReadGitignorePatterns:
+    """Test suite for the cached read_gitignore_patterns helper."""
+
+    def test_rereads_only_after_file_changes(self, tmp_path):
+        """Test that patterns are cached until the .gitignore is modified."""
+        gitignore = tmp_path / ".gitignore"
+        gitignore.write_text("# comment\n\nbuild/\n*.log\n")
+
+        assert read_gitignore_patterns(str(tmp_path)) == ["build/", "*.log"]
+
+        gitignore.write_text("dist/\n")
+        stat = gitignore.stat()
+        os.utime(gitignore, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert read_gitignore_patterns(str(tmp_path)) == ["dist/"]
+
+    def test_missing_file_has_no_patterns(self, tmp_path):
+        """Test that a project without .gitignore yields no patterns."""
+        assert read_gitignore_patterns(str(tmp_path)) == []
+
+
+class TestCountTreeItems:
+    """Test suite for the scan summary counts."""
+
+    def test_matches_full_walk(self, tmp_path):
+        """Test that folder and file totals equal a walk of the whole tree."""
+        (tmp_path / "a" / "b" / "c").mkdir(parents=True)
+        (tmp_path / "d").mkdir()
+        (tmp_path / "top.py").write_text("x = 1")
+        (tmp_path / "a" / "one.py").write_text("x = 1")
+        (tmp_path / "a" / "b" / "c" / "two.py").write_text("x = 1")
+
+        tree = app_module._build_file_tree_structure(
+            str(tmp_path), [".py"], [], 50, False, None
+        )
+
+        def walk(structure):
+            folders = files = 0
+            for info in structure.values():
+                if info["type"] == "folder":
+                    child_folders, child_files = walk(info["children"])
+                    folders += 1 + child_folders
+                    files += child_files
+                else:
+                    files += 1
+            return folders, files
+
+        assert count_tree_items(tree) == walk(tree) == (4, 3)
+
+
+class TestIterTreeFiles:
+    """Test suite for the Select All / Code Files Only traversal."""
+
+    def test_skips_excluded_entries_with_their_subtrees(self):
+        """Test that excluded files and folders are skipped with their subtrees."""
+        structure = {
+            "main.py": {"type": "file", "path": "/p/main.py", "excluded": False},
+            "notes.md": {"type": "file", "path": "/p/notes.md", "excluded": False},
+            "debug.log": {"type": "file", "path": "/p/debug.log", "excluded": True},
+            "pkg": {
+                "type": "folder",
+                "path": "/p/pkg",
+                "excluded": False,
+                "children": {
+                    "util.JS": {"type": "file", "path": "/p/pkg/util.JS"},
+                    "deep": {
+                        "type": "folder",
+                        "path": "/p/pkg/deep",
+                        "children": {
+                            "core.c": {"type": "file", "path": "/p/pkg/deep/core.c"}
+                        },
+                    },
+                },
+            },
+            "build": {
+                "type": "folder",
+                "path": "/p/build",
+                "excluded": True,
+                "children": {"out.py": {"type": "file", "path": "/p/build/out.py"}},
+            },
+        }
+
+        assert set(iter_tree_files(structure)) == {
+            "/p/main.py",
+            "/p/notes.md",
+            "/p/pkg/util.JS",
+            "/p/pkg/deep/core.c",
+        }
+        # "Code Files Only" picks files from the index by_ext, case-insensitively
+        index = app_module.build_file_index(structure)
+        assert app_module.code_file_paths(index) == {
+            "/p/main.py",
+            "/p/pkg/util.JS",
+            "/p/pkg/deep/core.c",
+        }
+
+
+class TestFileIndex:
+    """Test suite for the flat file index kept next to the scanned tree."""
+
+    structure = {
+        "main.py": {"type": "file", "path": "/p/main.py", "excluded": False},
+        "README.MD": {"type": "file", "path": "/p/README.MD", "excluded": False},
+        "debug.log": {"type": "file", "path": "/p/debug.log", "excluded": True},
+        "pkg": {
+            "type": "folder",
+            "path": "/p/pkg",
+            "children": {"util.py": {"type": "file", "path": "/p/pkg/util.py"}},
+        },
+    }
+
+    def test_groups_included_files_by_extension(self):
+        """Test that the index lists included files once, grouped by extension."""
+        index = app_module.build_file_index(self.structure)
+
+        assert sorted(index["all"]) == ["/p/README.MD", "/p/main.py", "/p/pkg/util.py"]
+        assert sorted(index["by_ext"][".py"]) == ["/p/main.py", "/p/pkg/util.py"]
+        assert index["by_ext"][".md"] == ["/p/README.MD"]
+        assert index["file_set"] == frozenset(index["all"])
+
+    def test_counts_selected_files_without_stat_for_indexed_paths(
+        self, tmp_path, monkeypatch
+    ):
+        """Test that only selections outside the tree are checked on disk."""
+        index = app_module.build_file_index(self.structure)
+        outside_file = tmp_path / "extra.txt"
+        outside_file.write_text("x")
+        selected = {"/p/main.py", "/p/pkg/util.py", str(outside_file), str(tmp_path)}
+        checked = []
+        real_isfile = os.path.isfile
+
+        def tracking_isfile(path):
+            checked.append(path)
+            return real_isfile(path)
+
+        monkeypatch.setattr("code2markdown.app.os.path.isfile", tracking_isfile)
+        count = app_module.count_selected_files(selected, index)
+
+        assert count == 3
+        assert sorted(checked) == sorted([str(outside_file), str(tmp_path)])
+
+    def test_selected_count_is_recomputed_only_for_a_new_selection(self, monkeypatch):
+        """Test that reruns with the same selection reuse the stored count."""
+        session = app_module.st.session_state
+        session.clear()
+        session.filter_settings = FilterSettings(selected_files=frozenset({"/p/main.py"}))
+        session.file_tree = self.structure
+        calls = []
+        real_count = app_module.count_selected_files
+
+        def counting(selected_files, file_index):
+            calls.append(selected_files)
+            return real_count(selected_files, file_index)
+
+        monkeypatch.setattr(app_module, "count_selected_files", counting)
+        try:
+            assert app_module.get_selected_count() == 1
+            assert app_module.get_selected_count() == 1
+            assert len(calls) == 1
+
+            app_module._update_filters(selected_files={"/p/main.py", "/p/pkg/util.py"})
+            assert app_module.get_selected_count() == 2
+            assert len(calls) == 2
+        finally:
+            session.clear()
+
+
+class TestMergePatterns:
+    """Test suite for merging .gitignore patterns into the exclusions."""
+
+    def test_appends_only_new_patterns_in_order(self):
+        """Test that existing order is kept and duplicates are skipped."""
+        merged, added = merge_patterns(
+            [".git", "node_modules"], ["dist/", ".git", "*.log", "dist/"]
+        )
+
+        assert merged == [".git", "node_modules", "dist/", "*.log"]
+        assert added == ["dist/", "*.log"]
+
+    def test_reports_nothing_added(self):
+        """Test that a fully known .gitignore adds nothing."""
+        assert merge_patterns([".git"], [".git"]) == ([".git"], [])
+
+
+class TestCountFiles:
+    """Test suite for the cached count_files helper."""
+
+    def test_matches_os_walk(self, tmp_path):
+        """Test that the scandir count equals the os.walk file count."""
+        (tmp_path / "a" / "b").mkdir(parents=True)
+        (tmp_path / "one.md").write_text("")
+        (tmp_path / "a" / "two.md").write_text("")
+        (tmp_path / "a" / "b" / "three.md").write_text("")
+        (tmp_path / "link").symlink_to(tmp_path / "a", target_is_directory=True)
+
+        expected = sum(1 for _, _, files in os.walk(tmp_path) for _ in files)
+
+        assert count_files(str(tmp_path)) == expected == 3
+        assert count_files(str(tmp_path / "missing")) == 0
+
+
+class TestProjectProbes:
+    """Test suite for the cached AI Agents and docs folder probes."""
+
+    def test_probes_are_cached_until_rescan(self, tmp_path):
+        """Test that new folders appear only after the caches are cleared."""
+        project = str(tmp_path)
+        assert get_ai_agents_folders(project) == []
+        assert get_docs_folder(project) is None
+
+        (tmp_path / "memory-bank").mkdir()
+        (tmp_path / "docs").mkdir()
+        assert get_docs_folder(project) is None
+
+        clear_project_probe_caches()
+        assert get_ai_agents_folders(project) == [
+            ("memory-bank", str(tmp_path / "memory-bank"), "RooCode")
+        ]
+        assert get_docs_folder(project) == str(tmp_path / "docs")
+
+
+class TestSelectFolderFiles:
+    """Test suite for select_folder_files."""
+
+    def test_applies_size_include_and_exclude_filters(self, tmp_path):
+        """Test that extension, wildcard and substring patterns combine as before."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "main.PY").write_text("x = 1")
+        (tmp_path / "notes.txt").write_text("notes")
+        (tmp_path / "sub" / "README.md").write_text("# readme")
+        (tmp_path / "sub" / "test_main.py").write_text("y = 2")
+        (tmp_path / "big.py").write_text("z" * 3000)
+        (tmp_path / "image.png").write_bytes(b"png")
+
+        selected = select_folder_files(
+            str(tmp_path),
+            include_patterns=[".py", "*.TXT", "readme", " "],
+            exclude_patterns=["test_*", "notes"],
+            max_file_size=2,
+        )
+
+        assert selected == {
+            str(tmp_path / "main.PY"),
+            str(tmp_path / "sub" / "README.md"),
+        }
+
+    def test_missing_folder_selects_nothing(self, tmp_path):
+        """Test that a missing folder yields an empty selection."""
+        assert select_folder_files(str(tmp_path / "missing")) == set()
+
+    def test_reuses_compiled_patterns_across_calls(self, tmp_path):
+        """Test that the same pattern lists are compiled only once."""
+        (tmp_path / "main.py").write_text("x = 1")
+        app_module._compile_name_patterns.cache_clear()
+
+        for _ in range(3):
+            select_folder_files(str(tmp_path), [".py", "*.md"], ["build"])
+
+        info = app_module._compile_name_patterns.cache_info()
+        assert (info.misses, info.hits) == (2, 4)
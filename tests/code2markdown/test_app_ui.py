@@ -1,11 +1,25 @@
 import os
+import sqlite3
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 import pytest
 import streamlit as st
+from streamlit.runtime.scriptrunner_utils.script_run_context import (
+    SCRIPT_RUN_CONTEXT_ATTR_NAME,
+)
 
-from code2markdown.app import render_file_tree_ui
+from code2markdown.app import (
+    _parse_pattern_lines,
+    _prefetch,
+    _update_filters,
+    display_history_with_pagination,
+    render_file_tree_editor,
+    show_copyable,
+)
+from code2markdown.domain.filters import FilterSettings
 
 
 class TestAppUI:
@@ -95,7 +109,9 @@ class TestAppUI:
             if st.session_state.get("file_tree"):
                 file_tree = st.session_state.file_tree
                 # This would render the tree UI
-                render_file_tree_ui(file_tree, selected_files=set(), key_prefix="tree")
+                render_file_tree_editor(
+                    file_tree, selected_files=set(), key_prefix="tree"
+                )
             else:
                 st.info("Нажмите 'Сканировать папку' для отображения структуры")
 
@@ -168,12 +184,14 @@ class TestAppUI:
                         st.session_state.file_tree = file_tree
 
                     # Also simulate file selection UI
-                    with patch("code2markdown.app.render_file_tree_ui") as mock_render:
+                    with patch(
+                        "code2markdown.app.render_file_tree_editor"
+                    ) as mock_render:
                         mock_render.return_value = (
                             initial_selected  # Simulate UI returning selected files
                         )
 
-                        newly_selected = render_file_tree_ui(
+                        newly_selected = render_file_tree_editor(
                             st.session_state.file_tree,
                             selected_files=st.session_state.filter_settings.selected_files,
                             key_prefix="tree",
@@ -194,3 +212,257 @@ class TestAppUI:
                         == initial_selected
                     )
                     assert "file_tree" in st.session_state
+
+    def test_render_file_tree_editor_applies_folder_toggle(self, setup_session_state):
+        """Test that the table editor renders one row per node and expands folders."""
+        tree = {
+            "pkg": {
+                "type": "folder",
+                "path": "/proj/pkg",
+                "excluded": False,
+                "children": {
+                    "mod.py": {
+                        "type": "file",
+                        "path": "/proj/pkg/mod.py",
+                        "excluded": False,
+                        "size": 2048,
+                    },
+                    "skip.log": {
+                        "type": "file",
+                        "path": "/proj/pkg/skip.log",
+                        "excluded": True,
+                        "size": 0,
+                    },
+                },
+            },
+            "main.py": {
+                "type": "file",
+                "path": "/proj/main.py",
+                "excluded": False,
+                "size": 0,
+            },
+        }
+
+        def tick_folder(df, **kwargs):
+            edited = df.copy()
+            edited.loc[0, "select"] = True
+            return edited
+
+        with patch(
+            "code2markdown.app.st.data_editor", side_effect=tick_folder
+        ) as data_editor:
+            result = render_file_tree_editor(
+                tree, selected_files={"/proj/main.py"}, key_prefix="tree"
+            )
+
+        df = data_editor.call_args.args[0]
+        assert list(df["path"]) == [
+            "/proj/pkg",
+            "/proj/pkg/mod.py",
+            "/proj/pkg/skip.log",
+            "/proj/main.py",
+        ]
+        assert list(df["select"]) == [False, False, False, True]
+        assert df["name"][1] == "　📄 mod.py"
+        assert df["size"][1] == "2.0 KB"
+        assert result == {"/proj/main.py", "/proj/pkg/mod.py"}
+        assert st.session_state.selection_version == 1
+
+    def test_render_file_tree_editor_without_changes(self, setup_session_state):
+        """Test that an untouched table returns the original selection object."""
+        tree = {
+            "main.py": {
+                "type": "file",
+                "path": "/proj/main.py",
+                "excluded": False,
+                "size": 0,
+            },
+        }
+        selected = {"/proj/main.py"}
+
+        with patch("code2markdown.app.st.data_editor", side_effect=lambda df, **_: df):
+            result = render_file_tree_editor(tree, selected_files=selected)
+
+        assert result is selected
+        assert "selection_version" not in st.session_state
+
+    def test_history_mounts_controls_only_for_opened_record(self, setup_session_state):
+        """Test that collapsed history rows render a single Open button each."""
+        history = [
+            (
+                record_id,
+                f"/proj/p{record_id}",
+                "default_template.hbs",
+                "# content",
+                None,
+                "2025-01-01T10:00:00",
+                1,
+                None,
+                f"p{record_id}",
+            )
+            for record_id in (1, 2, 3)
+        ]
+
+        def columns(spec):
+            count = spec if isinstance(spec, int) else len(spec)
+            return [MagicMock() for _ in range(count)]
+
+        with (
+            patch("code2markdown.app.get_history", return_value=(history, 3)),
+            patch("code2markdown.app.st.number_input", return_value=1),
+            patch(
+                "code2markdown.app.fetch_markdown_content", return_value="# content"
+            ) as fetch_content,
+            patch("code2markdown.app.st.columns", side_effect=columns),
+            patch("code2markdown.app.st.expander"),
+            patch("code2markdown.app.st.selectbox", return_value="md"),
+            patch("code2markdown.app.st.download_button"),
+            patch("code2markdown.app.st.button", return_value=False) as button,
+            patch("code2markdown.app._prefetch") as prefetch,
+        ):
+            display_history_with_pagination()
+            collapsed_keys = [call.kwargs["key"] for call in button.call_args_list]
+            fetch_content.assert_not_called()
+
+            button.reset_mock()
+            st.session_state.history_expanded_id = 2
+            display_history_with_pagination()
+            expanded_keys = [call.kwargs["key"] for call in button.call_args_list]
+            fetch_content.assert_called_once_with(2)
+            # Содержимое следующей записи прогревается в фоне
+            prefetch.assert_called_once_with(fetch_content, 3)
+
+        assert collapsed_keys == ["open_1", "open_2", "open_3"]
+        assert expanded_keys == [
+            "open_1",
+            "close_2",
+            "copy_content_2",
+            "delete_2",
+            "open_3",
+        ]
+
+    def test_update_filters_copies_untouched_fields(self, setup_session_state):
+        """Test that _update_filters keeps the selection and skips no-op updates."""
+        original = FilterSettings(
+            include_patterns=[".py"], selected_files={"/p/a.py"}, max_depth=2
+        )
+        st.session_state.filter_settings = original
+
+        assert _update_filters(include_patterns=[".py"], max_depth=2) is False
+        assert st.session_state.filter_settings is original
+
+        assert _update_filters(exclude_patterns=["build"]) is True
+        updated = st.session_state.filter_settings
+        assert updated.exclude_patterns == ("build",)
+        assert updated.selected_files == {"/p/a.py"}
+        assert updated.max_depth == 2
+
+    def test_update_filters_stores_selection_as_frozenset(self, setup_session_state):
+        """Test that a new selection is frozen and an equal one is a no-op."""
+        st.session_state.filter_settings = FilterSettings(selected_files=set())
+
+        assert _update_filters(selected_files={"/p/a.py"}) is True
+        selected = st.session_state.filter_settings.selected_files
+        assert isinstance(selected, frozenset)
+        assert selected == {"/p/a.py"}
+
+        assert _update_filters(selected_files={"/p/a.py"}) is False
+        assert st.session_state.filter_settings.selected_files is selected
+
+    def test_parse_pattern_lines_skips_blank_lines(self):
+        """Test that textarea input becomes a list of stripped patterns."""
+        assert _parse_pattern_lines(" .py\n\n  *.md  \n") == [".py", "*.md"]
+        assert _parse_pattern_lines("") == []
+
+    def test_show_copyable_uses_code_block_copy_button(self):
+        """Test that copyable text is shown in st.code instead of a script."""
+        with patch("code2markdown.app.st.code") as code:
+            show_copyable('print("</script>")', language="markdown")
+
+        code.assert_called_once()
+        assert code.call_args.args[0] == 'print("</script>")'
+        assert code.call_args.kwargs["language"] == "markdown"
+
+    def test_history_prefetches_next_page(self, setup_session_state):
+        """Test that the next history page is warmed while the current one shows."""
+        history = [
+            (1, "/proj/p1", "default_template.hbs", "", None, "2025-01-01T10:00:00")
+        ]
+
+        with (
+            patch(
+                "code2markdown.app.get_history", return_value=(history, 25)
+            ) as load_page,
+            patch("code2markdown.app.st.number_input", return_value=2),
+            patch("code2markdown.app.st.columns", return_value=[MagicMock()] * 2),
+            patch("code2markdown.app.st.button", return_value=False),
+            patch("code2markdown.app._prefetch") as prefetch,
+        ):
+            display_history_with_pagination(page_size=10)
+
+        prefetch.assert_called_once_with(load_page, 3, 10)
+
+    def test_prefetch_runs_loader_in_background(self):
+        """Test that _prefetch calls the loader off-thread and hides DB errors."""
+        done = threading.Event()
+
+        def failing_loader(value):
+            raise sqlite3.OperationalError("database is locked")
+
+        _prefetch(failing_loader, 1)
+        _prefetch(lambda value: done.set(), 1)
+
+        assert done.wait(timeout=5)
+
+    def test_prefetch_detaches_context_and_logs_errors(self):
+        """Test that pool threads drop the session context and log failures."""
+        pool = ThreadPoolExecutor(max_workers=1)
+        ctx = MagicMock()
+
+        def failing_loader():
+            raise ValueError("boom")
+
+        with (
+            patch("code2markdown.app._prefetch_pool", return_value=pool),
+            patch("code2markdown.app.get_script_run_ctx", return_value=ctx),
+            patch("code2markdown.app.logger") as logger,
+        ):
+            _prefetch(failing_loader)
+            leftover = pool.submit(
+                lambda: getattr(threading.current_thread(), SCRIPT_RUN_CONTEXT_ATTR_NAME)
+            ).result(timeout=5)
+        pool.shutdown()
+
+        assert leftover is None
+        logger.exception.assert_called_once()
+
+    def test_history_queues_deletes_in_batch_mode(self, setup_session_state):
+        """Test that Delete only queues the record while batch mode is on."""
+        history = [
+            (7, "/proj/p7", "default_template.hbs", "", None, "2025-01-01T10:00:00")
+        ]
+        st.session_state.history_expanded_id = 7
+
+        def columns(spec):
+            count = spec if isinstance(spec, int) else len(spec)
+            return [MagicMock() for _ in range(count)]
+
+        def button(label, key, **kwargs):
+            return key == "delete_7"
+
+        with (
+            patch("code2markdown.app.get_history", return_value=(history, 1)),
+            patch("code2markdown.app.st.number_input", return_value=1),
+            patch("code2markdown.app.st.checkbox", return_value=True),
+            patch("code2markdown.app.st.columns", side_effect=columns),
+            patch("code2markdown.app.st.expander"),
+            patch("code2markdown.app.st.selectbox", return_value="md"),
+            patch("code2markdown.app.st.button", side_effect=button),
+            patch("code2markdown.app.st.rerun"),
+            patch("code2markdown.app.fetch_markdown_content", return_value=""),
+            patch("code2markdown.app.delete_records") as delete_records,
+        ):
+            display_history_with_pagination()
+
+        assert st.session_state.pending_deletes == {7}
+        delete_records.assert_not_called()
@@ -3,8 +3,9 @@
 """
 
 import unittest
+from unittest.mock import patch
 
-from code2markdown.app import convert_to_xml, prepare_file_content
+from code2markdown.app import convert_to_xml, download_button, prepare_file_content
 
 
 class TestDownloadFunctions(unittest.TestCase):
@@ -91,6 +92,26 @@ print("Hello, World!")
         self.assertIn("</content>", result)
         self.assertIn("</project>", result)
 
+    def test_download_button_defers_xml_conversion(self):
+        """Тест: XML строится только при вызове данных кнопки (по клику)"""
+        with (
+            patch("code2markdown.app.convert_to_xml", wraps=convert_to_xml) as convert,
+            patch("code2markdown.app.st.download_button") as button,
+        ):
+            download_button(
+                "XML", self.test_markdown, "xml", self.test_project_path, key="k"
+            )
+            kwargs = button.call_args.kwargs
+            self.assertEqual(kwargs["file_name"], "project_documentation.xml")
+            self.assertEqual(kwargs["mime"], "application/xml")
+            self.assertEqual(kwargs["key"], "k")
+            convert.assert_not_called()
+
+            data = kwargs["data"]()
+
+        convert.assert_called_once()
+        self.assertIn("# Test Project", data)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,12 +1,15 @@
 import os
+import sys
 import tempfile
 from datetime import datetime
 from unittest.mock import Mock, patch
 
 import pytest
 
+import code2markdown.application.services as services_module
 from code2markdown.application.repository import IHistoryRepository
 from code2markdown.application.services import GenerationService
+from code2markdown.domain.files import DirectoryNode, FileNode
 from code2markdown.domain.filters import FileSize, FilterSettings
 from code2markdown.domain.request import GenerationRequest
 
@@ -287,3 +290,155 @@ class TestGenerationService:
 
             saved_request = mock_repo.save.call_args[0][0]
             assert saved_request.file_count == 1
+
+    def test_load_template_reuses_compiled_template_until_modified(
+        self, service, template_dir
+    ):
+        """Test that compiled templates are cached by path and mtime."""
+        template_path = os.path.join(template_dir, "cached.hbs")
+        with open(template_path, "w", encoding="utf-8") as f:
+            f.write("v1 {{name}}")
+
+        first = service._load_template("cached.hbs")
+        assert service._load_template("cached.hbs") is first
+        assert first({"name": "x"}) == "v1 x"
+
+        with open(template_path, "w", encoding="utf-8") as f:
+            f.write("v2 {{name}}")
+        stat = os.stat(template_path)
+        os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        second = service._load_template("cached.hbs")
+        assert second is not first
+        assert second({"name": "x"}) == "v2 x"
+        assert service._load_template("missing.hbs") is None
+
+    def test_collect_from_tree_builds_structure_and_reads_files_in_one_pass(
+        self, service, tmp_path
+    ):
+        """Test that folders are listed before files and contents keep tree order."""
+        for name in ("a.py", "pkg/b.py", "pkg/skip.py", "z.md"):
+            path = tmp_path / name
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(f"# {name}", encoding="utf-8")
+        (tmp_path / "image.png").write_bytes(b"\x89PNG\x00")
+
+        def file_node(name, is_binary=False):
+            return FileNode(
+                path=str(tmp_path / name),
+                name=os.path.basename(name),
+                size=0,
+                is_binary=is_binary,
+            )
+
+        root = DirectoryNode(
+            path=str(tmp_path),
+            name="proj",
+            children=[
+                file_node("a.py"),
+                DirectoryNode(
+                    path=str(tmp_path / "pkg"),
+                    name="pkg",
+                    children=[file_node("pkg/b.py"), file_node("pkg/skip.py")],
+                ),
+                file_node("image.png", is_binary=True),
+                file_node("z.md"),
+            ],
+        )
+        selected = frozenset(
+            str(tmp_path / name) for name in ("a.py", "pkg/b.py", "image.png", "z.md")
+        )
+
+        structure, files = service._collect_from_tree(root, selected)
+
+        assert structure == (
+            "Project: proj\n├── pkg/\n    ├── b.py\n├── a.py\n├── image.png\n├── z.md\n"
+        )
+        assert [f["path"] for f in files] == [
+            str(tmp_path / "a.py"),
+            str(tmp_path / "pkg/b.py"),
+            str(tmp_path / "z.md"),
+        ]
+        assert files[0]["code"] == "# a.py"
+
+    def test_collect_from_tree_reads_many_files_on_thread_pool_in_order(
+        self, service, tmp_path
+    ):
+        """Test that pooled reads keep tree order and skip undecodable files."""
+        children = []
+        for index in range(12):
+            path = tmp_path / f"f{index:02d}.txt"
+            if index == 5:
+                path.write_bytes(b"\xff\xfe bad utf-8")
+            else:
+                path.write_text(f"content {index}", encoding="utf-8")
+            children.append(
+                FileNode(path=str(path), name=path.name, size=0, is_binary=False)
+            )
+        root = DirectoryNode(path=str(tmp_path), name="proj", children=children)
+
+        with patch(
+            "code2markdown.application.services.ThreadPoolExecutor",
+            wraps=services_module.ThreadPoolExecutor,
+        ) as executor:
+            _structure, files = service._collect_from_tree(root)
+
+        executor.assert_called_once_with(max_workers=12)
+        assert [f["code"] for f in files] == [
+            f"content {index}" for index in range(12) if index != 5
+        ]
+
+    def test_generate_inserts_code_verbatim_with_bundled_template(
+        self, service, template_dir, sample_filters, tmp_path
+    ):
+        """Test that code with HTML entities survives rendering unchanged."""
+        repo_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        with open(
+            os.path.join(repo_root, "templates", "default_template.hbs"),
+            encoding="utf-8",
+        ) as src:
+            template_text = src.read()
+        with open(
+            os.path.join(template_dir, "default_template.hbs"), "w", encoding="utf-8"
+        ) as dst:
+            dst.write(template_text)
+        code = 'if a < b && c:\n    s = "&amp; <tag>"'
+        (tmp_path / "main.py").write_text(code, encoding="utf-8")
+
+        result = service.generate_and_save_documentation(
+            project_path=str(tmp_path),
+            template_name="default_template.hbs",
+            filters=sample_filters,
+        )
+
+        assert code in result
+        assert "`" + str(tmp_path / "main.py") + "`" in result
+
+    def test_collect_from_tree_handles_trees_deeper_than_recursion_limit(self, service):
+        """Test that the structure walk does not recurse per folder."""
+        depth = sys.getrecursionlimit() + 100
+        root = DirectoryNode(path="/p", name="proj")
+        node = root
+        for level in range(depth):
+            child = DirectoryNode(path=f"{node.path}/d{level}", name=f"d{level}")
+            node.children.append(child)
+            node = child
+
+        structure, files = service._collect_from_tree(root)
+
+        lines = structure.splitlines()
+        assert len(lines) == depth + 1
+        assert lines[-1] == "    " * (depth - 1) + f"├── d{depth - 1}/"
+        assert files == []
+
+    def test_read_text_file_detects_binary_and_normalizes_newlines(
+        self, service, tmp_path
+    ):
+        """Test that one read both rejects binary content and decodes text."""
+        blob = tmp_path / "blob"
+        blob.write_bytes(b"ELF\x00\x01\x02")
+        crlf = tmp_path / "win.txt"
+        crlf.write_bytes(b"one\r\ntwo\rthree\n")
+
+        assert service._read_text_file(str(blob)) is None
+        assert service._read_text_file(str(crlf)) == "one\ntwo\nthree\n"